@@ -0,0 +1,234 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.fields import FieldInfo
+from pydantic_settings import BaseSettings, PydanticBaseSettingsSource, SettingsConfigDict
+
+# Typed settings: loaded once into a frozen snapshot, swapped atomically when the file changes
+
+DEFAULT_SETTINGS_FILE = Path(__file__).resolve().parents[2] / "config" / "settings.json"
+WATCH_INTERVAL_SECONDS = 5.0
+
+
+class Section(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+
+class CacheSettings(Section):
+    digest_entries: int = Field(10000, ge=1, description="Built digests kept across all users")
+    change_log_entries: int = Field(10000, ge=1, description="Changes kept per store before old cursors fall back to a full digest")
+    shared_tier: Literal["none", "sqlite", "redis"] = Field("none", description="Digest tier shared by worker processes")
+    shared_path: Optional[str] = Field(None, description="SQLite file for the shared tier (default: data dir)")
+    shared_ttl_s: float = Field(3600.0, gt=0)
+    redis_url: str = "redis://localhost:6379/0"
+    audio_max_bytes: int = Field(512 * 1024 * 1024, ge=1, description="Disk kept for rendered digest audio")
+    audio_max_age_s: float = Field(7 * 24 * 3600, gt=0, description="Rendered audio unused for this long is deleted")
+    user_stores: int = Field(1000, ge=1, description="Drivers whose mail and calendar stores are kept and re-synced")
+    store_idle_s: float = Field(24 * 3600, gt=0, description="Stores nobody asked for in this long are dropped")
+    sessions_per_store: int = Field(256, ge=1, description="Client session cursors kept per store, least recent dropped first")
+
+
+class WorkerSettings(Section):
+    workers: int = Field(max(1, min(4, (os.cpu_count() or 2) - 1)), ge=1, description="Worker processes for heavy jobs")
+    queue_size: int = Field(16, ge=0, description="Heavy jobs allowed to wait for a worker")
+    deadline_s: float = Field(30.0, gt=0, description="Default deadline for one heavy job")
+
+
+class SchedulerSettings(Section):
+    active_window_s: float = Field(15 * 60, gt=0, description="How long a driver stays active after a wake or command")
+    refresh_interval_s: float = Field(60.0, gt=0)
+    refresh_jitter: float = Field(0.2, ge=0, lt=1, description="Fraction each refresh interval is stretched or shrunk by")
+    max_concurrent: int = Field(4, ge=1, description="Refreshes allowed to run at once")
+    brief_warmup_interval_s: float = Field(300.0, gt=0)
+    task_ingest_interval_s: float = Field(60.0, gt=0)
+    store_sync_interval_s: float = Field(60.0, gt=0)
+
+
+class RateLimitSettings(Section):
+    enabled: bool = True
+    rate_per_s: float = Field(1.0, gt=0, description="Sustained requests per second per user and device")
+    burst: int = Field(10, ge=1, description="Requests allowed back to back before the rate applies")
+    paths: Tuple[str, ...] = ("/api/mail-digest", "/api/calendar-digest")
+    fleet_paths: Tuple[str, ...] = Field(("/api/fleet",), description="Batch endpoints, limited on their own bucket")
+    fleet_rate_per_s: float = Field(0.1, gt=0, description="Sustained batch requests per second per gateway")
+    fleet_burst: int = Field(2, ge=1)
+    backend: Literal["memory", "redis"] = Field("memory", description="Use redis when running several workers")
+    redis_url: str = "redis://localhost:6379/0"
+
+
+class DeadlineSettings(Section):
+    max_deadline_s: float = Field(120.0, gt=0, description="Longest deadline a client may ask for")
+    degrade_below_s: float = Field(0.5, ge=0, description="Serve the last built digest when less time than this is left")
+    grace_s: float = Field(0.25, ge=0, description="Time past the deadline allowed for sending a degraded answer")
+
+
+class PollingSettings(Section):
+    min_interval_s: int = Field(30, ge=1, description="Shortest poll interval hinted to clients")
+    max_interval_s: int = Field(1800, ge=1, description="Longest poll interval hinted to clients")
+    quiet_factor: float = Field(0.25, gt=0, description="Hinted interval as a share of the time since the last change")
+    meeting_window_s: float = Field(900.0, ge=0, description="Poll faster when a meeting starts within this")
+
+
+class NotificationSettings(Section):
+    enabled: bool = Field(True, description="Accept upstream change notifications")
+    notification_url: str = "http://localhost:8000/api/notifications"
+    subscription_ttl_s: float = Field(4200 * 60, gt=0, description="Subscription lifetime (Graph allows ~3 days for mail)")
+    coalesce_window_s: float = Field(2.0, ge=0, description="Notifications for one folder within this trigger one re-sync")
+    fallback_sync_s: float = Field(900.0, gt=0, description="Safety re-sync of subscribed folders, for missed notifications")
+
+
+class FleetSettings(Section):
+    max_users: int = Field(200, ge=1, description="Drivers accepted in one batch digest request")
+    max_concurrent: int = Field(16, ge=1, description="Digests built at once for one batch request")
+
+
+class VoiceSettings(Section):
+    priority_readout: int = Field(2, ge=1, description="Priority emails read out in the voice summary")
+    other_readout: int = Field(3, ge=1, description="Other emails read out in the voice summary")
+    list_readout: int = Field(3, ge=1, description="Items read out from deltas and search results")
+    words_per_second: float = Field(2.5, gt=0, description="Speaking rate used to estimate readout time")
+    sentence_pause_s: float = Field(0.4, ge=0, description="Pause the voice adds after each sentence")
+
+
+class Settings(BaseSettings):
+    """All tunables. Precedence: ZENDRIVE_* env vars, then the settings file, then defaults.
+
+    Nested values use a double underscore in env vars, for example
+    ZENDRIVE_WORKERS__QUEUE_SIZE=32. The file's "client" section belongs
+    to the car client (client/config.py) and is ignored here.
+    """
+
+    model_config = SettingsConfigDict(frozen=True, env_prefix="ZENDRIVE_", env_nested_delimiter="__",
+                                      extra="ignore")
+
+    cache: CacheSettings = CacheSettings()
+    workers: WorkerSettings = WorkerSettings()
+    scheduler: SchedulerSettings = SchedulerSettings()
+    rate_limit: RateLimitSettings = RateLimitSettings()
+    fleet: FleetSettings = FleetSettings()
+    deadlines: DeadlineSettings = DeadlineSettings()
+    polling: PollingSettings = PollingSettings()
+    notifications: NotificationSettings = NotificationSettings()
+    voice: VoiceSettings = VoiceSettings()
+
+    @classmethod
+    def settings_customise_sources(cls, settings_cls: Type[BaseSettings],
+                                   init_settings: PydanticBaseSettingsSource,
+                                   env_settings: PydanticBaseSettingsSource,
+                                   dotenv_settings: PydanticBaseSettingsSource,
+                                   file_secret_settings: PydanticBaseSettingsSource
+                                   ) -> Tuple[PydanticBaseSettingsSource, ...]:
+        return init_settings, env_settings, JsonFileSource(settings_cls, settings_file())
+
+
+class JsonFileSource(PydanticBaseSettingsSource):
+    """Top-level sections of the JSON settings file (a missing file means no overrides)"""
+
+    def __init__(self, settings_cls: Type[BaseSettings], path: Path):
+        super().__init__(settings_cls)
+        self.path = path
+
+    def get_field_value(self, field: FieldInfo, field_name: str) -> Tuple[Any, str, bool]:
+        return None, field_name, False   # Whole sections are returned from __call__
+
+    def __call__(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        if not isinstance(data, dict):
+            raise ValueError(f"{self.path} must contain a JSON object")
+        return data
+
+
+def settings_file() -> Path:
+    """Settings file from ZENDRIVE_SETTINGS_FILE, else config/settings.json"""
+    return Path(os.getenv("ZENDRIVE_SETTINGS_FILE", DEFAULT_SETTINGS_FILE))
+
+
+class SettingsManager:
+    """Holds the current settings snapshot and reloads it when the file changes.
+
+    Readers take `current` - one attribute read, no locking, no lookups -
+    and keep using the snapshot they got for the rest of the request. A
+    reload validates the whole file first, then replaces the reference in
+    one assignment, so a reader never sees half an update. A file that
+    fails validation is reported and the previous snapshot stays live.
+    """
+
+    def __init__(self):
+        self.path = settings_file()
+        self.current = Settings()
+        self._mtime = self._stat()
+        self._listeners: List[Callable[[Settings, Settings], None]] = []
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return None
+
+    def subscribe(self, listener: Callable[[Settings, Settings], None]):
+        """Call listener(old, new) after each reload that changed something"""
+        self._listeners.append(listener)
+
+    def reload(self) -> bool:
+        """Load the file again; True if the live settings changed"""
+        with self._lock:
+            self._mtime = self._stat()
+            try:
+                fresh = Settings()
+            except Exception as e:
+                print(f"⚠️ Settings reload rejected, keeping previous values: {e}")
+                return False
+            previous = self.current
+            if fresh == previous:
+                return False
+            self.current = fresh
+        print(f"🔧 Settings reloaded from {self.path}")
+        for listener in self._listeners:
+            try:
+                listener(previous, fresh)
+            except Exception as e:
+                print(f"⚠️ Settings listener failed: {e}")
+        return True
+
+    def check(self) -> bool:
+        """Reload if the file was created, edited or removed since the last load"""
+        if self._stat() == self._mtime:
+            return False
+        return self.reload()
+
+    def watch(self, interval_s: float = WATCH_INTERVAL_SECONDS):
+        """Poll the settings file on a daemon thread"""
+        if self._watcher is not None:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval_s)
+                self.check()
+
+        self._watcher = threading.Thread(target=poll, name="settings-watcher", daemon=True)
+        self._watcher.start()
+
+
+_manager: Optional[SettingsManager] = None
+
+def get_settings_manager() -> SettingsManager:
+    """Shared settings manager (loaded on first use)"""
+    global _manager
+    if _manager is None:
+        _manager = SettingsManager()
+    return _manager
+
+def get_settings() -> Settings:
+    """Current settings snapshot - cheap enough to call on every request"""
+    return (_manager or get_settings_manager()).current
@@ -1,13 +1,124 @@
-from fastapi import FastAPI
-# Import both mail and calendar routes
-from backend.routes import mail, calendar
+import asyncio
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+# Import mail, calendar, meeting, task, activity, fleet and notification routes
+from backend.routes import mail, calendar, meeting, tasks, activity, fleet, notifications
+from backend.config.settings import get_settings, get_settings_manager
+from backend.services.change_log import DEFAULT_USER, sync_stores
+from backend.services.deadline import DeadlineExceeded, DeadlineMiddleware, metrics as deadline_metrics
+from backend.services.digest_service import digest_cache, start_invalidation_listener
+from backend.services.meeting_service import prepare_upcoming_briefs
+from backend.services.notifications import get_coalescer, get_subscriptions
+from backend.services.rate_limit import RateLimitMiddleware
+from backend.services.scheduler import get_refresh_scheduler
+from backend.services.single_flight import digest_flights
+from backend.services.task_service import ingest_new_mail
+from backend.services.worker_pool import JobTimeout, PoolSaturated, get_worker_pool
+from backend.utils.responses import CompressionMiddleware
 
 # Create the main FastAPI app
 app = FastAPI(title="ZenDrive Mail Digest MVP")
 
+# Per-user token buckets on the digest endpoints; gzip/brotli on the way out; client deadlines around it all
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(DeadlineMiddleware)
+
 # Connect your service routers to the main app
 app.include_router(mail.router, prefix="/api", tags=["emails"])
 app.include_router(calendar.router, prefix="/api", tags=["calendar"])
+app.include_router(meeting.router, prefix="/api", tags=["meeting"])
+app.include_router(tasks.router, prefix="/api", tags=["tasks"])
+app.include_router(activity.router, prefix="/api", tags=["activity"])
+app.include_router(fleet.router, prefix="/api", tags=["fleet"])
+app.include_router(notifications.router, prefix="/api", tags=["notifications"])
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    """Heavy job queue is full - ask the client to come back later"""
+    return JSONResponse(
+        status_code=429,
+        content={"error": "busy", "message": str(exc), "success": False},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(JobTimeout)
+async def job_timeout_handler(request: Request, exc: JobTimeout):
+    """Heavy job missed its deadline"""
+    return JSONResponse(status_code=504, content={"error": "timeout", "message": str(exc), "success": False})
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """The client's deadline passed and there was nothing cached to fall back on"""
+    return JSONResponse(status_code=504, content={"error": "deadline_exceeded", "message": str(exc), "success": False})
+
+async def warm_meeting_briefs():
+    """Keep briefs for active drivers' upcoming meetings built before anyone asks"""
+    while True:
+        try:
+            prepare_upcoming_briefs({DEFAULT_USER, *get_refresh_scheduler().tracker.active_users()})
+        except Exception as e:
+            print(f"Meeting brief warmup failed: {e}")
+        await asyncio.sleep(get_settings().scheduler.brief_warmup_interval_s)
+
+async def ingest_mail_tasks():
+    """Extract tasks from newly arrived mail (already-processed mail is skipped)"""
+    while True:
+        try:
+            ingest_new_mail()
+        except Exception as e:
+            print(f"Task ingest failed: {e}")
+        await asyncio.sleep(get_settings().scheduler.task_ingest_interval_s)
+
+async def sync_mail_and_calendar():
+    """Reconcile the stores with upstream so delta digests see new changes.
+
+    Folders with a live change subscription are left to notifications,
+    apart from a slow safety sweep for anything upstream failed to send.
+    """
+    last_sweep = time.monotonic()
+    while True:
+        try:
+            if time.monotonic() - last_sweep >= get_settings().notifications.fallback_sync_s:
+                sync_stores()
+                last_sweep = time.monotonic()
+            else:
+                sync_stores(get_subscriptions().folders_to_poll)
+        except Exception as e:
+            print(f"Store sync failed: {e}")
+        await asyncio.sleep(get_settings().scheduler.store_sync_interval_s)
+
+@app.on_event("startup")
+async def start_background_jobs():
+    """Start background jobs when the server boots"""
+    # Settings file edits apply without a restart
+    settings_manager = get_settings_manager()
+    settings_manager.subscribe(get_worker_pool().resize)
+    settings_manager.subscribe(get_refresh_scheduler().resize)
+    settings_manager.watch()
+    start_invalidation_listener()
+    asyncio.create_task(warm_meeting_briefs())
+    asyncio.create_task(ingest_mail_tasks())
+    asyncio.create_task(sync_mail_and_calendar())
+    asyncio.create_task(get_coalescer().run())
+    asyncio.create_task(get_refresh_scheduler().run())
+
+@app.on_event("shutdown")
+async def stop_workers():
+    """Stop worker processes with the server"""
+    get_worker_pool().shutdown()
+
+@app.get("/metrics/workers")
+def worker_metrics():
+    """Worker pool load, outcomes and job latency"""
+    return get_worker_pool().metrics()
+
+@app.get("/metrics/refresh")
+def refresh_metrics():
+    """Refresh scheduler activity and digest cache hit rate"""
+    return {"scheduler": get_refresh_scheduler().metrics(), "digest_cache": digest_cache.stats(),
+            "coalescing": digest_flights.metrics(), "deadlines": deadline_metrics()}
 
 @app.get("/")
 def welcome():
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from backend.services.scheduler import get_refresh_scheduler
+from backend.utils.auth import get_user_id
+
+# Create activity router
+router = APIRouter()
+
+@router.post("/activity")
+async def record_activity(user_id: str = Depends(get_user_id)):
+    """Driver woke the app or gave a command - keep their digests warm"""
+    get_refresh_scheduler().record_activity(user_id)
+    return {"user_id": user_id, "active": True}
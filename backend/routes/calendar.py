@@ -1,62 +1,128 @@
-from fastapi import APIRouter
-from datetime import datetime
+from fastapi import APIRouter, Depends, Query, Request
+from datetime import datetime, timedelta
+from typing import Optional
+from backend.services.audio_service import audio_response
+from backend.services.calendar_service import format_clock
+from backend.services.change_log import get_calendar_index, get_calendar_store
+from backend.services.digest_service import build_calendar_delta, digest_within_deadline
+from backend.services.digest_service import get_calendar_digest as get_cached_calendar_digest
+from backend.services.poll_hints import digest_poll_s, is_prefetch
+from backend.services.scheduler import get_refresh_scheduler
+from backend.utils.auth import get_user_id
+from backend.utils.responses import digest_response
 
 # Create calendar router
 router = APIRouter()
 
+async def calendar_digest_payload(since: Optional[int], session: Optional[str], user_id: str, record: bool = True):
+    """Full or delta calendar digest for a user"""
+    if record:
+        get_refresh_scheduler().record_activity(user_id)
+    store = get_calendar_store(user_id)
+    if since is None and session:
+        since = store.session_cursor(session)
+
+    # Delta mode - served straight from the change log
+    if since is not None:
+        changes = store.changes_since(since)
+        if changes is not None:
+            cursor = store.advance_session(session) if session else store.cursor
+            return build_calendar_delta(changes, cursor, user_id)
+
+    # Full mode - prebuilt by the refresh scheduler for active drivers; concurrent misses build once
+    digest = await digest_within_deadline(user_id, "calendar", ("calendar", user_id), get_cached_calendar_digest)
+    if session and not digest.get("degraded"):
+        store.advance_session(session)
+    return {"mode": "full", **digest}
+
 @router.get("/calendar-digest")
-async def get_calendar_digest():
+async def get_calendar_digest(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Cursor from a previous digest - return only changes"),
+    session: Optional[str] = Query(None, description="Client session - the server remembers its cursor"),
+    profile: str = Query("full", pattern="^(full|voice)$", description="voice: only the fields needed for speech"),
+    user_id: str = Depends(get_user_id)
+):
     """Get today's calendar summary for voice output"""
-    
-    # Mock calendar data - replace with real calendar API
-    calendar_events = [
-        {
-            "time": "9:00 AM",
-            "title": "Team Standup",
-            "duration": "30 minutes",
-            "location": "Conference Room A",
-            "priority": "medium"
-        },
-        {
-            "time": "11:00 AM", 
-            "title": "Client Demo - ZenDrive Presentation",
-            "duration": "1 hour",
-            "location": "Zoom Meeting",
-            "priority": "high"
-        },
-        {
-            "time": "2:00 PM",
-            "title": "Code Review Session", 
-            "duration": "45 minutes",
-            "location": "Dev Room",
-            "priority": "medium"
-        },
-        {
-            "time": "4:00 PM",
-            "title": "Project Planning",
-            "duration": "1 hour",
-            "location": "Conference Room B", 
-            "priority": "low"
-        }
-    ]
-    
-    # Create voice-optimized summary
-    total_meetings = len(calendar_events)
-    high_priority = [e for e in calendar_events if e["priority"] == "high"]
-    
-    # Build speech summary
-    speech_summary = f"Good morning! You have {total_meetings} meetings today. "
-    
-    if high_priority:
-        speech_summary += f"Your priority meeting is at {high_priority[0]['time']}: {high_priority[0]['title']}. "
-    
-    speech_summary += f"Your day starts with {calendar_events[0]['title']} at {calendar_events[0]['time']}. "
-    speech_summary += f"You'll be free after {calendar_events[-1]['time']}."
-    
+    digest = await calendar_digest_payload(since, session, user_id, record=not is_prefetch(request.headers))
+    return digest_response(request, digest, profile,
+                           digest_poll_s(get_calendar_store(user_id), digest, calendar=True))
+
+@router.get("/calendar-digest/audio")
+async def get_calendar_digest_audio(
+    request: Request,
+    voice: str = Query("default", description="Engine voice name"),
+    format: str = Query("wav", pattern="^(wav|opus)$"),
+    user_id: str = Depends(get_user_id)
+):
+    """Get today's calendar digest as rendered speech (cached and shared across users)"""
+    digest = await calendar_digest_payload(since=None, session=None, user_id=user_id)
+    return await audio_response(request, digest["speech"], voice, format)
+
+@router.get("/calendar/next")
+async def get_next_calendar_meeting(user_id: str = Depends(get_user_id)):
+    """Get the next meeting that hasn't started yet"""
+    now = datetime.now()
+    event = get_calendar_index(user_id, now.date()).next_meeting(now)
+
+    if not event:
+        return {"next_meeting": None, "speech": "You have no more meetings today."}
+
+    minutes_away = int((event.start - now).total_seconds() // 60)
+    return {
+        "next_meeting": event.to_dict(),
+        "minutes_until": minutes_away,
+        "speech": f"Your next meeting is {event.title} at {format_clock(event.start)}, in {minutes_away} minutes."
+    }
+
+@router.get("/calendar/upcoming")
+async def get_upcoming_meetings(minutes: int = Query(60, ge=1, le=24 * 60), user_id: str = Depends(get_user_id)):
+    """What's on in the next N minutes (meetings in progress included)"""
+    now = datetime.now()
+    events = get_calendar_index(user_id, now.date()).upcoming(now, minutes)
+
+    if not events:
+        speech = f"Nothing on your calendar in the next {minutes} minutes."
+    else:
+        speech = f"In the next {minutes} minutes: " + ". ".join(
+            f"{event.title} at {format_clock(event.start)}" for event in events
+        ) + "."
+
+    return {
+        "window_minutes": minutes,
+        "events": [event.to_dict() for event in events],
+        "speech": speech
+    }
+
+@router.get("/calendar/free")
+async def get_free_slots(min_minutes: int = Query(15, ge=0), hours: int = Query(10, ge=1, le=24),
+                         user_id: str = Depends(get_user_id)):
+    """Free gaps between now and the next few hours"""
+    now = datetime.now()
+    slots = get_calendar_index(user_id, now.date()).free_slots(now, now + timedelta(hours=hours), min_minutes)
+
+    return {
+        "free_slots": [
+            {"start": start.isoformat(), "end": end.isoformat(),
+             "minutes": int((end - start).total_seconds() // 60)}
+            for start, end in slots
+        ],
+        "speech": (
+            f"You're free from {format_clock(slots[0][0])} to {format_clock(slots[0][1])}."
+            if slots else "You have no free time in that window."
+        )
+    }
+
+@router.get("/calendar/conflicts")
+async def get_calendar_conflicts(user_id: str = Depends(get_user_id)):
+    """Pairs of overlapping meetings today"""
+    conflicts = get_calendar_index(user_id).conflicts()
+
     return {
-        "total_events": total_meetings,
-        "events": calendar_events,
-        "high_priority_count": len(high_priority),
-        "summary": f"You have {total_meetings} meetings today, including {len(high_priority)} high priority.",
-        "speech": speech_summary
-    }
\ No newline at end of file
+        "conflict_count": len(conflicts),
+        "conflicts": [{"first": a.to_dict(), "second": b.to_dict()} for a, b in conflicts],
+        "speech": (
+            f"You have {len(conflicts)} overlapping meeting{'s' if len(conflicts) != 1 else ''}."
+            if conflicts else "No overlapping meetings today."
+        )
+    }
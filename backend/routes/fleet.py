@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Literal, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from backend.config.settings import get_settings
+from backend.services.digest_service import (budget_section, digest_within_deadline, get_calendar_digest,
+                                             get_mail_digest, get_priority_digest)
+from backend.utils.auth import valid_user_id
+from backend.utils.responses import slim_for_voice
+
+# Create fleet router - batch digests for gateways serving many drivers
+router = APIRouter()
+
+DigestSection = Literal["mail", "priority", "calendar"]
+
+
+class FleetDigestRequest(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, description="Drivers to build digests for")
+    sections: List[DigestSection] = Field(["mail", "calendar"], min_length=1)
+    profile: Literal["full", "voice"] = Field("full", description="voice: only the fields needed for speech")
+    budget_s: Optional[int] = Field(None, ge=5, le=600, description="Spoken-time budget for mail sections")
+
+    @field_validator("user_ids")
+    @classmethod
+    def check_user_ids(cls, user_ids: List[str]) -> List[str]:
+        bad = [user_id for user_id in user_ids if not valid_user_id(user_id)]
+        if bad:
+            raise ValueError(f"Invalid user ids: {', '.join(bad[:5])}")
+        return user_ids
+
+
+async def build_section(user_id: str, section: str, budget_s: Optional[int]) -> Dict[str, Any]:
+    """One full digest - shares in-flight builds and the digest cache with the per-user endpoints.
+
+    Activity isn't recorded: a gateway refresh isn't a driver asking.
+    """
+    if section == "mail":
+        return {"mode": "full", **await digest_within_deadline(user_id, budget_section("mail", budget_s),
+                                                               ("mail", user_id, budget_s), get_mail_digest, budget_s)}
+    if section == "priority":
+        return await digest_within_deadline(user_id, budget_section("priority", budget_s),
+                                            ("priority", user_id, budget_s), get_priority_digest, budget_s)
+    return {"mode": "full", **await digest_within_deadline(user_id, "calendar", ("calendar", user_id),
+                                                           get_calendar_digest)}
+
+
+async def stream_digests(batch: FleetDigestRequest, concurrency: int):
+    """NDJSON lines in completion order, then a closing summary line"""
+    started = time.perf_counter()
+    jobs: asyncio.Queue = asyncio.Queue()
+    for user_id in dict.fromkeys(batch.user_ids):
+        for section in dict.fromkeys(batch.sections):
+            jobs.put_nowait((user_id, section))
+    total = jobs.qsize()
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while not jobs.empty():
+            user_id, section = jobs.get_nowait()
+            line: Dict[str, Any] = {"user_id": user_id, "section": section}
+            try:
+                digest = await build_section(user_id, section, batch.budget_s)
+                line["digest"] = slim_for_voice(digest) if batch.profile == "voice" else digest
+            except Exception as e:
+                line["error"] = str(e) or type(e).__name__
+            await results.put(line)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, total))]
+    failed = 0
+    try:
+        for _ in range(total):
+            line = await results.get()
+            failed += "error" in line
+            yield json.dumps(line, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        yield json.dumps({"done": True, "results": total, "failed": failed,
+                          "took_ms": round((time.perf_counter() - started) * 1000, 2)},
+                         separators=(",", ":")).encode("utf-8") + b"\n"
+    finally:
+        # Gateway hung up mid-stream - stop building the rest
+        for task in workers:
+            task.cancel()
+
+
+@router.post("/fleet/digests")
+async def get_fleet_digests(batch: FleetDigestRequest):
+    """Digests for many drivers in one request, streamed as NDJSON as each one is ready"""
+    settings = get_settings().fleet
+    if len(batch.user_ids) > settings.max_users:
+        raise HTTPException(status_code=413, detail=f"At most {settings.max_users} drivers per batch")
+    return StreamingResponse(stream_digests(batch, settings.max_concurrent), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-store"})
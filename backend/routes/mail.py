@@ -1,104 +1,134 @@
-from fastapi import APIRouter
-# Add these imports to get our mock data
-from backend.utils.mock_data import get_unread_emails, get_high_priority_emails, generate_email_summary, generate_voice_summary
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from backend.config.settings import get_settings
+from backend.services.audio_service import audio_response
+from backend.services.change_log import get_mail_store
+from backend.services.digest_service import budget_section, build_mail_delta, digest_within_deadline, get_priority_digest
+from backend.services.digest_service import get_mail_digest as get_cached_mail_digest
+from backend.services.poll_hints import digest_poll_s, is_prefetch
+from backend.services.scheduler import get_refresh_scheduler
+from backend.services.search_service import get_search_index
+from backend.services.speech_text import spoken
+from backend.services.voice_service import parse_search_intent
+from backend.utils.auth import get_user_id
+from backend.utils.responses import digest_response
 
 # Create router for mail-related endpoints
 router = APIRouter()
 
-@router.get("/mail-digest")
-async def get_mail_digest():
-    """Get comprehensive email digest - quick overview + all emails"""
-    
-    # Get all unread emails
-    unread_emails = get_unread_emails()
-    priority_emails = get_high_priority_emails()
-    
-    # Create comprehensive summary for full digest
-    total_count = len(unread_emails)
-    priority_count = len(priority_emails)
-    regular_count = total_count - priority_count
-    
-    # Build detailed speech summary
-    speech_parts = []
-    
-    # 1. Quick overview
-    speech_parts.append(f"You have {total_count} unread emails.")
-    if priority_count > 0:
-        speech_parts.append(f"{priority_count} are high priority.")
-    
-    # 2. Priority emails first (if any)
-    if priority_emails:
-        speech_parts.append("Priority emails:")
-        for email in priority_emails:
-            speech_parts.append(f"{email['sender']} says {email['subject']}")
-    
-    # 3. Regular emails summary  
-    regular_emails = [email for email in unread_emails if email not in priority_emails]
-    if regular_emails:
-        if priority_emails:  # If we had priority emails, transition
-            speech_parts.append("Other emails:")
-        
-        # Group regular emails by type or just list first few
-        if len(regular_emails) <= 3:
-            # List all if 3 or fewer
-            for email in regular_emails:
-                speech_parts.append(f"{email['sender']}: {email['subject']}")
-        else:
-            # List first 2 and summarize rest
-            for email in regular_emails[:2]:
-                speech_parts.append(f"{email['sender']}: {email['subject']}")
-            remaining = len(regular_emails) - 2
-            speech_parts.append(f"Plus {remaining} more emails from various senders.")
+async def mail_digest_payload(since: Optional[int], session: Optional[str], user_id: str, budget_s: Optional[int] = None,
+                              record: bool = True):
+    """Full or delta mail digest for a user"""
+    if record:
+        get_refresh_scheduler().record_activity(user_id)
+    store = get_mail_store(user_id)
+    if since is None and session:
+        since = store.session_cursor(session)
     
-    # Join all parts
-    speech_summary = " ".join(speech_parts)
+    # Delta mode - served straight from the change log
+    if since is not None:
+        changes = store.changes_since(since)
+        if changes is not None:
+            cursor = store.advance_session(session) if session else store.cursor
+            return build_mail_delta(changes, cursor)
     
-    # Create text summary
-    text_summary = generate_email_summary(unread_emails, priority_emails)
-    
-    return {
-        "total_unread": total_count,
-        "priority_count": priority_count,
-        "regular_count": regular_count,
-        "priority_emails": priority_emails,
-        "regular_emails": regular_emails,
-        "all_emails": unread_emails,
-        "summary": text_summary,
-        "speech": speech_summary
-    }
+    # Full mode - prebuilt by the refresh scheduler for active drivers; concurrent misses build once
+    digest = await digest_within_deadline(user_id, budget_section("mail", budget_s), ("mail", user_id, budget_s),
+                                          get_cached_mail_digest, budget_s)
+    if session and not digest.get("degraded"):
+        store.advance_session(session)
+    return {"mode": "full", **digest}
+
+async def priority_digest_payload(user_id: str, budget_s: Optional[int] = None, record: bool = True):
+    """Priority-only mail digest for a user"""
+    if record:
+        get_refresh_scheduler().record_activity(user_id)
+    return await digest_within_deadline(user_id, budget_section("priority", budget_s), ("priority", user_id, budget_s),
+                                        get_priority_digest, budget_s)
+
+@router.get("/mail-digest")
+async def get_mail_digest(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Cursor from a previous digest - return only changes"),
+    session: Optional[str] = Query(None, description="Client session - the server remembers its cursor"),
+    profile: str = Query("full", pattern="^(full|voice)$", description="voice: only the fields needed for speech"),
+    budget_s: Optional[int] = Query(None, ge=5, le=600, description="Spoken-time budget - read the most important emails that fit"),
+    user_id: str = Depends(get_user_id)
+):
+    """Get comprehensive email digest - quick overview + all emails"""
+    digest = await mail_digest_payload(since, session, user_id, budget_s, record=not is_prefetch(request.headers))
+    return digest_response(request, digest, profile, digest_poll_s(get_mail_store(user_id), digest))
 
 @router.get("/mail-digest/priority")
-async def get_priority_mail_digest():
+async def get_priority_mail_digest(
+    request: Request,
+    profile: str = Query("full", pattern="^(full|voice)$", description="voice: only the fields needed for speech"),
+    budget_s: Optional[int] = Query(None, ge=5, le=600, description="Spoken-time budget - read the most important emails that fit"),
+    user_id: str = Depends(get_user_id)
+):
     """Get only high priority emails - quick urgent check"""
-    
-    # Get only priority emails
-    priority_emails = get_high_priority_emails()
-    
-    if not priority_emails:
-        speech_summary = "You have no priority emails right now. All clear!"
-        return {
-            "priority_count": 0,
-            "priority_emails": [],
-            "summary": "No priority emails",
-            "speech": speech_summary
-        }
-    
-    # Build concise priority summary
-    count = len(priority_emails)
-    speech_parts = []
-    
-    if count == 1:
-        email = priority_emails[0]
-        speech_summary = f"You have 1 priority email: {email['sender']} says {email['subject']}"
+    digest = await priority_digest_payload(user_id, budget_s, record=not is_prefetch(request.headers))
+    return digest_response(request, digest, profile, digest_poll_s(get_mail_store(user_id), digest))
+
+@router.get("/mail-digest/audio")
+async def get_mail_digest_audio(
+    request: Request,
+    voice: str = Query("default", description="Engine voice name"),
+    format: str = Query("wav", pattern="^(wav|opus)$"),
+    budget_s: Optional[int] = Query(None, ge=5, le=600, description="Spoken-time budget - read the most important emails that fit"),
+    user_id: str = Depends(get_user_id)
+):
+    """Get the full email digest as rendered speech (cached and shared across users)"""
+    digest = await mail_digest_payload(since=None, session=None, user_id=user_id, budget_s=budget_s)
+    return await audio_response(request, digest["speech"], voice, format)
+
+@router.get("/mail-digest/priority/audio")
+async def get_priority_mail_digest_audio(
+    request: Request,
+    voice: str = Query("default", description="Engine voice name"),
+    format: str = Query("wav", pattern="^(wav|opus)$"),
+    budget_s: Optional[int] = Query(None, ge=5, le=600, description="Spoken-time budget - read the most important emails that fit"),
+    user_id: str = Depends(get_user_id)
+):
+    """Get the priority email digest as rendered speech"""
+    digest = await priority_digest_payload(user_id, budget_s)
+    return await audio_response(request, digest["speech"], voice, format)
+
+@router.get("/mail/search")
+async def search_mail(
+    q: str = Query("", description="Search text or a spoken request like 'emails from Sarah'"),
+    sender: Optional[str] = Query(None, description="Only match this sender"),
+    limit: int = Query(5, ge=1, le=50),
+    user_id: str = Depends(get_user_id)
+):
+    """Search mail by sender, subject and snippet - tolerant of typos and partial words"""
+
+    started = time.perf_counter()
+
+    # Spoken requests carry the sender inside the text
+    intent = parse_search_intent(q) if q else {"sender": None, "query": ""}
+    sender = sender or intent["sender"]
+    results = get_search_index(user_id).search(intent["query"] or "", sender=sender, limit=limit)
+
+    took_ms = (time.perf_counter() - started) * 1000
+
+    # Build speech summary
+    topic = f" from {sender}" if sender else ""
+    topic += f" about {intent['query']}" if intent["query"] else ""
+    if not results:
+        speech_summary = f"I couldn't find any emails{topic}."
     else:
-        speech_parts.append(f"You have {count} priority emails:")
-        for email in priority_emails:
-            speech_parts.append(f"{email['sender']} says {email['subject']}")
+        speech_parts = [f"I found {len(results)} email{'s' if len(results) != 1 else ''}{topic}."]
+        for email in results[:get_settings().voice.list_readout]:  # Limit readout for voice
+            speech_parts.append(f"{spoken(email, 'sender')} says {spoken(email, 'subject')}.")
         speech_summary = " ".join(speech_parts)
-    
+
     return {
-        "priority_count": count,
-        "priority_emails": priority_emails, 
-        "summary": f"{count} priority emails",
+        "query": intent["query"],
+        "sender": sender,
+        "result_count": len(results),
+        "results": results,
+        "took_ms": round(took_ms, 2),
         "speech": speech_summary
-    }
\ No newline at end of file
+    }
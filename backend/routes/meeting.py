@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, HTTPException
+from backend.services.meeting_service import get_brief_service
+from backend.services.change_log import get_calendar_index
+from backend.utils.auth import get_user_id
+
+# Create meeting router
+router = APIRouter()
+
+@router.get("/meeting/{meeting_id}/brief")
+async def get_meeting_brief(meeting_id: str, user_id: str = Depends(get_user_id)):
+    """Get a speakable prep brief with the emails related to a meeting"""
+
+    event = get_calendar_index(user_id).get(meeting_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail=f"Meeting {meeting_id} not found")
+
+    # Served from the brief cache - warmed ahead of upcoming meetings
+    return get_brief_service(user_id).get_brief(event)
@@ -0,0 +1,71 @@
+from collections import Counter
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from backend.config.settings import get_settings
+from backend.services.notifications import accept_notification, get_coalescer, get_subscriptions
+from backend.utils.auth import get_user_id
+
+# Create notifications router - upstream change notifications replace most upstream polling
+router = APIRouter()
+
+
+class SubscriptionRequest(BaseModel):
+    folder: Literal["mail", "calendar"] = "mail"
+    ttl_s: Optional[float] = Field(None, gt=0, description="Lifetime; the configured default when omitted")
+
+
+@router.post("/notifications")
+async def receive_notifications(
+    request: Request,
+    validation_token: Optional[str] = Query(None, alias="validationToken",
+                                            description="Subscription handshake - echoed back as plain text")
+):
+    """Change notifications from upstream (Graph webhook shape) - validated, coalesced, synced per folder"""
+    if validation_token is not None:
+        return PlainTextResponse(validation_token)
+    if not get_settings().notifications.enabled:
+        raise HTTPException(status_code=503, detail="Change notifications are disabled")
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Notification body must be JSON")
+    items = body.get("value") if isinstance(body, dict) else None
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected {\"value\": [...]}")
+
+    # Answer fast - the re-syncs run after the coalescing window closes
+    subscriptions, coalescer = get_subscriptions(), get_coalescer()
+    results = Counter(accept_notification(item, subscriptions, coalescer) if isinstance(item, dict) else "rejected"
+                      for item in items)
+    status = 403 if items and results["rejected"] == len(items) else 202
+    return JSONResponse(status_code=status, content={
+        "accepted": results["accepted"], "ignored": results["ignored"], "rejected": results["rejected"]
+    })
+
+@router.post("/notifications/subscriptions")
+async def create_subscription(subscription: SubscriptionRequest, user_id: str = Depends(get_user_id)):
+    """Subscribe a user's folder to change notifications (the upstream side of a Graph subscription)"""
+    return get_subscriptions().create(user_id, subscription.folder, subscription.ttl_s).to_dict()
+
+@router.delete("/notifications/subscriptions/{subscription_id}")
+async def delete_subscription(subscription_id: str, user_id: str = Depends(get_user_id)):
+    """Stop notifications for one of the caller's subscriptions - polling takes the folder back"""
+    subscriptions = get_subscriptions()
+    subscription = subscriptions.get(subscription_id)
+    # Someone else's subscription is reported as missing, so ids can't be probed
+    if subscription is None or subscription.user_id != user_id or not subscriptions.remove(subscription_id):
+        raise HTTPException(status_code=404, detail="No such subscription")
+    return {"id": subscription_id, "removed": True}
+
+@router.get("/notifications/status")
+async def notification_status(user_id: str = Depends(get_user_id)):
+    """The caller's live subscriptions and how much work notifications have saved"""
+    coalescer = get_coalescer()
+    return {
+        "subscriptions": [{"id": s.id, "user_id": s.user_id, "folder": s.folder}
+                          for s in get_subscriptions().active() if s.user_id == user_id],
+        "pending": coalescer.pending,
+        **coalescer.counters,
+    }
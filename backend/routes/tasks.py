@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from backend.services.calendar_service import format_clock
+from backend.services.task_service import get_task_store, ingest_user_mail
+from backend.utils.auth import get_user_id
+
+# Create tasks router
+router = APIRouter()
+
+def describe_due(due: str) -> str:
+    """Voice-friendly due date, e.g. Friday at 5:00 PM"""
+    moment = datetime.fromisoformat(due)
+    day = "today" if moment.date() == datetime.now().date() else moment.strftime("%A")
+    return f"{day} at {format_clock(moment)}"
+
+@router.get("/tasks")
+async def get_tasks(include_done: bool = False, user_id: str = Depends(get_user_id)):
+    """Get the caller's tasks extracted from mail - served from the persisted task index"""
+
+    ingest_user_mail(user_id)   # Catch up with mail since the last background run (usually nothing)
+    tasks = get_task_store().list_tasks(include_done=include_done, user_id=user_id)
+    open_tasks = [task for task in tasks if not task["done"]]
+    dated = [task for task in open_tasks if task["due"]]
+
+    speech_parts = []
+    if not open_tasks:
+        speech_parts.append("You have no open tasks. Nice work!")
+    else:
+        speech_parts.append(f"You have {len(open_tasks)} open task{'s' if len(open_tasks) != 1 else ''}.")
+        for task in dated[:2]:  # Soonest deadlines first
+            speech_parts.append(f"{task['title']}, due {describe_due(task['due'])}.")
+
+    return {
+        "total_tasks": len(tasks),
+        "open_count": len(open_tasks),
+        "tasks": tasks,
+        "summary": f"{len(open_tasks)} open tasks, {len(dated)} with due dates",
+        "speech": " ".join(speech_parts)
+    }
+
+@router.post("/tasks/{task_id}/done")
+async def complete_task(task_id: str, user_id: str = Depends(get_user_id)):
+    """Mark one of the caller's tasks as done"""
+    if not get_task_store().mark_done(task_id, user_id):
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    return {"id": task_id, "done": True}
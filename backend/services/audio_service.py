@@ -0,0 +1,306 @@
+import asyncio
+import hashlib
+import io
+import os
+import re
+import shutil
+import subprocess
+import time
+import wave
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from backend.config.settings import get_settings
+from backend.services.worker_pool import get_worker_pool
+from backend.utils.storage import data_path
+
+# Server-side digest audio: render once per (script, voice, format), share the file with everyone
+
+SAMPLE_RATE = 22050
+STREAM_CHUNK_BYTES = 32 * 1024
+MEDIA_TYPES = {"wav": "audio/wav", "opus": "audio/ogg"}
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+VOICE_PATTERN = re.compile(r"\w[\w.+-]{0,63}")   # Engine voice names; never a path or a command-line flag
+
+
+def wav_bytes(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Wrap raw 16-bit mono PCM in a WAV container"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+# Offline engines - each turns a script into WAV bytes
+
+class AudioEngine:
+    name = "base"
+
+    def valid_voice(self, voice: str) -> bool:
+        return voice == "default" or VOICE_PATTERN.fullmatch(voice) is not None
+
+    def render_wav(self, script: str, voice: str) -> bytes:
+        raise NotImplementedError
+
+
+class EspeakEngine(AudioEngine):
+    """espeak-ng: small, fast, available on most Linux head-unit images"""
+
+    name = "espeak"
+
+    def render_wav(self, script: str, voice: str) -> bytes:
+        args = ["espeak-ng", "--stdout", "-s", "150"]
+        if voice != "default":
+            args += ["-v", voice]
+        return subprocess.run(args + [script], capture_output=True, check=True).stdout
+
+
+class PiperEngine(AudioEngine):
+    """piper: offline neural voices; `voice` is a model file name"""
+
+    name = "piper"
+
+    MODEL_PATTERN = re.compile(r"[\w.-]+\.onnx")
+
+    def __init__(self, model_dir: str):
+        self.model_dir = Path(model_dir)
+
+    def valid_voice(self, voice: str) -> bool:
+        """A model file in model_dir - a bare name, so it can't point piper anywhere else"""
+        return voice == "default" or (self.MODEL_PATTERN.fullmatch(voice) is not None
+                                      and (self.model_dir / voice).is_file())
+
+    def render_wav(self, script: str, voice: str) -> bytes:
+        if not self.valid_voice(voice):
+            raise ValueError(f"Unknown piper voice: {voice}")
+        model = self.model_dir / (voice if voice != "default" else "en_US-lessac-medium.onnx")
+        pcm = subprocess.run(["piper", "--model", str(model), "--output-raw"],
+                             input=script.encode("utf-8"), capture_output=True, check=True).stdout
+        return wav_bytes(pcm)
+
+
+class StubEngine(AudioEngine):
+    """Deterministic silence sized like the script (tests and demos without an engine)"""
+
+    name = "stub"
+
+    def render_wav(self, script: str, voice: str) -> bytes:
+        seconds = len(script) / 18
+        return wav_bytes(b"\x00\x00" * int(seconds * SAMPLE_RATE))
+
+
+def create_engine() -> Optional[AudioEngine]:
+    """Engine from ZENDRIVE_AUDIO_ENGINE, else the first one installed"""
+    name = os.getenv("ZENDRIVE_AUDIO_ENGINE")
+    if name == "stub":
+        return StubEngine()
+    if name == "piper" or (name is None and shutil.which("piper")):
+        return PiperEngine(os.getenv("ZENDRIVE_PIPER_MODELS", "."))
+    if name == "espeak" or (name is None and shutil.which("espeak-ng")):
+        return EspeakEngine()
+    return None
+
+
+def encode_opus(wav: bytes) -> bytes:
+    """Transcode WAV to Ogg/Opus with ffmpeg (voice bitrate)"""
+    return subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", "pipe:0", "-c:a", "libopus", "-b:a", "24k",
+         "-application", "voip", "-f", "ogg", "pipe:1"],
+        input=wav, capture_output=True, check=True,
+    ).stdout
+
+
+def render_audio_file(script: str, voice: str, fmt: str, path: str) -> str:
+    """Render a script to `path` (runs inside a worker process)"""
+    engine = create_engine()
+    if engine is None:
+        raise RuntimeError("No offline TTS engine available")
+    audio = engine.render_wav(script, voice)
+    if fmt == "opus":
+        audio = encode_opus(audio)
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(audio)
+    os.replace(tmp_path, target)   # Readers never see a half-written file
+    return path
+
+
+class AudioCache:
+    """Content-addressed store of rendered digests.
+
+    The key is a hash of engine, voice, format and script, so identical
+    briefs map to one file whoever asks. Concurrent requests for the same
+    key share one render, and renders run in the worker pool rather than on
+    the event loop.
+
+    Digests change all day, so the directory is bounded: a hit touches the
+    file's mtime, and after each render files unused for `max_age_s` are
+    deleted, then the least recently used until it fits in `max_bytes`.
+    Worker processes sharing the directory all see the same mtimes.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None,
+                 max_age_s: Optional[float] = None):
+        self.root = Path(root or data_path("audio"))
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.engine = create_engine()   # Workers build their own; this one names keys and checks voices
+        self.engine_name = self.engine.name if self.engine else None
+        self._renders: Dict[str, asyncio.Future] = {}
+
+    def key(self, script: str, voice: str, fmt: str) -> str:
+        return hashlib.sha256(f"{self.engine_name}\n{voice}\n{fmt}\n{script}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str, fmt: str) -> Path:
+        return self.root / key[:2] / f"{key}.{fmt}"
+
+    def prune(self, keep: Optional[Path] = None) -> int:
+        """Delete expired and least recently used files; returns how many went"""
+        cache = get_settings().cache
+        max_bytes = self.max_bytes or cache.audio_max_bytes
+        max_age_s = self.max_age_s or cache.audio_max_age_s
+        files = []
+        for path in self.root.glob("*/*.*"):
+            if path.suffix.lstrip(".") not in MEDIA_TYPES:
+                continue   # In-progress .tmp files belong to a running render
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue   # Pruned by another worker
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort(key=lambda f: f[0])
+
+        cutoff = time.time() - max_age_s
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff and total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    async def get_or_render(self, script: str, voice: str = "default", fmt: str = "wav") -> Tuple[str, Path]:
+        """Path of the rendered file, rendering it on first request"""
+        if self.engine_name is None:
+            raise RuntimeError("No offline TTS engine available")
+        key = self.key(script, voice, fmt)
+        path = self.path_for(key, fmt)
+        try:
+            os.utime(path)   # Mark as recently used
+            return key, path
+        except FileNotFoundError:
+            pass
+
+        render = self._renders.get(key)
+        if render is None:
+            render = asyncio.ensure_future(self._render(script, voice, fmt, path))
+            self._renders[key] = render
+            render.add_done_callback(lambda _: self._renders.pop(key, None))
+        await asyncio.shield(render)
+        return key, path
+
+    async def _render(self, script: str, voice: str, fmt: str, path: Path):
+        await get_worker_pool().submit(render_audio_file, script, voice, fmt, str(path))
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.prune, path)
+        except OSError as e:
+            print(f"⚠️ Audio cache prune failed: {e}")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive byte range from a Range header (None for the whole file)"""
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        raise HTTPException(status_code=416, detail="Invalid range",
+                            headers={"Content-Range": f"bytes */{size}"})
+    if match.group(1):
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    else:
+        start, end = max(0, size - int(match.group(2))), size - 1   # Suffix range: last N bytes
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def iter_file(f: BinaryIO, start: int, end: int) -> Iterator[bytes]:
+    """Stream an inclusive byte range of an open file in chunks, closing it at the end"""
+    with f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+_audio_cache: Optional[AudioCache] = None
+
+def get_audio_cache() -> AudioCache:
+    """Shared audio cache (engine chosen on first use)"""
+    global _audio_cache
+    if _audio_cache is None:
+        _audio_cache = AudioCache()
+    return _audio_cache
+
+
+async def audio_response(request: Request, script: str, voice: str = "default", fmt: str = "wav") -> Response:
+    """Rendered audio for a speech script, with ETag and HTTP Range support"""
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    cache = get_audio_cache()
+    if cache.engine is not None and not cache.engine.valid_voice(voice):
+        raise HTTPException(status_code=400, detail=f"Unknown voice: {voice}")
+
+    # Content-addressed: a client holding this ETag has these bytes, so it needs no render
+    etag = f'"{cache.key(script, voice, fmt)}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "public, max-age=86400, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    for attempt in range(2):
+        try:
+            _, path = await cache.get_or_render(script, voice, fmt)
+        except (RuntimeError, FileNotFoundError, ValueError, subprocess.CalledProcessError) as e:
+            raise HTTPException(status_code=503, detail=f"Audio rendering unavailable: {e}")
+        try:
+            # An open file survives another render's prune, so size and bytes stay consistent
+            audio = open(path, "rb")
+            break
+        except FileNotFoundError:
+            if attempt:
+                raise HTTPException(status_code=503, detail="Rendered audio was evicted before it could be served")
+    size = os.fstat(audio.fileno()).st_size
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except HTTPException:
+        audio.close()
+        raise
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        (start, end), status = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(iter_file(audio, start, end), status_code=status,
+                             media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,329 @@
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from dateutil.rrule import rrulestr
+
+from backend.utils.auth import DEFAULT_USER
+
+# Calendar engine - events on real datetimes behind a sorted interval index
+
+TIME_FORMATS = ["%H:%M", "%I:%M %p", "%I %p"]
+MAX_CACHED_WINDOWS = 14   # Expanded days kept per recurring series
+
+
+def parse_event_time(value: Any, day: Optional[date] = None) -> datetime:
+    """Parse "09:00", "9:00 AM" or an ISO timestamp into a datetime on `day`"""
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    day = day or date.today()
+    for fmt in TIME_FORMATS:
+        try:
+            clock = datetime.strptime(text.upper(), fmt).time()
+            return datetime.combine(day, clock)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised event time: {value!r}")
+
+
+def format_clock(moment: datetime) -> str:
+    """Voice-friendly clock time, e.g. 9:00 AM"""
+    return moment.strftime("%I:%M %p").lstrip("0")
+
+
+def format_duration(delta: timedelta) -> str:
+    """Voice-friendly duration, e.g. 45 minutes, 1 hour, 1 hour 30 minutes"""
+    minutes = int(delta.total_seconds() // 60)
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+    if minutes or not hours:
+        parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
+    return " ".join(parts)
+
+
+@dataclass(frozen=True)
+class CalendarEvent:
+    id: str
+    title: str
+    start: datetime
+    end: datetime
+    location: str = ""
+    priority: str = "medium"
+    type: str = "meeting"
+    attendees: Tuple[str, ...] = field(default_factory=tuple)
+    series_id: Optional[str] = None   # Set on occurrences of a recurring series
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any], day: Optional[date] = None) -> "CalendarEvent":
+        """Build an event from the mock/Graph style dict"""
+        start = parse_event_time(raw.get("start") or raw["start_time"], day)
+        end = parse_event_time(raw.get("end") or raw["end_time"], start.date())
+        return cls(
+            id=str(raw.get("id", "")),
+            title=raw.get("title", "Untitled meeting"),
+            start=start,
+            end=end,
+            location=raw.get("location", ""),
+            priority=raw.get("priority", "medium"),
+            type=raw.get("type", "meeting"),
+            attendees=tuple(raw.get("attendees", [])),
+            series_id=raw.get("series_id"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for API responses (keeps the display fields the client reads)"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "time": format_clock(self.start),
+            "duration": format_duration(self.end - self.start),
+            "location": self.location,
+            "priority": self.priority,
+            "type": self.type,
+            "attendees": list(self.attendees),
+            "series_id": self.series_id,
+        }
+
+
+class RecurringSeries:
+    """A recurring event: a template, an RRULE and per-occurrence exceptions.
+
+    Occurrences are expanded lazily one day at a time and each expanded
+    day is cached, so a today/next-meeting query never expands the series
+    past the day it asks about. `exceptions` maps an occurrence date
+    ("2025-10-21") to field overrides, or to None for a cancelled one.
+    """
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.id = str(raw.get("id", ""))
+        self.raw = raw
+        first_day = date.fromisoformat(str(raw["dtstart"])[:10]) if raw.get("dtstart") else date.today()
+        template = CalendarEvent.from_dict(raw, first_day)
+        self.start_time = template.start.time()
+        self.duration = template.end - template.start
+        self.rule = rrulestr(raw["rrule"], dtstart=datetime.combine(template.start.date(), time.min))
+        self.exceptions: Dict[str, Optional[Dict[str, Any]]] = dict(raw.get("exceptions") or {})
+        self._windows: "OrderedDict[date, List[CalendarEvent]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version(raw: Dict[str, Any]) -> str:
+        """Everything but the exceptions - a change here invalidates every expanded day"""
+        return json.dumps({k: v for k, v in raw.items() if k != "exceptions"}, sort_keys=True, default=str)
+
+    def update(self, raw: Dict[str, Any]) -> "RecurringSeries":
+        """Apply a changed series: exception edits only drop the days they touch"""
+        if self.version(raw) != self.version(self.raw):
+            return RecurringSeries(raw)
+        exceptions = dict(raw.get("exceptions") or {})
+        with self._lock:
+            for key in set(exceptions) | set(self.exceptions):
+                # None is a cancellation, so compare presence as well as value
+                if (key in exceptions, exceptions.get(key)) != (key in self.exceptions, self.exceptions.get(key)):
+                    self._windows.pop(date.fromisoformat(key[:10]), None)
+            self.exceptions = exceptions
+            self.raw = raw
+        return self
+
+    def _occurrence(self, day: date) -> Optional[CalendarEvent]:
+        key = day.isoformat()
+        if key in self.exceptions and self.exceptions[key] is None:
+            return None   # Cancelled
+        override = self.exceptions.get(key) or {}
+        start = datetime.combine(day, self.start_time)
+        if override.get("start") or override.get("start_time"):
+            start = parse_event_time(override.get("start") or override["start_time"], day)
+        end = start + self.duration   # A moved occurrence keeps its length unless the edit says otherwise
+        if override.get("end") or override.get("end_time"):
+            end = parse_event_time(override.get("end") or override["end_time"], start.date())
+        return CalendarEvent.from_dict({**self.raw, **override, "id": f"{self.id}@{key}", "series_id": self.id,
+                                        "start": start, "end": end}, day)
+
+    def on_day(self, day: date) -> List[CalendarEvent]:
+        """Occurrences starting on `day` (expanded once, then served from the cache)"""
+        with self._lock:
+            events = self._windows.get(day)
+            if events is not None:
+                self._windows.move_to_end(day)
+                return events
+        day_start = datetime.combine(day, time.min)
+        hits = self.rule.between(day_start, day_start + timedelta(days=1), inc=True)
+        occurrence = self._occurrence(day) if any(hit.date() == day for hit in hits) else None
+        events = [occurrence] if occurrence is not None else []
+        with self._lock:
+            self._windows[day] = events
+            while len(self._windows) > MAX_CACHED_WINDOWS:
+                self._windows.popitem(last=False)
+        return events
+
+
+_series: Dict[str, Dict[str, RecurringSeries]] = {}   # user id -> series id -> series
+_series_lock = threading.Lock()
+
+def get_series(raw: Dict[str, Any], user_id: str = DEFAULT_USER) -> RecurringSeries:
+    """A user's expansion cache for a series, brought up to date with `raw`"""
+    series_id = str(raw.get("id", ""))
+    with _series_lock:
+        user_series = _series.setdefault(user_id, {})
+        series = user_series.get(series_id)
+        if series is None:
+            series = RecurringSeries(raw)
+        elif series.raw != raw:
+            series = series.update(raw)
+        user_series[series_id] = series
+        return series
+
+def forget_series(user_id: str):
+    """Drop a user's expanded series along with their evicted calendar store"""
+    with _series_lock:
+        _series.pop(user_id, None)
+
+
+def events_on(raw_events: List[Dict[str, Any]], day: Optional[date] = None,
+              user_id: str = DEFAULT_USER) -> List[CalendarEvent]:
+    """Events on `day` - one-off events as given, recurring series expanded for that day only"""
+    day = day or date.today()
+    events = []
+    for raw in raw_events:
+        if raw.get("rrule"):
+            events.extend(get_series(raw, user_id).on_day(day))
+        else:
+            events.append(CalendarEvent.from_dict(raw, day))
+    return events
+
+
+class CalendarIndex:
+    """Immutable sorted index over calendar events.
+
+    Events are kept sorted by start time next to a running maximum of end
+    times, so both arrays are monotonic and every query starts with a
+    binary search. Busy blocks (overlaps merged) and conflicts are
+    computed once when the index is built.
+    """
+
+    def __init__(self, events: List[CalendarEvent]):
+        self.events = sorted(events, key=lambda e: (e.start, e.end))
+        self._by_id = {event.id: event for event in self.events}
+        self._by_series = {event.series_id: event for event in reversed(self.events) if event.series_id}
+        self._starts = [e.start for e in self.events]
+        self._max_ends = []
+        running_end = None
+        for event in self.events:
+            running_end = event.end if running_end is None else max(running_end, event.end)
+            self._max_ends.append(running_end)
+        self.busy_blocks = self._merge_busy_blocks()
+        self._block_starts = [block[0] for block in self.busy_blocks]
+        self._block_ends = [block[1] for block in self.busy_blocks]
+        self._conflicts = self._find_conflicts()
+
+    @classmethod
+    def from_dicts(cls, raw_events: List[Dict[str, Any]], day: Optional[date] = None,
+                   user_id: str = DEFAULT_USER) -> "CalendarIndex":
+        """Parse a user's raw event dicts (expanding recurring series for `day`) and index them"""
+        return cls(events_on(raw_events, day, user_id))
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def _merge_busy_blocks(self) -> List[Tuple[datetime, datetime]]:
+        blocks: List[Tuple[datetime, datetime]] = []
+        for event in self.events:
+            if blocks and event.start <= blocks[-1][1]:
+                blocks[-1] = (blocks[-1][0], max(blocks[-1][1], event.end))
+            else:
+                blocks.append((event.start, event.end))
+        return blocks
+
+    def _find_conflicts(self) -> List[Tuple[CalendarEvent, CalendarEvent]]:
+        # Sweep in start order, keeping only events that are still running
+        conflicts = []
+        active: List[CalendarEvent] = []
+        for event in self.events:
+            active = [other for other in active if other.end > event.start]
+            conflicts.extend((other, event) for other in active)
+            active.append(event)
+        return conflicts
+
+    # Queries
+
+    def get(self, event_id: str) -> Optional[CalendarEvent]:
+        """Look up an event by id (a recurring series' id finds its first occurrence)"""
+        return self._by_id.get(event_id) or self._by_series.get(event_id)
+
+    def overlapping(self, start: datetime, end: datetime) -> List[CalendarEvent]:
+        """Events that intersect [start, end)"""
+        # First event whose running max end passes `start` ... last event starting before `end`
+        lo = bisect_right(self._max_ends, start)
+        hi = bisect_left(self._starts, end)
+        return [event for event in self.events[lo:hi] if event.end > start]
+
+    def upcoming(self, now: datetime, minutes: int) -> List[CalendarEvent]:
+        """What is on in the next N minutes (including meetings in progress)"""
+        return self.overlapping(now, now + timedelta(minutes=minutes))
+
+    def current_meetings(self, now: datetime) -> List[CalendarEvent]:
+        """Meetings in progress at `now`"""
+        return self.overlapping(now, now + timedelta(microseconds=1))
+
+    def next_meeting(self, now: datetime) -> Optional[CalendarEvent]:
+        """First meeting starting at or after `now`"""
+        index = bisect_left(self._starts, now)
+        return self.events[index] if index < len(self.events) else None
+
+    def is_free(self, at: datetime) -> bool:
+        """True when no busy block covers `at`"""
+        index = bisect_right(self._block_starts, at) - 1
+        return index < 0 or self.busy_blocks[index][1] <= at
+
+    def free_slots(self, window_start: datetime, window_end: datetime,
+                   min_minutes: int = 0) -> List[Tuple[datetime, datetime]]:
+        """Free gaps inside [window_start, window_end) at least `min_minutes` long"""
+        min_length = timedelta(minutes=min_minutes)
+        slots = []
+        cursor = window_start
+        index = bisect_right(self._block_ends, window_start)
+        while index < len(self.busy_blocks) and self.busy_blocks[index][0] < window_end:
+            block_start, block_end = self.busy_blocks[index]
+            if block_start > cursor and block_start - cursor >= min_length:
+                slots.append((cursor, block_start))
+            cursor = max(cursor, block_end)
+            index += 1
+        if window_end > cursor and window_end - cursor >= min_length:
+            slots.append((cursor, window_end))
+        return slots
+
+    def free_after(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """End of the last busy block (None once the day's meetings are over)"""
+        if not self.busy_blocks:
+            return None
+        last_end = self.busy_blocks[-1][1]
+        if now is not None and last_end <= now:
+            return None
+        return last_end
+
+    def conflicts(self, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> List[Tuple[CalendarEvent, CalendarEvent]]:
+        """Pairs of overlapping events, optionally limited to a window"""
+        if start is None and end is None:
+            return list(self._conflicts)
+        start = start or datetime.min
+        end = end or datetime.max
+        return [(a, b) for a, b in self._conflicts
+                if b.start < end and min(a.end, b.end) > start]
+
+    def high_priority(self) -> List[CalendarEvent]:
+        """High priority events in start order"""
+        return [event for event in self.events if event.priority == "high"]
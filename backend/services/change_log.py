@@ -0,0 +1,321 @@
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.config.settings import get_settings
+from backend.services.calendar_service import CalendarIndex, forget_series
+from backend.services.speech_text import prepare_email
+from backend.utils.mock_data import get_todays_events, get_unread_emails
+
+# Versioned item store with an append-only change log for delta digests
+
+ADDED, CHANGED, REMOVED = "added", "changed", "removed"
+DEFAULT_USER = "default"  # Single-user installs
+MAIL, CALENDAR = "mail", "calendar"
+FOLDERS = (MAIL, CALENDAR)
+CURSOR_SPAN = 1 << 32   # Cursor = epoch * CURSOR_SPAN + sequence number
+
+
+def item_hash(item_id: str, item: Dict[str, Any]) -> int:
+    """Stable 64-bit hash of one item (identical in every process, unlike hash())"""
+    encoded = json.dumps([item_id, item], sort_keys=True, default=str).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), "big")
+
+
+class ChangeLogStore:
+    """Current items plus a sequence-numbered log of every change.
+
+    `sync` diffs an upstream snapshot against the stored items once, at
+    sync time. `changes_since(cursor)` then jumps straight into the log
+    (sequence numbers are contiguous), so computing a delta costs
+    O(changes) rather than O(inbox).
+
+    `fingerprint` identifies the current contents: an XOR of per-item
+    hashes kept up to date on every change. Two workers holding the same
+    items share a fingerprint, so it is the version used for caches
+    shared between workers.
+
+    Sequence numbers only mean something to the store that issued them,
+    so cursors carry the store's random epoch in their high bits. A cursor
+    from another worker, or from a store since rebuilt, fails the epoch
+    check and gets a full digest instead of a wrong delta.
+
+    `prepare` derives the stored form of an item (e.g. its speech text).
+    It runs only when an item is new or changed upstream; unchanged items
+    are recognised by comparing against the upstream form kept alongside.
+
+    `view` attaches a derived index (search, related mail...) that is fed
+    every change as it is logged, so it never needs rebuilding.
+    """
+
+    def __init__(self, key: Callable[[Dict[str, Any]], str] = lambda item: str(item["id"]),
+                 max_entries: Optional[int] = None,
+                 prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+        self.key = key
+        self.max_entries = max_entries
+        self.prepare = prepare
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self._sources: Dict[str, Dict[str, Any]] = {}   # Upstream form of prepared items
+        self._log: List[Tuple[int, str, str, Optional[Dict[str, Any]]]] = []
+        self._first_seq = 1   # Sequence number of _log[0]
+        self.seq = 0          # Sequence number of the newest change
+        self.epoch = secrets.randbits(20) + 1   # Keeps cursors below 2**53 (exact in JSON clients)
+        self.fingerprint = 0
+        self.changed_at = time.time()   # Wall-clock time of the newest change
+        self._hashes: Dict[str, int] = {}
+        self._sessions: "OrderedDict[str, int]" = OrderedDict()   # Least recently advanced first
+        self._views: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> int:
+        """Cursor of the newest change, as handed to clients"""
+        return self.epoch * CURSOR_SPAN + self.seq
+
+    def _append(self, op: str, item_id: str, item: Optional[Dict[str, Any]]):
+        self.seq += 1
+        self.changed_at = time.time()
+        self._log.append((self.seq, op, item_id, item))
+        # Older cursors fall back to a full digest
+        max_entries = self.max_entries or get_settings().cache.change_log_entries
+        if len(self._log) > max_entries:
+            drop = len(self._log) - max_entries
+            del self._log[:drop]
+            self._first_seq += drop
+        for view in self._views.values():
+            view.apply(op, item_id, item)
+
+    def upsert(self, item: Dict[str, Any]) -> bool:
+        """Add or update one item; False if nothing changed"""
+        with self._lock:
+            return self._upsert(item)
+
+    def remove(self, item_id: str) -> bool:
+        """Remove one item; False if it wasn't there"""
+        with self._lock:
+            return self._remove(item_id)
+
+    def sync(self, snapshot: Iterable[Dict[str, Any]]) -> int:
+        """Reconcile with a full upstream snapshot; returns the number of changes logged
+
+        The whole reconcile holds the lock, so a concurrent sync (a change
+        notification racing the periodic sweep) or a reader never sees a
+        half-applied snapshot.
+        """
+        incoming = {self.key(item): item for item in snapshot}
+        with self._lock:
+            before = self.seq
+            for item_id in [item_id for item_id in self.items if item_id not in incoming]:
+                self._remove(item_id)
+            for item in incoming.values():
+                self._upsert(item)
+            return self.seq - before
+
+    def _upsert(self, item: Dict[str, Any]) -> bool:
+        item_id = self.key(item)
+        previous = (self._sources if self.prepare else self.items).get(item_id)
+        if previous == item:
+            return False
+        if self.prepare:
+            self._sources[item_id] = item
+            item = self.prepare(item)
+        self.items[item_id] = item
+        new_hash = item_hash(item_id, item)
+        self.fingerprint ^= self._hashes.get(item_id, 0) ^ new_hash
+        self._hashes[item_id] = new_hash
+        self._append(ADDED if previous is None else CHANGED, item_id, item)
+        return True
+
+    def _remove(self, item_id: str) -> bool:
+        if self.items.pop(item_id, None) is None:
+            return False
+        self._sources.pop(item_id, None)
+        self.fingerprint ^= self._hashes.pop(item_id)
+        self._append(REMOVED, item_id, None)
+        return True
+
+    def view(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Derived index kept in step with the items; it needs apply(op, item_id, item)"""
+        with self._lock:
+            view = self._views.get(name)
+            if view is None:
+                view = self._views[name] = factory()
+                for item_id, item in self.items.items():
+                    view.apply(ADDED, item_id, item)
+            return view
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Current items in insertion order"""
+        with self._lock:
+            return list(self.items.values())
+
+    def changes_since(self, since: int) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Net changes after cursor `since`, or None if it isn't this store's or the log no longer reaches back"""
+        epoch, since = divmod(since, CURSOR_SPAN)
+        with self._lock:
+            if epoch != self.epoch:
+                return None
+            if since > self.seq:
+                since = self.seq
+            if since + 1 < self._first_seq:
+                return None
+            entries = self._log[since + 1 - self._first_seq:]
+
+            # Collapse repeated changes to the same item into one net change
+            net: Dict[str, str] = {}
+            for _, op, item_id, _item in entries:
+                first = net.get(item_id)
+                if first is None:
+                    net[item_id] = op
+                elif first == ADDED and op == REMOVED:
+                    net[item_id] = None
+                elif first == REMOVED and op == ADDED:
+                    net[item_id] = CHANGED
+                elif first != ADDED and op != CHANGED:
+                    net[item_id] = op
+
+            changes: Dict[str, List[Dict[str, Any]]] = {ADDED: [], CHANGED: [], REMOVED: []}
+            for item_id, op in net.items():
+                if op is None:
+                    continue
+                changes[op].append(self.items[item_id] if op != REMOVED else {"id": item_id})
+            return changes
+
+    def session_cursor(self, session: str) -> Optional[int]:
+        """Last cursor handed to a client session"""
+        with self._lock:
+            return self._sessions.get(session)
+
+    def advance_session(self, session: str) -> int:
+        """Move a session's cursor to the newest change (past cache.sessions_per_store the stalest session goes)"""
+        max_sessions = get_settings().cache.sessions_per_store
+        with self._lock:
+            cursor = self.cursor
+            self._sessions[session] = cursor
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > max_sessions:
+                self._sessions.popitem(last=False)
+        return cursor
+
+
+_mail_stores: Dict[str, ChangeLogStore] = {}
+_calendar_stores: Dict[str, ChangeLogStore] = {}
+_calendar_indexes: Dict[str, Tuple[ChangeLogStore, date, int, CalendarIndex]] = {}
+_last_used: Dict[str, float] = {}   # user_id -> monotonic time their stores were last asked for
+_stores_lock = threading.Lock()
+_change_listeners: List[Callable[[str, str], None]] = []
+_eviction_listeners: List[Callable[[str], None]] = []
+
+def subscribe_changes(listener: Callable[[str, str], None]):
+    """Call listener(user_id, folder) whenever a sync finds changes in one of a user's folders"""
+    _change_listeners.append(listener)
+
+def subscribe_evictions(listener: Callable[[str], None]):
+    """Call listener(user_id) when a user's stores are dropped, so per-user state built on them goes too"""
+    _eviction_listeners.append(listener)
+
+subscribe_evictions(forget_series)   # calendar_service sits below this module, so it is registered here
+
+def _user_store(stores: Dict[str, ChangeLogStore], user_id: str, create: Callable[[], ChangeLogStore],
+                touch: bool) -> ChangeLogStore:
+    store = stores.get(user_id)
+    if store is None:
+        store = create()
+    with _stores_lock:
+        store = stores.setdefault(user_id, store)
+        if touch or user_id not in _last_used:
+            _last_used[user_id] = time.monotonic()
+        over_cap = len(_last_used) > get_settings().cache.user_stores
+    if over_cap:
+        evict_stores()
+    return store
+
+def _synced(prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]],
+            fetch: Callable[[], List[Dict[str, Any]]]) -> ChangeLogStore:
+    store = ChangeLogStore(prepare=prepare)
+    store.sync(fetch())
+    return store
+
+def get_mail_store(user_id: str = DEFAULT_USER, touch: bool = True) -> ChangeLogStore:
+    """A user's unread mail store (synced from the mailbox on first use); items carry their speech text.
+
+    Background work passes touch=False so it doesn't keep an idle user's stores alive.
+    """
+    return _user_store(_mail_stores, user_id, lambda: _synced(prepare_email, get_unread_emails), touch)
+
+def get_calendar_store(user_id: str = DEFAULT_USER, touch: bool = True) -> ChangeLogStore:
+    """A user's calendar store for today (synced from the calendar on first use)"""
+    return _user_store(_calendar_stores, user_id, lambda: _synced(None, get_todays_events), touch)
+
+def mail_stores() -> Dict[str, ChangeLogStore]:
+    """Every user's mail store, without counting as use of it (for background work)"""
+    with _stores_lock:
+        return dict(_mail_stores)
+
+def get_calendar_index(user_id: str = DEFAULT_USER, day: Optional[date] = None) -> CalendarIndex:
+    """A user's calendar index for a day (rebuilt only when their calendar store changes)"""
+    day = day or date.today()
+    store = get_calendar_store(user_id)
+    cached = _calendar_indexes.get(user_id)
+    if cached is not None and cached[0] is store and cached[1:3] == (day, store.cursor):
+        return cached[3]
+    cursor = store.cursor
+    index = CalendarIndex.from_dicts(store.snapshot(), day, user_id)
+    _calendar_indexes[user_id] = (store, day, cursor, index)
+    return index
+
+def evict_stores(now: Optional[float] = None) -> List[str]:
+    """Drop the stores of users idle past cache.store_idle_s, then the least recently used past cache.user_stores.
+
+    Evicted users stop being re-synced. If they come back their stores
+    are rebuilt with a new epoch, so old cursors get a full digest.
+    """
+    settings = get_settings().cache
+    now = now or time.monotonic()
+    evicted = []
+    with _stores_lock:
+        for user_id, used in sorted(_last_used.items(), key=lambda entry: entry[1]):
+            if user_id == DEFAULT_USER:
+                continue
+            if now - used <= settings.store_idle_s and len(_last_used) <= settings.user_stores:
+                break
+            for registry in (_mail_stores, _calendar_stores, _calendar_indexes, _last_used):
+                registry.pop(user_id, None)
+            evicted.append(user_id)
+    for user_id in evicted:
+        for listener in _eviction_listeners:
+            try:
+                listener(user_id)
+            except Exception as e:
+                print(f"Eviction listener failed for {user_id}: {e}")
+    return evicted
+
+def sync_folder(user_id: str, folder: str, notify: bool = True) -> int:
+    """Pull one of a user's folders (mail or calendar) from upstream into its store"""
+    # Not a use of the stores: a background sync must not keep an idle user from being evicted
+    if folder == MAIL:
+        changed = get_mail_store(user_id, touch=False).sync(get_unread_emails())
+    else:
+        changed = get_calendar_store(user_id, touch=False).sync(get_todays_events())
+    if changed and notify:
+        for listener in _change_listeners:
+            try:
+                listener(user_id, folder)
+            except Exception as e:
+                print(f"Change listener failed for {user_id}/{folder}: {e}")
+    return changed
+
+def sync_user(user_id: str = DEFAULT_USER, notify: bool = True, folders: Sequence[str] = FOLDERS) -> int:
+    """Pull one user's latest mailbox and calendar into their stores"""
+    return sum(sync_folder(user_id, folder, notify) for folder in folders)
+
+def sync_stores(folders_for: Optional[Callable[[str], Sequence[str]]] = None) -> int:
+    """Sync every user who has stores (only the folders `folders_for(user_id)` names, when given)"""
+    evict_stores()
+    return sum(sync_user(user_id, folders=folders_for(user_id) if folders_for else FOLDERS)
+               for user_id in set(_mail_stores) | set(_calendar_stores) | {DEFAULT_USER})
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from backend.config.settings import get_settings
+
+# Request deadlines: the client says how long it will wait, and work past that point is cancelled
+
+DEADLINE_HEADER = "x-deadline-ms"   # Milliseconds the client will wait, from when it sent the request
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)   # time.monotonic() value
+counters = {"requests": 0, "expired": 0, "degraded": 0}
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before the work finished"""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline (None when it has none)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def current_deadline() -> Optional[float]:
+    """The current request's deadline as a time.monotonic() value (None when it has none)"""
+    return _deadline.get()
+
+
+def check_deadline():
+    """Raise DeadlineExceeded once the current request's deadline has passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline passed")
+
+
+def run_until(deadline: Optional[float], fn: Callable[..., Any], *args: Any) -> Any:
+    """Run fn(*args) under `deadline` - the entry point for executor threads and worker processes.
+
+    Neither sees the request's context, so the deadline is handed over
+    explicitly. Work picked up after it passed is skipped, and fn can call
+    check_deadline() between stages. time.monotonic() is system-wide, so
+    the value holds in another process on the same host.
+    """
+    token = _deadline.set(deadline)
+    try:
+        check_deadline()
+        return fn(*args)
+    finally:
+        _deadline.reset(token)
+
+
+async def within_deadline(awaitable: Awaitable[Any]) -> Any:
+    """Await something, giving up when the current request's deadline passes"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        # Nothing will wait for it - don't start it
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline passed")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Request deadline passed after {left:.2f}s")
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """Header value to seconds, clamped to the configured maximum (None if absent or malformed)"""
+    try:
+        seconds = float(value) / 1000
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, min(seconds, get_settings().deadlines.max_deadline_s))
+
+
+class DeadlineMiddleware:
+    """Applies the X-Deadline-Ms header to the whole request.
+
+    The deadline is put in a context variable that downstream work reads
+    (single-flight waits, worker pool jobs, digest fallbacks), and the
+    request itself is cancelled once it passes. The client has hung up by
+    then, so the work would only hold server capacity for nobody.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        seconds = parse_deadline(headers.get(DEADLINE_HEADER))
+        if seconds is None:
+            return await self.app(scope, receive, send)
+
+        counters["requests"] += 1
+        token = _deadline.set(time.monotonic() + seconds)
+        started = False
+
+        async def send_tracked(message):
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            # Small grace so handlers can still return a degraded answer at the deadline
+            await asyncio.wait_for(self.app(scope, receive, send_tracked),
+                                   timeout=seconds + get_settings().deadlines.grace_s)
+        except asyncio.TimeoutError:
+            counters["expired"] += 1
+            if not started:
+                body = json.dumps({"error": "deadline_exceeded", "message": f"Gave up after {seconds:.1f}s",
+                                   "success": False}).encode("utf-8")
+                await send({"type": "http.response.start", "status": 504,
+                            "headers": [(b"content-type", b"application/json"),
+                                        (b"content-length", str(len(body)).encode("latin-1"))]})
+                await send({"type": "http.response.body", "body": body})
+        finally:
+            _deadline.reset(token)
+
+
+def metrics() -> Dict[str, int]:
+    return dict(counters)
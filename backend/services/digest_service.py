@@ -0,0 +1,381 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from backend.config.settings import get_settings
+from backend.services.calendar_service import CalendarIndex, events_on, format_clock
+from backend.services.change_log import (CALENDAR, DEFAULT_USER, MAIL, get_calendar_store, get_mail_store,
+                                         subscribe_changes, sync_user)
+from backend.services.deadline import DeadlineExceeded, check_deadline, counters as deadline_counters, remaining
+from backend.services.mail_groups import MailGroups, get_mail_groups, group_mail
+from backend.services.shared_cache import SharedTier, create_shared_tier
+from backend.services.single_flight import digest_flights
+from backend.services.speech_budget import (message_count, other_line, plan_mail_readout, plan_priority_readout,
+                                            priority_line, speech_seconds)
+from backend.utils.mock_data import generate_calendar_voice_summary, generate_email_summary
+
+# Digest building plus a per-user cache keyed by store version
+
+
+def build_mail_digest(unread_emails: List[Dict[str, Any]], budget_s: Optional[float] = None,
+                      groups: Optional[MailGroups] = None) -> Dict[str, Any]:
+    """Comprehensive email digest - quick overview + all emails.
+
+    priority_emails and regular_emails hold one entry per thread or set of
+    near-identical messages (with a count), so a reply chain is spoken once.
+    With budget_s, the readout is the most valuable set of entries that can
+    be spoken in that many seconds: the lists then hold only those, and
+    omitted_count says how many messages were left out. email_ids always
+    lists every unread message, so clients diff on that, not the readout.
+    """
+    priority_messages = [email for email in unread_emails if email.get("priority") == "high"]
+    entries = groups.collapse(unread_emails) if groups is not None else group_mail(unread_emails)
+    priority_emails = [entry for entry in entries if entry.get("priority") == "high"]
+    regular_emails = [entry for entry in entries if entry.get("priority") != "high"]
+
+    # Create comprehensive summary for full digest
+    total_count = len(unread_emails)
+    priority_count = len(priority_messages)
+    regular_count = total_count - priority_count
+
+    # Build detailed speech summary
+    speech_parts = []
+
+    # 1. Quick overview
+    speech_parts.append(f"You have {total_count} unread emails.")
+    if priority_count > 0:
+        speech_parts.append(f"{priority_count} are high priority.")
+
+    # Pick what to read: the most valuable emails that fit the budget, or a fixed short list
+    if budget_s is not None:
+        spoken_priority, spoken_regular, omitted = plan_mail_readout(
+            priority_emails, regular_emails, budget_s - speech_seconds(" ".join(speech_parts)))
+    else:
+        spoken_priority = priority_emails
+        # List all if 3 or fewer, else first 2 and summarize rest
+        spoken_regular = regular_emails if len(regular_emails) <= 3 else regular_emails[:2]
+        omitted = message_count(regular_emails) - message_count(spoken_regular)
+
+    # 2. Priority emails first (if any)
+    if spoken_priority:
+        speech_parts.append("Priority emails:")
+        speech_parts.extend(priority_line(email) for email in spoken_priority)
+
+    # 3. Regular emails summary
+    if spoken_regular:
+        if spoken_priority:  # If we had priority emails, transition
+            speech_parts.append("Other emails:")
+        speech_parts.extend(other_line(email) for email in spoken_regular)
+    if omitted:
+        speech_parts.append(f"Plus {omitted} more emails from various senders.")
+
+    digest = {
+        "total_unread": total_count,
+        "priority_count": priority_count,
+        "regular_count": regular_count,
+        "priority_emails": priority_emails,
+        "regular_emails": regular_emails,
+        "group_count": len(entries),
+        "email_ids": [str(email["id"]) for email in unread_emails],
+        "all_emails": unread_emails,
+        "summary": generate_email_summary(unread_emails, priority_messages),
+        "speech": " ".join(speech_parts)
+    }
+    if budget_s is not None:
+        digest.update(priority_emails=spoken_priority, regular_emails=spoken_regular, omitted_count=omitted,
+                      budget_s=budget_s, estimated_s=round(speech_seconds(digest["speech"]), 1))
+    return digest
+
+
+def build_mail_delta(changes: Dict[str, List[Dict[str, Any]]], cursor: int) -> Dict[str, Any]:
+    """Delta digest: only what changed since the client's last check"""
+    added = changes["added"]
+    readout = get_settings().voice.list_readout
+    speech_parts = []
+
+    if not any(changes.values()):
+        speech_parts.append("No new emails since your last check.")
+    if added:
+        speech_parts.append(f"{len(added)} new email{'s' if len(added) != 1 else ''} since your last check.")
+        # Priority first, then the rest
+        for email in sorted(added, key=lambda e: e.get("priority") != "high")[:readout]:
+            speech_parts.append(f"{priority_line(email)}.")
+        if len(added) > readout:
+            speech_parts.append(f"Plus {len(added) - readout} more.")
+    if changes["removed"]:
+        count = len(changes["removed"])
+        speech_parts.append(f"{count} email{'s were' if count != 1 else ' was'} read or removed.")
+
+    return {
+        "mode": "delta",
+        "cursor": cursor,
+        "added": added,
+        "changed": changes["changed"],
+        "removed": changes["removed"],
+        "new_count": len(added),
+        "speech": " ".join(speech_parts)
+    }
+
+
+def build_priority_digest(unread_emails: List[Dict[str, Any]], budget_s: Optional[float] = None,
+                          groups: Optional[MailGroups] = None) -> Dict[str, Any]:
+    """Only high priority emails - quick urgent check (read within budget_s seconds when given)"""
+    priority_messages = [email for email in unread_emails if email.get("priority") == "high"]
+    priority_emails = groups.collapse(priority_messages) if groups is not None else group_mail(priority_messages)
+
+    if not priority_emails:
+        return {
+            "priority_count": 0,
+            "priority_emails": [],
+            "email_ids": [],
+            "summary": "No priority emails",
+            "speech": "You have no priority emails right now. All clear!"
+        }
+
+    # Build concise priority summary
+    count = len(priority_messages)
+    spoken, omitted = priority_emails, 0
+    if count == 1:
+        email = priority_emails[0]
+        speech_summary = f"You have 1 priority email: {priority_line(email)}"
+    else:
+        speech_parts = [f"You have {count} priority emails:"]
+        if budget_s is not None:
+            spoken, omitted = plan_priority_readout(priority_emails, budget_s - speech_seconds(speech_parts[0]))
+        speech_parts.extend(priority_line(email) for email in spoken)
+        if omitted:
+            speech_parts.append(f"Plus {omitted} more.")
+        speech_summary = " ".join(speech_parts)
+
+    digest = {
+        "priority_count": count,
+        "priority_emails": priority_emails,
+        "email_ids": [str(email["id"]) for email in priority_messages],
+        "summary": f"{count} priority emails",
+        "speech": speech_summary
+    }
+    if budget_s is not None:
+        digest.update(priority_emails=spoken, omitted_count=omitted, budget_s=budget_s,
+                      estimated_s=round(speech_seconds(speech_summary), 1))
+    return digest
+
+
+def build_calendar_digest(raw_events: List[Dict[str, Any]], now: datetime,
+                          user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+    """Today's calendar summary for voice output"""
+    index = CalendarIndex.from_dicts(raw_events, now.date(), user_id)
+    calendar_events = [event.to_dict() for event in index.events]
+
+    total_meetings = len(calendar_events)
+    high_priority = index.high_priority()
+    next_meeting = index.next_meeting(now)
+    free_after = index.free_after(now)
+
+    return {
+        "total_events": total_meetings,
+        "events": calendar_events,
+        "high_priority_count": len(high_priority),
+        "next_meeting": next_meeting.to_dict() if next_meeting else None,
+        "free_after": format_clock(free_after) if free_after else None,
+        "conflict_count": len(index.conflicts()),
+        "summary": f"You have {total_meetings} meetings today, including {len(high_priority)} high priority.",
+        "speech": generate_calendar_voice_summary(raw_events, now, user_id)
+    }
+
+
+def build_calendar_delta(changes: Dict[str, List[Dict[str, Any]]], cursor: int,
+                         user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+    """Delta digest: only meetings added, moved or cancelled since the last check"""
+    # Recurring series are only spoken for today's occurrence
+    added = [event.to_dict() for event in events_on(changes["added"], user_id=user_id)]
+    changed = [event.to_dict() for event in events_on(changes["changed"], user_id=user_id)]
+    removed = changes["removed"]
+
+    speech_parts = []
+    if not (added or changed or removed):
+        speech_parts.append("No calendar changes since your last check.")
+    if added:
+        speech_parts.append(f"{len(added)} new meeting{'s' if len(added) != 1 else ''} since your last check.")
+        speech_parts.extend(f"{event['title']} at {event['time']}." for event in added)
+    for event in changed:
+        speech_parts.append(f"{event['title']} is now at {event['time']}.")
+    if removed:
+        speech_parts.append(f"{len(removed)} meeting{'s were' if len(removed) != 1 else ' was'} cancelled.")
+
+    return {
+        "mode": "delta",
+        "cursor": cursor,
+        "added": added,
+        "changed": changed,
+        "removed": removed,
+        "speech": " ".join(speech_parts)
+    }
+
+
+class DigestCache:
+    """LRU of built digests per (user, section), tagged with the data version.
+
+    A cached digest is served only while its version (store fingerprint,
+    plus the minute for time-dependent sections) still matches, so a stale
+    entry is never returned and an unchanged mailbox never rebuilds.
+
+    Behind the in-process LRU sits an optional shared tier: with several
+    workers, whichever builds a digest first stores it there and the others
+    pick it up instead of rebuilding.
+
+    The last digest built for each (user, section) is also kept, whatever
+    its version and through invalidations, as the degraded answer for a
+    request that runs out of time.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, shared: Optional[SharedTier] = None):
+        self.max_entries = max_entries
+        self._shared = shared
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Hashable, Dict[str, Any]]]" = OrderedDict()
+        self._fallbacks: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    @property
+    def shared(self) -> SharedTier:
+        if self._shared is None:
+            self._shared = create_shared_tier(get_settings().cache)
+        return self._shared
+
+    def get(self, user_id: str, section: str, version: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get((user_id, section))
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((user_id, section))
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id: str, section: str, version: Hashable, digest: Dict[str, Any]):
+        with self._lock:
+            self._entries[(user_id, section)] = (version, digest)
+            self._entries.move_to_end((user_id, section))
+            self._fallbacks[(user_id, section)] = digest
+            self._fallbacks.move_to_end((user_id, section))
+            max_entries = self.max_entries or get_settings().cache.digest_entries
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+            while len(self._fallbacks) > max_entries:
+                self._fallbacks.popitem(last=False)
+
+    def fallback(self, user_id: str, section: str) -> Optional[Dict[str, Any]]:
+        """Last digest built for a section, possibly out of date"""
+        return self._fallbacks.get((user_id, section))
+
+    def get_or_build(self, user_id: str, section: str, version: Hashable,
+                     build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        digest = self.get(user_id, section, version)
+        if digest is not None:
+            return digest
+        digest = self.shared.get(user_id, section, version)
+        if digest is not None:
+            self.shared_hits += 1
+        else:
+            check_deadline()   # A cached digest is still worth returning; a build nobody waits for isn't
+            digest = build()
+            self.shared.put(user_id, section, version, digest)
+        self.put(user_id, section, version, digest)
+        return digest
+
+    def invalidate(self, user_id: str, section: Optional[str] = None):
+        """Drop one section, with its budgeted variants, (or all sections) for a user"""
+        with self._lock:
+            for key in [key for key in self._entries
+                        if key[0] == user_id and section in (None, key[1].partition("@")[0])]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "shared_tier": self.shared.name, "shared_hits": self.shared_hits,
+                "hit_rate": round(self.hits / total, 3) if total else None}
+
+
+digest_cache = DigestCache()
+
+
+FOLDER_SECTIONS = {MAIL: ("mail", "priority"), CALENDAR: ("calendar",)}
+
+
+def publish_change(user_id: str, folder: Optional[str] = None):
+    """Store listener: drop the digests built from the changed folder and tell the other workers"""
+    for section in FOLDER_SECTIONS.get(folder, (None,)):
+        digest_cache.invalidate(user_id, section)
+    digest_cache.shared.publish(user_id)
+
+subscribe_changes(publish_change)
+
+
+def on_remote_change(user_id: str):
+    """Another worker saw new data for this user - catch our stores up"""
+    digest_cache.invalidate(user_id)
+    sync_user(user_id, notify=False)
+
+
+def start_invalidation_listener():
+    """Follow invalidations from other workers (no-op without a shared tier)"""
+    digest_cache.shared.listen(on_remote_change)
+
+
+def budget_section(section: str, budget_s: Optional[int]) -> str:
+    """Cache section for a digest - each budget's selection is cached separately"""
+    return section if budget_s is None else f"{section}@{budget_s}s"
+
+
+async def digest_within_deadline(user_id: str, section: str, key: Hashable,
+                                 build: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    """Build a digest through the single-flight, or fall back to the last one built when the deadline is close.
+
+    A degraded digest is marked `degraded` and carries no cursor, so no
+    client or session cursor moves past changes it doesn't include.
+    """
+    fallback = digest_cache.fallback(user_id, section)
+    left = remaining()
+    if fallback is None or left is None or left >= get_settings().deadlines.degrade_below_s:
+        try:
+            return await digest_flights.run(key, build, user_id, *args)
+        except DeadlineExceeded:
+            fallback = digest_cache.fallback(user_id, section)
+            if fallback is None:
+                raise
+    deadline_counters["degraded"] += 1
+    return dict(fallback, degraded=True)
+
+
+def get_mail_digest(user_id: str, budget_s: Optional[int] = None) -> Dict[str, Any]:
+    """Full mail digest for a user, rebuilt only when their mailbox changed"""
+    store = get_mail_store(user_id)
+    cursor = store.cursor
+    digest = digest_cache.get_or_build(user_id, budget_section("mail", budget_s), store.fingerprint,
+                                       lambda: build_mail_digest(store.snapshot(), budget_s, get_mail_groups(user_id)))
+    return dict(digest, cursor=cursor)
+
+
+def get_priority_digest(user_id: str, budget_s: Optional[int] = None) -> Dict[str, Any]:
+    """Priority-only digest for a user"""
+    store = get_mail_store(user_id)
+    cursor = store.cursor
+    digest = digest_cache.get_or_build(user_id, budget_section("priority", budget_s), store.fingerprint,
+                                       lambda: build_priority_digest(store.snapshot(), budget_s,
+                                                                     get_mail_groups(user_id)))
+    return dict(digest, cursor=cursor)
+
+
+def get_calendar_digest(user_id: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Calendar digest for a user - also rebuilt each minute, since 'next' and 'free after' move with time"""
+    now = now or datetime.now()
+    store = get_calendar_store(user_id)
+    cursor = store.cursor
+    version = (store.fingerprint, now.strftime("%Y-%m-%d %H:%M"))
+    digest = digest_cache.get_or_build(user_id, "calendar", version,
+                                       lambda: build_calendar_digest(store.snapshot(), now, user_id))
+    return dict(digest, cursor=cursor)
@@ -0,0 +1,230 @@
+import hashlib
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.services.change_log import ChangeLogStore, get_mail_store, subscribe_evictions
+from backend.services.speech_text import REPLY_PREFIX, normalize_for_speech
+
+# Collapse reply chains and near-duplicate mail (bulk notifications) into one spoken item
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+DIGITS = re.compile(r"\d+")
+
+SIMHASH_BITS = 64
+BANDS = 4                 # 4 bands of 16 bits: any two hashes within 3 bits share a band
+BAND_BITS = SIMHASH_BITS // BANDS
+MAX_DISTANCE = 3          # Hamming distance that still counts as "the same message"
+MIN_FEATURES = 4          # Too little text for a meaningful fingerprint below this
+
+THREAD, SIMILAR = "thread", "similar"
+
+
+def conversation_key(email: Dict[str, Any]) -> str:
+    """Explicit conversation id when the mailbox gives one, else the subject without RE:/FW: and [tags]"""
+    for field in ("conversation_id", "thread_id", "conversationId"):
+        if email.get(field):
+            return f"id:{email[field]}"
+    words = TOKEN_PATTERN.findall(thread_subject(email).lower())
+    return "subject:" + " ".join(words) if words else f"item:{email.get('id')}"
+
+
+def thread_subject(email: Dict[str, Any]) -> str:
+    """Subject as the conversation is known - reply and forward prefixes stripped"""
+    return REPLY_PREFIX.sub("", email.get("subject", "")).strip() or email.get("subject", "")
+
+
+def features(email: Dict[str, Any]) -> List[str]:
+    """Word and word-pair features of subject and snippet; numbers are masked so order #123 ~ order #456"""
+    text = DIGITS.sub("#", f"{thread_subject(email)} {email.get('snippet', '')}".lower())
+    words = TOKEN_PATTERN.findall(text.replace("#", " num "))
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@lru_cache(maxsize=65536)
+def token_bits(token: str) -> Tuple[int, ...]:
+    """Set bit positions of a token's 64-bit hash (tokens repeat a lot across an inbox)"""
+    h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+    return tuple(bit for bit in range(SIMHASH_BITS) if h >> bit & 1)
+
+
+def simhash(tokens: List[str]) -> int:
+    """64-bit SimHash: near-identical texts get hashes a few bits apart"""
+    counts = [0] * SIMHASH_BITS
+    for token in tokens:
+        for bit in token_bits(token):
+            counts[bit] += 1
+    half = len(tokens) / 2
+    return sum(1 << bit for bit, count in enumerate(counts) if count > half)
+
+
+def bands(fingerprint: int) -> List[int]:
+    """Band keys for the LSH buckets (band number folded in so bands never collide)"""
+    mask = (1 << BAND_BITS) - 1
+    return [(band << BAND_BITS) | (fingerprint >> (band * BAND_BITS) & mask) for band in range(BANDS)]
+
+
+class MailGroup:
+    """Messages spoken as one item: a conversation, or near-identical messages"""
+
+    __slots__ = ("id", "kind", "keys", "subject", "speech_subject", "members", "fingerprint")
+
+    def __init__(self, group_id: int, key: str, subject: str, fingerprint: Optional[int]):
+        self.id = group_id
+        self.kind = THREAD
+        self.keys = {key}   # Conversations merged into this group
+        self.subject = subject
+        self.speech_subject = normalize_for_speech(subject)
+        self.members: List[str] = []
+        self.fingerprint = fingerprint   # Of the first member; used for near-duplicate lookups
+
+
+class MailGroups:
+    """Incremental grouping of one user's unread mail.
+
+    Messages join a group by conversation first; otherwise by SimHash of
+    subject and snippet, found through LSH band buckets so each message
+    only meets the few groups that share a band with it. Adding or
+    removing a message is O(1) in inbox size, and `refresh` replays only
+    the store's change log since the last call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.cursor = 0
+        self.emails: Dict[str, Dict[str, Any]] = {}
+        self.groups: Dict[int, MailGroup] = {}
+        self._group_of: Dict[str, int] = {}
+        self._by_conversation: Dict[str, int] = {}
+        self._buckets: Dict[int, Set[int]] = {}
+        self._next_id = 1
+
+    def _index(self, group: MailGroup):
+        if group.fingerprint is not None:
+            for band in bands(group.fingerprint):
+                self._buckets.setdefault(band, set()).add(group.id)
+
+    def _unindex(self, group: MailGroup):
+        if group.fingerprint is not None:
+            for band in bands(group.fingerprint):
+                bucket = self._buckets.get(band)
+                if bucket is not None:
+                    bucket.discard(group.id)
+                    if not bucket:
+                        del self._buckets[band]
+
+    def _near_duplicate(self, fingerprint: int) -> Optional[MailGroup]:
+        for band in bands(fingerprint):
+            for group_id in self._buckets.get(band, ()):
+                group = self.groups[group_id]
+                if bin(group.fingerprint ^ fingerprint).count("1") <= MAX_DISTANCE:
+                    return group
+        return None
+
+    def add(self, item_id: str, email: Dict[str, Any]):
+        if item_id in self.emails:
+            self.remove(item_id)
+        self.emails[item_id] = email
+        key = conversation_key(email)
+        tokens = features(email)
+        fingerprint = simhash(tokens) if len(tokens) >= MIN_FEATURES else None
+
+        group = self.groups.get(self._by_conversation.get(key, 0))
+        if group is None and fingerprint is not None:
+            group = self._near_duplicate(fingerprint)
+            if group is not None:
+                # Different conversation, same text: replies to it land here too
+                group.kind = SIMILAR
+                group.keys.add(key)
+                self._by_conversation[key] = group.id
+        if group is None:
+            group = MailGroup(self._next_id, key, thread_subject(email), fingerprint)
+            self._next_id += 1
+            self.groups[group.id] = group
+            self._by_conversation[key] = group.id
+            self._index(group)
+        group.members.append(item_id)
+        self._group_of[item_id] = group.id
+
+    def remove(self, item_id: str):
+        if self.emails.pop(item_id, None) is None:
+            return
+        group = self.groups[self._group_of.pop(item_id)]
+        group.members.remove(item_id)
+        if not group.members:
+            self._unindex(group)
+            del self.groups[group.id]
+            for key in group.keys:
+                if self._by_conversation.get(key) == group.id:
+                    del self._by_conversation[key]
+
+    def refresh(self, store: ChangeLogStore) -> "MailGroups":
+        """Catch up with the store - replays only changes since the last refresh"""
+        with self._lock:
+            if store.cursor == self.cursor:
+                return self
+            changes = store.changes_since(self.cursor) if self.cursor else None
+            if changes is None:
+                # First use, or the log no longer reaches back: regroup from scratch
+                self._reset()
+                for item in store.snapshot():
+                    self.add(store.key(item), item)
+            else:
+                for removed in changes["removed"]:
+                    self.remove(str(removed["id"]))
+                for item in changes["changed"] + changes["added"]:
+                    self.add(store.key(item), item)
+            self.cursor = store.cursor
+            return self
+
+    def collapse(self, emails: List[Dict[str, Any]], key=lambda email: str(email["id"])) -> List[Dict[str, Any]]:
+        """One entry per group, in first-seen order: its newest message plus count, kind and member ids.
+
+        Messages this index hasn't seen are passed through as groups of one.
+        """
+        members: Dict[Any, List[Dict[str, Any]]] = {}
+        for email in emails:
+            item_id = key(email)
+            group_id = self._group_of.get(item_id)
+            members.setdefault(group_id if group_id is not None else ("single", item_id), []).append(email)
+
+        entries = []
+        for group_id, group_emails in members.items():
+            group = self.groups.get(group_id) if not isinstance(group_id, tuple) else None
+            newest = max(group_emails, key=lambda email: email.get("timestamp", ""))
+            entry = dict(newest, count=len(group_emails), member_ids=[email.get("id") for email in group_emails],
+                         kind=group.kind if group else THREAD,
+                         thread_subject=group.subject if group else thread_subject(newest),
+                         speech_thread_subject=group.speech_subject if group else normalize_for_speech(thread_subject(newest)))
+            if any(email.get("priority") == "high" for email in group_emails):
+                entry["priority"] = "high"
+            entries.append(entry)
+        return entries
+
+
+def group_mail(emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse a batch of emails without a persistent index"""
+    groups = MailGroups()
+    for email in emails:
+        groups.add(str(email["id"]), email)
+    return groups.collapse(emails)
+
+
+_user_groups: Dict[str, MailGroups] = {}
+
+def get_mail_groups(user_id: str) -> MailGroups:
+    """A user's mail grouping, caught up with their mail store"""
+    groups = _user_groups.get(user_id)
+    if groups is None:
+        groups = _user_groups[user_id] = MailGroups()
+    return groups.refresh(get_mail_store(user_id))
+
+def forget_mail_groups(user_id: str):
+    """Drop a user's grouping along with their evicted mail store"""
+    _user_groups.pop(user_id, None)
+
+subscribe_evictions(forget_mail_groups)
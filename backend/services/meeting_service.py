@@ -0,0 +1,215 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.services.calendar_service import CalendarEvent, CalendarIndex, format_clock
+from backend.services.change_log import REMOVED, get_calendar_index, get_mail_store, item_hash, subscribe_evictions
+
+# Meeting prep - joins calendar events to related mail through an inverted index
+
+STOPWORDS = {
+    "a", "an", "and", "at", "for", "from", "in", "is", "of", "on", "or",
+    "re", "fw", "fwd", "the", "to", "with", "our", "your", "today", "meeting",
+    "team", "session", "update", "inside",
+}
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+MIN_RELATED_SCORE = 1.0   # Below this an email is only loosely related
+MAX_RELATED_EMAILS = 3    # Keep the spoken brief short
+BRIEF_HORIZON_MINUTES = 120
+
+
+def subject_tokens(text: str) -> Set[str]:
+    """Lowercase subject/title tokens without filler words"""
+    return {token for token in TOKEN_PATTERN.findall(text.lower())
+            if len(token) > 1 and token not in STOPWORDS}
+
+
+def email_domain(address: str) -> str:
+    """Domain part of an address ("" if there is none)"""
+    return address.rsplit("@", 1)[-1].lower() if "@" in address else ""
+
+
+def email_keys(email: Dict[str, Any]) -> Set[str]:
+    """Index keys for an email: sender, sender domain and subject tokens"""
+    sender = email.get("from_email", "").lower()
+    keys = {f"tok:{token}" for token in subject_tokens(email.get("subject", ""))}
+    if sender:
+        keys.add(f"addr:{sender}")
+        keys.add(f"domain:{email_domain(sender)}")
+    return keys
+
+
+def event_keys(event: CalendarEvent) -> Set[str]:
+    """Keys to probe for an event: attendees, attendee domains and title tokens"""
+    keys = {f"tok:{token}" for token in subject_tokens(event.title)}
+    for attendee in event.attendees:
+        keys.add(f"addr:{attendee.lower()}")
+        keys.add(f"domain:{email_domain(attendee)}")
+    return keys
+
+
+class RelatedMailIndex:
+    """Inverted index from sender/domain/subject keys to email ids.
+
+    It is a view on a user's mail store, so emails are indexed as they
+    arrive and dropped as they go. Looking up an event only touches the
+    posting lists of that event's own keys. Matches are weighted by
+    inverse document frequency, so a shared company domain counts for
+    little and a client domain or a rare subject word counts for a lot.
+    `version` moves on every change, which is what invalidates briefs.
+    """
+
+    def __init__(self):
+        self.emails: Dict[str, Dict[str, Any]] = {}
+        self.postings: Dict[str, Set[str]] = defaultdict(set)
+        self.version = 0
+        self._keys: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, op: str, email_id: str, email: Optional[Dict[str, Any]]):
+        """Store view hook: follow one change in the mailbox"""
+        if op == REMOVED:
+            self.remove_email(email_id)
+        else:
+            self.add_email(email)
+
+    def add_email(self, email: Dict[str, Any]):
+        """Index (or re-index) one email"""
+        email_id = str(email["id"])
+        with self._lock:
+            if self.emails.get(email_id) == email:
+                return
+            self._drop(email_id)
+            self.emails[email_id] = email
+            self._keys[email_id] = email_keys(email)
+            for key in self._keys[email_id]:
+                self.postings[key].add(email_id)
+            self.version += 1
+
+    def remove_email(self, email_id: str):
+        """Drop an email from the index"""
+        with self._lock:
+            if self._drop(str(email_id)):
+                self.version += 1
+
+    def _drop(self, email_id: str) -> bool:
+        if self.emails.pop(email_id, None) is None:
+            return False
+        for key in self._keys.pop(email_id, ()):
+            posting = self.postings.get(key)
+            if posting is not None:
+                posting.discard(email_id)
+                if not posting:
+                    del self.postings[key]
+        return True
+
+    def _weight(self, key: str) -> float:
+        matches = len(self.postings.get(key, ()))
+        if not matches:
+            return 0.0
+        return math.log((len(self.emails) + 1) / matches)
+
+    def related_to(self, event: CalendarEvent, limit: int = MAX_RELATED_EMAILS) -> List[Dict[str, Any]]:
+        """Emails related to an event, best match first"""
+        with self._lock:
+            scores: Dict[str, float] = defaultdict(float)
+            for key in event_keys(event):
+                weight = self._weight(key)
+                for email_id in self.postings.get(key, ()):
+                    scores[email_id] += weight
+
+            ranked = sorted(
+                (email_id for email_id, score in scores.items() if score >= MIN_RELATED_SCORE),
+                key=lambda email_id: (-scores[email_id], self.emails[email_id].get("received", "")),
+            )
+            return [self.emails[email_id] for email_id in ranked[:limit]]
+
+
+def event_version(event: CalendarEvent) -> int:
+    """Changes whenever anything a brief shows changes (time, title, place, attendees)"""
+    return item_hash(event.series_id or event.id, {**event.to_dict(), "id": None})
+
+
+def build_meeting_brief(event: CalendarEvent, related: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Speakable brief for one meeting"""
+    speech_parts = [f"Before {event.title} at {format_clock(event.start)}"]
+    if event.location:
+        speech_parts.append(f"It's in {event.location}")
+
+    if related:
+        speech_parts.append(f"You have {len(related)} related email{'s' if len(related) != 1 else ''}")
+        for email in related:
+            speech_parts.append(f"{email.get('from_name', 'Someone')} says {email.get('subject', 'No subject')}")
+    else:
+        speech_parts.append("There are no related emails")
+
+    return {
+        "meeting": event.to_dict(),
+        "related_count": len(related),
+        "related_emails": related,
+        "speech": ". ".join(speech_parts) + ".",
+        "prepared_at": datetime.now().isoformat()
+    }
+
+
+class MeetingBriefService:
+    """Builds meeting briefs and caches them until the meeting or the mail changes.
+
+    Briefs are cached per series (one-off meetings are their own series),
+    so a recurring meeting keeps one entry however many days it occurs on.
+    An entry is reused only while both the event's version and the mail
+    index's version match what it was built from.
+    """
+
+    def __init__(self, mail_index: RelatedMailIndex):
+        self.mail_index = mail_index
+        self._briefs: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+    def get_brief(self, event: CalendarEvent) -> Dict[str, Any]:
+        """Cached brief for an event, rebuilt when the event is edited or related mail changes"""
+        key = event.series_id or event.id
+        version = (event_version(event), self.mail_index.version)
+        cached = self._briefs.get(key)
+        if cached is None or cached[0] != version:
+            cached = self._briefs[key] = (version, build_meeting_brief(event, self.mail_index.related_to(event)))
+        return cached[1]
+
+    def prepare_upcoming(self, calendar: CalendarIndex, now: Optional[datetime] = None,
+                         horizon_minutes: int = BRIEF_HORIZON_MINUTES) -> int:
+        """Build briefs ahead of meetings starting within the horizon"""
+        now = now or datetime.now()
+        upcoming = calendar.overlapping(now, now + timedelta(minutes=horizon_minutes))
+        for event in upcoming:
+            self.get_brief(event)
+        return len(upcoming)
+
+
+_brief_services: Dict[str, MeetingBriefService] = {}
+
+def get_related_mail_index(user_id: str) -> RelatedMailIndex:
+    """A user's related-mail index (a view on their mail store)"""
+    return get_mail_store(user_id).view("related_mail", RelatedMailIndex)
+
+def get_brief_service(user_id: str) -> MeetingBriefService:
+    """A user's brief service over their mailbox"""
+    mail_index = get_related_mail_index(user_id)
+    service = _brief_services.get(user_id)
+    if service is None or service.mail_index is not mail_index:
+        service = _brief_services[user_id] = MeetingBriefService(mail_index)
+    return service
+
+def forget_brief_service(user_id: str):
+    """Drop a user's briefs along with their evicted stores"""
+    _brief_services.pop(user_id, None)
+
+subscribe_evictions(forget_brief_service)
+
+def prepare_upcoming_briefs(user_ids: Iterable[str], now: Optional[datetime] = None) -> int:
+    """Warm briefs for these drivers' upcoming meetings today"""
+    now = now or datetime.now()
+    return sum(get_brief_service(user_id).prepare_upcoming(get_calendar_index(user_id, now.date()), now)
+               for user_id in user_ids)
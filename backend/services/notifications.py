@@ -0,0 +1,207 @@
+import asyncio
+import hmac
+import re
+import secrets
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.config.settings import get_settings
+from backend.services.change_log import CALENDAR, FOLDERS, MAIL, sync_folder
+
+# Upstream change notifications (Graph-style webhooks): validate, coalesce, re-sync only what changed
+
+# users/{id}/messages/{id}, users/{id}/mailFolders('Inbox')/messages/{id}, users/{id}/events/{id}
+RESOURCE_PATTERN = re.compile(r"^/?users/([^/]+)/(?:mailFolders\('?([^'/)]+)'?\)/)?(messages|events)\b", re.IGNORECASE)
+INBOX_NAMES = {"inbox"}   # Only unread inbox mail feeds the digests
+TICK_SECONDS = 0.25
+
+
+@dataclass
+class Subscription:
+    id: str
+    user_id: str
+    folder: str
+    client_state: str    # Shared secret echoed back in every notification
+    expires_at: float    # time.time()
+
+    @property
+    def resource(self) -> str:
+        return f"users/{self.user_id}/mailFolders('Inbox')/messages" if self.folder == MAIL else f"users/{self.user_id}/events"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Shaped like a Graph subscription"""
+        return {
+            "id": self.id,
+            "resource": self.resource,
+            "changeType": "created,updated,deleted",
+            "clientState": self.client_state,
+            "notificationUrl": get_settings().notifications.notification_url,
+            "expirationDateTime": datetime.fromtimestamp(self.expires_at, timezone.utc).isoformat(),
+        }
+
+
+class SubscriptionRegistry:
+    """Live change subscriptions per (user, folder).
+
+    A folder with an unexpired subscription is kept fresh by notifications,
+    so the periodic upstream sync skips it. When a subscription lapses or
+    is removed, polling picks the folder back up on its own.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[str, Subscription] = {}
+        self._lock = threading.Lock()
+
+    def create(self, user_id: str, folder: str, ttl_s: Optional[float] = None) -> Subscription:
+        ttl_s = ttl_s or get_settings().notifications.subscription_ttl_s
+        subscription = Subscription(str(uuid.uuid4()), user_id, folder, secrets.token_urlsafe(24), time.time() + ttl_s)
+        with self._lock:
+            self._by_id[subscription.id] = subscription
+        return subscription
+
+    def get(self, subscription_id: Optional[str]) -> Optional[Subscription]:
+        subscription = self._by_id.get(subscription_id or "")
+        return subscription if subscription is not None and subscription.expires_at > time.time() else None
+
+    def renew(self, subscription_id: str, ttl_s: Optional[float] = None) -> Optional[Subscription]:
+        subscription = self.get(subscription_id)
+        if subscription is not None:
+            subscription.expires_at = time.time() + (ttl_s or get_settings().notifications.subscription_ttl_s)
+        return subscription
+
+    def remove(self, subscription_id: str) -> bool:
+        with self._lock:
+            return self._by_id.pop(subscription_id, None) is not None
+
+    def covers(self, user_id: str, folder: str) -> bool:
+        """True when notifications keep this folder fresh"""
+        now = time.time()
+        return any(s.user_id == user_id and s.folder == folder and s.expires_at > now for s in list(self._by_id.values()))
+
+    def folders_to_poll(self, user_id: str) -> Sequence[str]:
+        """A user's folders that still need upstream polling"""
+        if not get_settings().notifications.enabled:
+            return FOLDERS
+        return [folder for folder in FOLDERS if not self.covers(user_id, folder)]
+
+    def active(self) -> List[Subscription]:
+        now = time.time()
+        with self._lock:
+            for subscription_id in [s.id for s in self._by_id.values() if s.expires_at <= now]:
+                del self._by_id[subscription_id]
+            return list(self._by_id.values())
+
+
+class NotificationCoalescer:
+    """Turns bursts of notifications into one re-sync per (user, folder).
+
+    The first notification for a folder opens a window; everything arriving
+    for it within `coalesce_window_s` rides along. The window is not
+    extended by later arrivals, so a steady stream still syncs regularly.
+    Re-syncs run on the default executor; a folder is never synced twice at
+    once (notifications during a sync open the next window).
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[str, str], float] = {}
+        self._running: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.counters = {"notifications": 0, "syncs": 0, "changes": 0, "failures": 0}
+
+    def add(self, user_id: str, folder: str):
+        self.counters["notifications"] += 1
+        self._pending.setdefault((user_id, folder), time.monotonic())
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def _sync(self, key: Tuple[str, str]):
+        try:
+            changes = await asyncio.get_running_loop().run_in_executor(None, sync_folder, *key)
+            self.counters["syncs"] += 1
+            self.counters["changes"] += changes
+        except Exception as e:
+            self.counters["failures"] += 1
+            print(f"Notification re-sync failed for {key[0]}/{key[1]}: {e}")
+
+    def flush(self, now: Optional[float] = None):
+        """Start re-syncs for every folder whose window has closed"""
+        now = now or time.monotonic()
+        window_s = get_settings().notifications.coalesce_window_s
+        for key, opened in list(self._pending.items()):
+            if now - opened < window_s or key in self._running:
+                continue
+            del self._pending[key]
+            task = asyncio.ensure_future(self._sync(key))
+            self._running[key] = task
+            task.add_done_callback(lambda _, key=key: self._running.pop(key, None))
+
+    async def run(self):
+        while True:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Notification flush failed: {e}")
+            await asyncio.sleep(TICK_SECONDS)
+
+
+def parse_resource(resource: str) -> Optional[Tuple[str, Optional[str], str]]:
+    """(user id, mail folder or None, folder) for a notification resource"""
+    match = RESOURCE_PATTERN.match(resource or "")
+    if not match:
+        return None
+    user_id, mail_folder, kind = match.groups()
+    return user_id, mail_folder, MAIL if kind.lower() == "messages" else CALENDAR
+
+
+def accept_notification(item: Dict[str, Any], registry: SubscriptionRegistry,
+                        coalescer: NotificationCoalescer) -> str:
+    """Validate one notification and queue its re-sync; returns accepted, ignored or rejected"""
+    subscription = registry.get(item.get("subscriptionId"))
+    if subscription is None or not hmac.compare_digest(str(item.get("clientState", "")), subscription.client_state):
+        return "rejected"
+
+    lifecycle = item.get("lifecycleEvent")
+    if lifecycle == "subscriptionRemoved":
+        registry.remove(subscription.id)   # Polling takes over
+        return "accepted"
+    if lifecycle == "missed":
+        # Upstream dropped notifications - re-sync the whole folder
+        coalescer.add(subscription.user_id, subscription.folder)
+        return "accepted"
+    if lifecycle:
+        return "ignored"   # reauthorizationRequired and friends: nothing to sync
+
+    parsed = parse_resource(item.get("resource", ""))
+    if parsed is None:
+        return "rejected"
+    user_id, mail_folder, folder = parsed
+    # The resource must belong to the subscription it claims to come from
+    if user_id.lower() != subscription.user_id.lower() or folder != subscription.folder:
+        return "rejected"
+    if mail_folder is not None and mail_folder.lower() not in INBOX_NAMES:
+        return "ignored"
+    coalescer.add(subscription.user_id, folder)
+    return "accepted"
+
+
+_registry: Optional[SubscriptionRegistry] = None
+_coalescer: Optional[NotificationCoalescer] = None
+
+def get_subscriptions() -> SubscriptionRegistry:
+    """Shared subscription registry"""
+    global _registry
+    if _registry is None:
+        _registry = SubscriptionRegistry()
+    return _registry
+
+def get_coalescer() -> NotificationCoalescer:
+    """Shared notification coalescer"""
+    global _coalescer
+    if _coalescer is None:
+        _coalescer = NotificationCoalescer()
+    return _coalescer
@@ -0,0 +1,42 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from backend.config.settings import get_settings
+from backend.services.change_log import ChangeLogStore
+
+# How long a client can wait before polling a digest again, from how recently the data changed
+
+
+def clamp_interval(seconds: float) -> int:
+    polling = get_settings().polling
+    return int(max(polling.min_interval_s, min(polling.max_interval_s, seconds)))
+
+
+def store_poll_s(store: ChangeLogStore, now: Optional[float] = None) -> int:
+    """Poll soon while changes are arriving, less often the longer the data has been quiet"""
+    quiet_s = (now or time.time()) - store.changed_at
+    return clamp_interval(quiet_s * get_settings().polling.quiet_factor)
+
+
+def calendar_poll_s(store: ChangeLogStore, digest: Dict[str, Any], now: Optional[datetime] = None) -> int:
+    """Like store_poll_s, but a few polls are fitted in before the next meeting starts"""
+    interval = store_poll_s(store)
+    next_meeting = digest.get("next_meeting") or {}
+    if next_meeting.get("start"):
+        until_s = (datetime.fromisoformat(next_meeting["start"]) - (now or datetime.now())).total_seconds()
+        if 0 <= until_s <= get_settings().polling.meeting_window_s:
+            interval = min(interval, clamp_interval(until_s / 4))
+    return interval
+
+
+def digest_poll_s(store: ChangeLogStore, digest: Dict[str, Any], calendar: bool = False) -> int:
+    """Hint for one digest response (a degraded answer asks to be fetched again soon)"""
+    if digest.get("degraded"):
+        return get_settings().polling.min_interval_s
+    return calendar_poll_s(store, digest) if calendar else store_poll_s(store)
+
+
+def is_prefetch(headers: Any) -> bool:
+    """Background refreshes say so (Purpose: prefetch) and don't count as driver activity"""
+    return (headers.get("purpose") or headers.get("sec-purpose") or "").startswith("prefetch")
@@ -0,0 +1,175 @@
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from backend.config.settings import RateLimitSettings, get_settings
+
+# Token-bucket rate limiting per (user, device) with swappable bucket storage
+
+# Optional Redis-compatible backend for multi-worker deployments (asyncio client, so a
+# round trip never blocks the event loop)
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+SWEEP_EVERY = 1000   # Memory backend drops full (idle) buckets every N takes
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+class BucketBackend:
+    """Where token buckets live"""
+
+    name = "base"
+
+    async def take(self, key: str, rate: float, burst: int) -> Decision:
+        """Refill the bucket for elapsed time, then take one token if there is one"""
+        raise NotImplementedError
+
+
+class MemoryBackend(BucketBackend):
+    """Buckets in this process - right for a single worker"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}   # key -> (tokens, updated)
+        self._lock = threading.Lock()
+        self._takes = 0
+
+    async def take(self, key: str, rate: float, burst: int) -> Decision:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+
+            self._takes += 1
+            if self._takes % SWEEP_EVERY == 0:
+                self._sweep(now, rate, burst)
+        return Decision(allowed, int(tokens), 0.0 if allowed else (1.0 - tokens) / rate)
+
+    def _sweep(self, now: float, rate: float, burst: int):
+        # A bucket that has refilled completely is the same as no bucket
+        for key in [key for key, (tokens, updated) in self._buckets.items()
+                    if tokens + (now - updated) * rate >= burst]:
+            del self._buckets[key]
+
+
+# Refill and take in one round trip; time comes from the server so workers agree
+TAKE_SCRIPT = """
+local burst = tonumber(ARGV[2])
+local rate = tonumber(ARGV[1])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend(BucketBackend):
+    """Buckets in Redis (or a compatible local server) - shared by every worker"""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis is not installed")
+        self._client = aioredis.Redis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> Decision:
+        allowed, tokens = await self._take(keys=[f"zendrive:ratelimit:{key}"], args=[rate, burst])
+        tokens = float(tokens)
+        return Decision(bool(allowed), int(tokens), 0.0 if allowed else (1.0 - tokens) / rate)
+
+
+def create_backend(settings: RateLimitSettings) -> BucketBackend:
+    """Backend named in the settings (memory unless redis is configured)"""
+    if settings.backend == "redis":
+        return RedisBackend(settings.redis_url)
+    return MemoryBackend()
+
+
+def client_key(request: Request) -> str:
+    """Bucket key: the driver plus the device they are calling from"""
+    user_id = request.headers.get("x-user-id") or request.query_params.get("user_id") or "default"
+    device = request.headers.get("x-device-id") or (request.client.host if request.client else "unknown")
+    return f"{user_id}:{device}"
+
+
+def bucket_for(path: str, settings: RateLimitSettings) -> Optional[Tuple[str, float, int]]:
+    """(bucket prefix, rate, burst) for a path, or None when it isn't limited"""
+    if path.startswith(settings.fleet_paths):
+        # One batch builds digests for up to fleet.max_users drivers - far dearer than one digest
+        return "fleet:", settings.fleet_rate_per_s, settings.fleet_burst
+    if path.startswith(settings.paths):
+        return "", settings.rate_per_s, settings.burst
+    return None
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Token bucket per (user, device) on the digest endpoints, and a stricter one on fleet batches.
+
+    Each key refills at `rate_per_s` up to `burst` tokens and every request
+    takes one, so a client can burst briefly but not sustain more than the
+    rate. Over-limit requests get 429 with a Retry-After hint before any
+    digest work happens. Limits are read from the live settings on each
+    request; the backend is rebuilt only when its configuration changes.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._backend: Optional[BucketBackend] = None
+        self._backend_config: Optional[Tuple[str, str]] = None
+
+    def backend(self, settings: RateLimitSettings) -> BucketBackend:
+        config = (settings.backend, settings.redis_url)
+        if self._backend is None or config != self._backend_config:
+            self._backend = create_backend(settings)
+            self._backend_config = config
+        return self._backend
+
+    async def dispatch(self, request: Request, call_next):
+        settings = get_settings().rate_limit
+        bucket = bucket_for(request.url.path, settings) if settings.enabled else None
+        if bucket is None:
+            return await call_next(request)
+
+        prefix, rate, burst = bucket
+        decision = await self.backend(settings).take(prefix + client_key(request), rate, burst)
+        if not decision.allowed:
+            retry_after = max(1, int(decision.retry_after + 0.999))
+            return JSONResponse(
+                status_code=429,
+                content={"error": "rate_limited", "message": f"Too many requests, retry after {retry_after}s",
+                         "success": False},
+                headers={"Retry-After": str(retry_after), "X-RateLimit-Remaining": "0"}
+            )
+
+        response = await call_next(request)
+        response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
+        return response
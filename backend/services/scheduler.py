@@ -0,0 +1,160 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.config.settings import Settings, get_settings
+from backend.services.audio_service import get_audio_cache
+from backend.services.change_log import sync_user
+from backend.services.digest_service import get_calendar_digest, get_mail_digest, get_priority_digest
+from backend.services.notifications import get_subscriptions
+
+# Keeps digests for active drivers warm so their requests never pay for a rebuild
+
+TICK_SECONDS = 1.0
+
+
+class ActivityTracker:
+    """Last wake/command time per driver"""
+
+    def __init__(self, window_s: Optional[float] = None):
+        self._window_s = window_s
+        self._last_seen: Dict[str, float] = {}
+
+    @property
+    def window_s(self) -> float:
+        return self._window_s or get_settings().scheduler.active_window_s
+
+    def touch(self, user_id: str, now: Optional[float] = None) -> bool:
+        """Record activity; True if the driver just became active"""
+        now = now or time.monotonic()
+        was_active = self.is_active(user_id, now)
+        self._last_seen[user_id] = now
+        return not was_active
+
+    def is_active(self, user_id: str, now: Optional[float] = None) -> bool:
+        seen = self._last_seen.get(user_id)
+        return seen is not None and (now or time.monotonic()) - seen <= self.window_s
+
+    def active_users(self, now: Optional[float] = None) -> List[str]:
+        """Active drivers; anyone idle past the window is forgotten"""
+        now = now or time.monotonic()
+        window_s = self.window_s
+        for user_id in [u for u, seen in self._last_seen.items() if now - seen > window_s]:
+            del self._last_seen[user_id]
+        return list(self._last_seen)
+
+
+def refresh_user(user_id: str) -> List[str]:
+    """Sync a driver's stores and rebuild their digests; returns the speech scripts"""
+    # Folders covered by change notifications are already up to date
+    sync_user(user_id, folders=get_subscriptions().folders_to_poll(user_id))
+    return [get_mail_digest(user_id)["speech"],
+            get_priority_digest(user_id)["speech"],
+            get_calendar_digest(user_id)["speech"]]
+
+
+class RefreshScheduler:
+    """Refreshes active drivers on jittered intervals under a global concurrency cap.
+
+    Each driver gets their own next-due time, spread out by random jitter, so
+    drivers who woke the app together don't all refresh on the same tick. A
+    driver who becomes active is refreshed immediately. At most
+    `max_concurrent` refreshes run at once, and a driver is never refreshed
+    twice concurrently.
+    """
+
+    def __init__(self, tracker: Optional[ActivityTracker] = None,
+                 interval_s: Optional[float] = None,
+                 max_concurrent: Optional[int] = None,
+                 warm_audio: bool = True):
+        self.tracker = tracker or ActivityTracker()
+        self._interval_s = interval_s
+        self.warm_audio = warm_audio
+        self.max_concurrent = max_concurrent or get_settings().scheduler.max_concurrent
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._next_due: Dict[str, float] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self.counters = {"refreshes": 0, "failures": 0, "audio_warmed": 0}
+        self.last_duration_ms: Optional[float] = None
+
+    def _jittered(self) -> float:
+        scheduler = get_settings().scheduler
+        interval_s = self._interval_s or scheduler.refresh_interval_s
+        return interval_s * random.uniform(1 - scheduler.refresh_jitter, 1 + scheduler.refresh_jitter)
+
+    def resize(self, previous: Settings, current: Settings):
+        """Settings listener: apply a new concurrency cap to refreshes started from now on"""
+        if previous.scheduler.max_concurrent != current.scheduler.max_concurrent:
+            self.max_concurrent = current.scheduler.max_concurrent
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+    def record_activity(self, user_id: str):
+        """Driver woke the app or issued a command"""
+        if self.tracker.touch(user_id):
+            self._next_due[user_id] = 0.0   # Newly active: refresh on the next tick
+
+    async def _refresh(self, user_id: str):
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                scripts = await asyncio.get_running_loop().run_in_executor(None, refresh_user, user_id)
+                if self.warm_audio:
+                    await self._warm_audio(scripts)
+                self.counters["refreshes"] += 1
+            except Exception as e:
+                self.counters["failures"] += 1
+                print(f"Digest refresh failed for {user_id}: {e}")
+            finally:
+                self.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                self._next_due[user_id] = time.monotonic() + self._jittered()
+
+    async def _warm_audio(self, scripts: List[str]):
+        """Render speech ahead of time (skipped when no engine is installed)"""
+        cache = get_audio_cache()
+        if cache.engine_name is None:
+            return
+        for script in scripts:
+            await cache.get_or_render(script)
+            self.counters["audio_warmed"] += 1
+
+    def tick(self, now: Optional[float] = None):
+        """Start refreshes for every active driver who is due"""
+        now = now or time.monotonic()
+        active = self.tracker.active_users(now)
+        for user_id in list(self._next_due):
+            if user_id not in active:
+                del self._next_due[user_id]
+        for user_id in active:
+            if self._next_due.setdefault(user_id, 0.0) > now or user_id in self._running:
+                continue
+            task = asyncio.ensure_future(self._refresh(user_id))
+            self._running[user_id] = task
+            task.add_done_callback(lambda _, user_id=user_id: self._running.pop(user_id, None))
+
+    async def run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Refresh scheduler tick failed: {e}")
+            await asyncio.sleep(TICK_SECONDS)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "active_users": len(self._next_due),
+            "running": len(self._running),
+            "max_concurrent": self.max_concurrent,
+            "last_refresh_ms": self.last_duration_ms,
+        }
+
+
+_scheduler: Optional[RefreshScheduler] = None
+
+def get_refresh_scheduler() -> RefreshScheduler:
+    """Shared refresh scheduler"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RefreshScheduler()
+    return _scheduler
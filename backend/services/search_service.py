@@ -0,0 +1,232 @@
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.services.change_log import DEFAULT_USER, REMOVED, get_mail_store
+
+# Mail search - incremental inverted index with prefix and fuzzy (ASR-tolerant) matching
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+SEARCH_STOPWORDS = {
+    "a", "an", "and", "any", "anything", "about", "are", "at", "by", "email",
+    "emails", "for", "from", "have", "i", "in", "is", "mail", "mails", "me",
+    "message", "messages", "my", "of", "on", "or", "the", "to", "with",
+}
+
+# Field bits stored in the postings
+SENDER, SUBJECT, BODY = 1, 2, 4
+FIELD_WEIGHTS = {SENDER: 3.0, SUBJECT: 2.0, BODY: 1.0}
+
+EXACT_MATCH, PREFIX_MATCH, FUZZY_MATCH = 1.0, 0.8, 0.6
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 50
+MIN_FUZZY_LENGTH = 4
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def deletes(term: str) -> Set[str]:
+    """All single-character deletions of a term (SymSpell-style neighbourhood)"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insert, delete, substitution or swap"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def email_fields(email: Dict[str, Any]) -> Dict[int, str]:
+    """Searchable text per field (accepts both the digest and Graph-style shapes)"""
+    sender = " ".join(filter(None, [
+        email.get("sender") or email.get("from_name", ""),
+        email.get("from_email", "").replace("@", " ").replace(".", " "),
+    ]))
+    return {
+        SENDER: sender,
+        SUBJECT: email.get("subject", ""),
+        BODY: email.get("snippet") or email.get("preview", ""),
+    }
+
+
+class MailSearchIndex:
+    """Inverted index over sender, subject and snippet.
+
+    Postings map each term to {email id: field bits}. A sorted vocabulary
+    handles prefix matches, and a deletion-neighbourhood map handles
+    one-edit typos, so each query token costs a few dict lookups plus a
+    binary search, however large the mailbox is. Emails are added and
+    removed one at a time: as a view on a mail store, the index follows
+    every change the store logs.
+    """
+
+    def __init__(self):
+        self.emails: Dict[str, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.vocabulary: List[str] = []
+        self.neighbours: Dict[str, Set[str]] = defaultdict(set)
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.emails)
+
+    def apply(self, op: str, email_id: str, email: Optional[Dict[str, Any]]):
+        """Store view hook: follow one change in the mailbox"""
+        if op == REMOVED:
+            self.remove_email(email_id)
+        else:
+            self.add_email(email)
+
+    def add_email(self, email: Dict[str, Any]):
+        """Index (or re-index) one email"""
+        with self._lock:
+            self._add(email)
+
+    def _add(self, email: Dict[str, Any]):
+        email_id = str(email["id"])
+        if email_id in self.emails:
+            self._remove(email_id)
+        self.emails[email_id] = email
+
+        fields: Dict[str, int] = defaultdict(int)
+        for field, text in email_fields(email).items():
+            for term in tokenize(text):
+                fields[term] |= field
+
+        for term, bits in fields.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                insort(self.vocabulary, term)
+                if len(term) >= MIN_FUZZY_LENGTH:
+                    for variant in deletes(term) | {term}:
+                        self.neighbours[variant].add(term)
+            posting[email_id] = bits
+        self._doc_terms[email_id] = set(fields)
+
+    def remove_email(self, email_id: str):
+        """Drop an email from the index (terms with no emails left are pruned)"""
+        with self._lock:
+            self._remove(str(email_id))
+
+    def _remove(self, email_id: str):
+        self.emails.pop(email_id, None)
+        for term in self._doc_terms.pop(email_id, ()):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(email_id, None)
+            if not posting:
+                del self.postings[term]
+                del self.vocabulary[bisect_left(self.vocabulary, term)]
+                if len(term) >= MIN_FUZZY_LENGTH:
+                    for variant in deletes(term) | {term}:
+                        self.neighbours[variant].discard(term)
+                        if not self.neighbours[variant]:
+                            del self.neighbours[variant]
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        start = bisect_left(self.vocabulary, prefix)
+        matches = []
+        for term in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                matches.append(term)
+        return matches
+
+    def _fuzzy_terms(self, token: str) -> List[str]:
+        candidates: Set[str] = set()
+        for variant in deletes(token) | {token}:
+            candidates |= self.neighbours.get(variant, set())
+        return [term for term in candidates if term != token and within_one_edit(token, term)]
+
+    def expand(self, token: str) -> List[Tuple[str, float]]:
+        """Index terms a query token can match, with a match-quality factor"""
+        expansions = []
+        if token in self.postings:
+            expansions.append((token, EXACT_MATCH))
+        if len(token) >= MIN_PREFIX_LENGTH:
+            expansions.extend((term, PREFIX_MATCH) for term in self._prefix_terms(token))
+        if not expansions and len(token) >= MIN_FUZZY_LENGTH:
+            expansions.extend((term, FUZZY_MATCH) for term in self._fuzzy_terms(token))
+        return expansions
+
+    def search(self, query: str = "", sender: Optional[str] = None,
+               limit: int = 10) -> List[Dict[str, Any]]:
+        """Ranked emails matching the query text and/or sender name
+
+        Every query token has to match (exactly, by prefix or by one typo);
+        sender tokens only match the sender field.
+        """
+        clauses = [(token, SENDER | SUBJECT | BODY) for token in tokenize(query)
+                   if token not in SEARCH_STOPWORDS]
+        clauses += [(token, SENDER) for token in tokenize(sender or "")]
+        if not clauses:
+            return []
+        with self._lock:
+            return self._search(clauses, limit)
+
+    def _search(self, clauses: List[Tuple[str, int]], limit: int) -> List[Dict[str, Any]]:
+        total = len(self.emails) + 1
+        scores: Optional[Dict[str, float]] = None
+        for token, allowed in clauses:
+            token_scores: Dict[str, float] = {}
+            for term, quality in self.expand(token):
+                posting = self.postings[term]
+                idf = math.log(total / len(posting)) + 1.0
+                for email_id, bits in posting.items():
+                    matched = bits & allowed
+                    if not matched:
+                        continue
+                    weight = max(w for field, w in FIELD_WEIGHTS.items() if matched & field)
+                    score = quality * weight * idf
+                    if score > token_scores.get(email_id, 0.0):
+                        token_scores[email_id] = score
+
+            # Intersect as we go, so later tokens only rescore surviving emails
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {email_id: scores[email_id] + score
+                          for email_id, score in token_scores.items() if email_id in scores}
+            if not scores:
+                return []
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [dict(self.emails[email_id], score=round(score, 3)) for email_id, score in best]
+
+
+def build_search_index(emails: Iterable[Dict[str, Any]]) -> MailSearchIndex:
+    """Index a batch of emails"""
+    index = MailSearchIndex()
+    for email in emails:
+        index.add_email(email)
+    return index
+
+
+def get_search_index(user_id: str = DEFAULT_USER) -> MailSearchIndex:
+    """A user's search index (a view on their mail store, updated as mail arrives and goes)"""
+    return get_mail_store(user_id).view("search", MailSearchIndex)
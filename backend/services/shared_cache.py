@@ -0,0 +1,175 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from backend.config.settings import CacheSettings
+from backend.utils.storage import data_path
+
+# Cache tier shared by every worker process on a box, with invalidation fan-out
+
+# Optional Redis-compatible tier
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+INVALIDATION_POLL_SECONDS = 0.5
+INVALIDATION_HISTORY = 10000   # Invalidation rows kept in the SQLite tier
+
+
+def encode_version(version: Hashable) -> str:
+    return json.dumps(version, default=str)
+
+
+class SharedTier:
+    """Digests shared between workers, plus pub/sub of "user changed" messages.
+
+    Messages carry the publishing process id so a worker ignores its own.
+    """
+
+    name = "none"
+
+    def get(self, user_id: str, section: str, version: Hashable) -> Optional[Dict[str, Any]]:
+        return None
+
+    def put(self, user_id: str, section: str, version: Hashable, digest: Dict[str, Any]):
+        pass
+
+    def publish(self, user_id: str):
+        pass
+
+    def listen(self, callback: Callable[[str], None]):
+        """Call callback(user_id) for every invalidation another worker publishes"""
+
+
+class SqliteTier(SharedTier):
+    """One SQLite file in WAL mode - no extra services, works across processes on one box.
+
+    Invalidations are rows with an increasing sequence number; each worker
+    polls for rows after the last one it saw, which is a single indexed
+    range read when nothing changed.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None, ttl_s: float = 3600.0):
+        self.path = str(path or data_path("shared_digests.db"))
+        self.ttl_s = ttl_s
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS digests (
+                user_id TEXT NOT NULL, section TEXT NOT NULL, version TEXT NOT NULL,
+                payload TEXT NOT NULL, stored_at REAL NOT NULL,
+                PRIMARY KEY (user_id, section)
+            )""")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS invalidations (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, origin INTEGER NOT NULL
+            )""")
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+
+    def get(self, user_id: str, section: str, version: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload FROM digests WHERE user_id = ? AND section = ? AND version = ? AND stored_at > ?",
+                (user_id, section, encode_version(version), time.time() - self.ttl_s),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, user_id: str, section: str, version: Hashable, digest: Dict[str, Any]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO digests (user_id, section, version, payload, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (user_id, section, encode_version(version), json.dumps(digest, default=str), time.time()),
+            )
+
+    def publish(self, user_id: str):
+        with self._lock:
+            seq = self._db.execute("INSERT INTO invalidations (user_id, origin) VALUES (?, ?)",
+                                   (user_id, os.getpid())).lastrowid
+            if seq % 1000 == 0:
+                self._db.execute("DELETE FROM invalidations WHERE seq <= ?", (seq - INVALIDATION_HISTORY,))
+
+    def listen(self, callback: Callable[[str], None]):
+        if self._listener is not None:
+            return
+        with self._lock:
+            last_seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM invalidations").fetchone()[0]
+
+        def poll(last_seq: int):
+            while True:
+                time.sleep(INVALIDATION_POLL_SECONDS)
+                try:
+                    with self._lock:
+                        rows = self._db.execute(
+                            "SELECT seq, user_id, origin FROM invalidations WHERE seq > ? ORDER BY seq", (last_seq,)
+                        ).fetchall()
+                    for seq, user_id, origin in rows:
+                        last_seq = seq
+                        if origin != os.getpid():
+                            callback(user_id)
+                except Exception as e:
+                    print(f"Invalidation poll failed: {e}")
+
+        self._listener = threading.Thread(target=poll, args=(last_seq,), name="invalidation-listener", daemon=True)
+        self._listener.start()
+
+
+class RedisTier(SharedTier):
+    """Redis or a compatible server - shared across boxes, with native pub/sub"""
+
+    name = "redis"
+    CHANNEL = "zendrive:invalidate"
+
+    def __init__(self, url: str, ttl_s: float = 3600.0):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis is not installed")
+        self._client = redis.Redis.from_url(url)
+        self.ttl_s = ttl_s
+        self._pubsub = None
+
+    def _key(self, user_id: str, section: str) -> str:
+        return f"zendrive:digest:{user_id}:{section}"
+
+    def get(self, user_id: str, section: str, version: Hashable) -> Optional[Dict[str, Any]]:
+        raw = self._client.get(self._key(user_id, section))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["digest"] if entry["version"] == encode_version(version) else None
+
+    def put(self, user_id: str, section: str, version: Hashable, digest: Dict[str, Any]):
+        entry = {"version": encode_version(version), "digest": digest}
+        self._client.set(self._key(user_id, section), json.dumps(entry, default=str), ex=int(self.ttl_s))
+
+    def publish(self, user_id: str):
+        self._client.publish(self.CHANNEL, json.dumps({"user_id": user_id, "origin": os.getpid()}))
+
+    def listen(self, callback: Callable[[str], None]):
+        if self._pubsub is not None:
+            return
+
+        def handle(message):
+            payload = json.loads(message["data"])
+            if payload["origin"] != os.getpid():
+                callback(payload["user_id"])
+
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.CHANNEL: handle})
+        self._pubsub.run_in_thread(sleep_time=INVALIDATION_POLL_SECONDS, daemon=True)
+
+
+def create_shared_tier(settings: CacheSettings) -> SharedTier:
+    """Tier named in the settings; "none" keeps every cache process-local"""
+    if settings.shared_tier == "sqlite":
+        return SqliteTier(settings.shared_path, settings.shared_ttl_s)
+    if settings.shared_tier == "redis":
+        return RedisTier(settings.redis_url, settings.shared_ttl_s)
+    return SharedTier()
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Callable, Dict, Hashable
+
+from backend.services.deadline import DeadlineExceeded, current_deadline, remaining, run_until, within_deadline
+
+# Request coalescing: concurrent identical requests share one in-flight computation
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers that arrive meanwhile await it.
+
+    Work runs on the default thread pool so the event loop keeps serving
+    other requests while a digest is built. Nothing is cached once the call
+    finishes - the next request after that starts a fresh one.
+
+    The call runs under the deadline of the request that started it. If
+    that deadline cuts it short, callers with time left start it again.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.counters = {"calls": 0, "shared": 0}
+
+    async def run(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        while True:
+            flight = self._flights.get(key)
+            if flight is None or flight.done():
+                self.counters["calls"] += 1
+                flight = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(
+                    None, run_until, current_deadline(), fn, *args))
+                self._flights[key] = flight
+                flight.add_done_callback(lambda done: self._land(key, done))
+            else:
+                self.counters["shared"] += 1
+            try:
+                # Shielded so one caller disconnecting (or hitting its deadline) doesn't cancel everyone else's result
+                return await within_deadline(asyncio.shield(flight))
+            except DeadlineExceeded:
+                left = remaining()
+                if left is not None and left <= 0:
+                    raise
+                # Another caller's deadline stopped the shared call; ours hasn't passed
+
+    def _land(self, key: Hashable, flight: asyncio.Future):
+        # A retry may already have replaced the entry with a newer call
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def metrics(self) -> Dict[str, int]:
+        return {**self.counters, "in_flight": len(self._flights)}
+
+
+digest_flights = SingleFlight()
@@ -0,0 +1,135 @@
+import math
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+from backend.config.settings import get_settings
+from backend.services.speech_text import spoken
+
+# Spoken-time estimates and picking the most valuable readout that fits a time budget
+
+TIME_STEP_S = 0.1        # Knapsack resolution
+MAX_CANDIDATES = 64      # Only the most valuable items are considered - nothing past this fits a voice budget
+PRIORITY_VALUE = {"high": 10.0, "medium": 5.0, "normal": 3.0, "low": 1.0}
+RECENCY_DECAY = 0.1      # Each later position in the inbox is worth a little less
+
+SENTENCE_END = re.compile(r"[.!?:](\s|$)")
+
+
+def speech_seconds(text: str) -> float:
+    """Rough time to speak text: words at the configured rate plus a pause per sentence"""
+    voice = get_settings().voice
+    words = len(text.split())
+    sentences = max(1, len(SENTENCE_END.findall(text))) if words else 0
+    return words / voice.words_per_second + sentences * voice.sentence_pause_s
+
+
+def email_value(email: Dict[str, Any], rank: int) -> float:
+    """How much hearing this email is worth - priority first, newer before older, busy threads a bit more"""
+    value = PRIORITY_VALUE.get(email.get("priority", "normal"), 1.0) / (1 + RECENCY_DECAY * rank)
+    return value * (1 + math.log(email.get("count", 1)))
+
+
+def select_within_budget(costs: Sequence[float], values: Sequence[float], budget_s: float) -> List[int]:
+    """0/1 knapsack over time: indexes of the most valuable items that fit, in input order"""
+    if budget_s <= 0 or not costs:
+        return []
+    candidates = sorted(range(len(costs)), key=lambda i: -values[i])[:MAX_CANDIDATES]
+    capacity = int(budget_s / TIME_STEP_S + 1e-9)
+    weights = {i: max(1, math.ceil(costs[i] / TIME_STEP_S - 1e-9)) for i in candidates}
+
+    best = [0.0] * (capacity + 1)
+    taken = []   # taken[n][w]: candidate n is in the best set for capacity w
+    for i in candidates:
+        weight = weights[i]
+        row = [False] * (capacity + 1)
+        for w in range(capacity, weight - 1, -1):
+            with_item = best[w - weight] + values[i]
+            if with_item > best[w]:
+                best[w] = with_item
+                row[w] = True
+        taken.append(row)
+
+    chosen = []
+    w = capacity
+    for n in range(len(candidates) - 1, -1, -1):
+        if taken[n][w]:
+            chosen.append(candidates[n])
+            w -= weights[candidates[n]]
+    return sorted(chosen)
+
+
+def message_count(emails: List[Dict[str, Any]]) -> int:
+    """Messages behind a list of digest entries (a collapsed thread counts all of its messages)"""
+    return sum(email.get("count", 1) for email in emails)
+
+
+def group_line(email: Dict[str, Any]) -> str:
+    """A collapsed thread or set of near-identical messages, spoken as one item"""
+    if email.get("kind") == "similar":
+        return f"{email['count']} similar messages, like {spoken(email, 'sender')}: {spoken(email, 'subject')}"
+    return f"{email['count']} messages in the {spoken(email, 'thread_subject')} thread, latest from {spoken(email, 'sender')}"
+
+
+def priority_line(email: Dict[str, Any]) -> str:
+    return group_line(email) if email.get("count", 1) > 1 else f"{spoken(email, 'sender')} says {spoken(email, 'subject')}"
+
+
+def other_line(email: Dict[str, Any]) -> str:
+    return group_line(email) if email.get("count", 1) > 1 else f"{spoken(email, 'sender')}: {spoken(email, 'subject')}"
+
+
+def plan_mail_readout(priority_emails: List[Dict[str, Any]], regular_emails: List[Dict[str, Any]],
+                      budget_s: float) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """Priority and other emails to read in budget_s, and how many messages are left out.
+
+    Section headers only cost time when their section is read, so each
+    combination of sections is tried and the most valuable plan wins. Time
+    for a closing "Plus N more" is set aside whenever not everything fits.
+    """
+    total = message_count(priority_emails) + message_count(regular_emails)
+    priority_header_s = speech_seconds("Priority emails:")
+    other_header_s = speech_seconds("Other emails:")
+    everything_s = (sum(speech_seconds(priority_line(email)) for email in priority_emails)
+                    + sum(speech_seconds(other_line(email)) for email in regular_emails)
+                    + (priority_header_s if priority_emails else 0)
+                    + (other_header_s if priority_emails and regular_emails else 0))
+    if everything_s <= budget_s:
+        return priority_emails, regular_emails, 0
+
+    tail_s = speech_seconds(f"Plus {total} more emails from various senders.")
+
+    lines = [(email, priority_line(email)) for email in priority_emails] + \
+            [(email, other_line(email)) for email in regular_emails]
+    costs = [speech_seconds(line) for _, line in lines]
+    values = [email_value(email, rank) for rank, email in enumerate(priority_emails)] + \
+             [email_value(email, rank) for rank, email in enumerate(regular_emails)]
+    in_priority = [i < len(priority_emails) for i in range(len(lines))]
+
+    best: Tuple[List[int], float] = ([], 0.0)
+    for use_priority in ([False, True] if priority_emails else [False]):
+        for use_regular in ([False, True] if regular_emails else [False]):
+            headers_s = (priority_header_s if use_priority else 0) + \
+                        (other_header_s if use_priority and use_regular else 0)
+            allowed = [i for i in range(len(lines)) if (use_priority if in_priority[i] else use_regular)]
+            chosen = select_within_budget([costs[i] for i in allowed], [values[i] for i in allowed],
+                                          budget_s - tail_s - headers_s)
+            value = sum(values[allowed[n]] for n in chosen)
+            if value > best[1]:
+                best = ([allowed[n] for n in chosen], value)
+
+    chosen = set(best[0])
+    spoken_priority = [email for i, (email, _) in enumerate(lines) if i in chosen and in_priority[i]]
+    spoken_regular = [email for i, (email, _) in enumerate(lines) if i in chosen and not in_priority[i]]
+    return spoken_priority, spoken_regular, total - message_count(spoken_priority) - message_count(spoken_regular)
+
+
+def plan_priority_readout(priority_emails: List[Dict[str, Any]], budget_s: float) -> Tuple[List[Dict[str, Any]], int]:
+    """Priority emails to read in budget_s, and how many messages are left out"""
+    costs = [speech_seconds(priority_line(email)) for email in priority_emails]
+    if sum(costs) <= budget_s:
+        return priority_emails, 0
+    values = [email_value(email, rank) for rank, email in enumerate(priority_emails)]
+    chosen = select_within_budget(costs, values,
+                                  budget_s - speech_seconds(f"Plus {message_count(priority_emails)} more."))
+    spoken = [priority_emails[i] for i in chosen]
+    return spoken, message_count(priority_emails) - message_count(spoken)
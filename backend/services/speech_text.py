@@ -0,0 +1,85 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+# Text -> speakable text: precompiled rules, applied once per message at ingest
+
+REPLY_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|wg)\s*(\[\d+\])?\s*:\s*|\[[^\]]*\]\s*)+", re.IGNORECASE)
+
+ABBREVIATIONS = {
+    "asap": "as soon as possible", "fyi": "for your information", "eod": "end of day",
+    "eow": "end of week", "eta": "E T A", "mtg": "meeting", "dept": "department",
+    "approx": "approximately", "w/": "with", "w/o": "without", "vs": "versus",
+    "e.g.": "for example", "i.e.": "that is", "etc.": "and so on",
+    "q&a": "Q and A", "r&d": "R and D", "faq": "F A Q", "tbd": "to be decided",
+}
+# The abbreviation's own period goes too when the sentence carries on ("approx. 5 minutes")
+ABBREVIATION = re.compile(
+    r"(?<![\w/])(" + "|".join(re.escape(word) for word in sorted(ABBREVIATIONS, key=len, reverse=True)) + r")(?![\w/])"
+    r"(?:\.(?=\s+(?-i:[a-z\d])))?",
+    re.IGNORECASE)
+
+URL = re.compile(r"\b(?:https?://|www\.)([a-z0-9.-]+)[^\s]*", re.IGNORECASE)
+EMAIL = re.compile(r"\b([a-z0-9._%+-]+)@([a-z0-9.-]+\.[a-z]{2,})\b", re.IGNORECASE)
+PERCENT = re.compile(r"(\d+(?:\.\d+)?)\s?%")
+CLOCK = re.compile(r"\b(\d{1,2}):(\d{2})\s*([ap])\.?m\b\.?", re.IGNORECASE)
+HOUR = re.compile(r"\b(\d{1,2})\s*([ap])\.?m\b\.?", re.IGNORECASE)
+CLOCK_24H = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b(?!\s*[AaPp]\.?[Mm]\b)")   # Not a 12-hour time already
+QUARTER = re.compile(r"\bQ([1-4])\b")
+NUMBER_SIGN = re.compile(r"#\s?(\d+)")
+# URGENT, IMPORTANT - read as words. Short tokens (PDF, GDPR) and vowel-less ones (HTTPS) are acronyms: left alone
+SHOUTED = re.compile(r"\b(?=[A-Z]*[AEIOU])[A-Z]{5,}\b")
+AMPERSAND = re.compile(r"\s&\s")
+NOISE = re.compile(r"[*_~^|<>{}\[\]\\]+|[\U0001F000-\U0001FAFF☀-➿]")
+SPACES = re.compile(r"\s+")
+
+
+def _clock(hour: int, minute: int, half: str) -> str:
+    return f"{hour} {half.upper()}M" if minute == 0 else f"{hour}:{minute:02d} {half.upper()}M"
+
+
+def _clock_24h(match: "re.Match") -> str:
+    hour, minute = int(match.group(1)), int(match.group(2))
+    return _clock(hour % 12 or 12, minute, "a" if hour < 12 else "p")
+
+
+# Order matters: links and addresses go before anything that rewrites dots or words
+RULES: List[Tuple["re.Pattern", Union[str, Callable[["re.Match"], str]]]] = [
+    (URL, lambda m: "a link to " + m.group(1).removeprefix("www.").replace(".", " dot ")),
+    (EMAIL, lambda m: f"{m.group(1).replace('.', ' dot ')} at {m.group(2).replace('.', ' dot ')}"),
+    (PERCENT, r"\1 percent"),
+    (CLOCK, lambda m: _clock(int(m.group(1)), int(m.group(2)), m.group(3))),
+    (HOUR, lambda m: _clock(int(m.group(1)), 0, m.group(2))),
+    (CLOCK_24H, _clock_24h),
+    (QUARTER, r"Q \1"),
+    (NUMBER_SIGN, r"number \1"),
+    (ABBREVIATION, lambda m: ABBREVIATIONS[m.group(1).lower()]),
+    (SHOUTED, lambda m: m.group(0).capitalize()),
+    (AMPERSAND, " and "),
+    (NOISE, " "),
+]
+
+
+@lru_cache(maxsize=16384)
+def normalize_for_speech(text: str) -> str:
+    """Rewrite text so a TTS engine reads it naturally
+
+    "RE: URGENT: Meeting moved to 3pm" -> "Urgent: Meeting moved to 3 PM"
+    "Uptime up 25% - see ceo@company.com" -> "Uptime up 25 percent - see ceo at company dot com"
+    """
+    text = REPLY_PREFIX.sub("", text or "")
+    for pattern, replacement in RULES:
+        text = pattern.sub(replacement, text)
+    return SPACES.sub(" ", text).strip()
+
+
+def prepare_email(email: Dict[str, Any]) -> Dict[str, Any]:
+    """Ingest step: the email plus speakable forms of the fields that get read out"""
+    return dict(email,
+                speech_sender=normalize_for_speech(email.get("sender", "")) or "Unknown sender",
+                speech_subject=normalize_for_speech(email.get("subject", "")) or "No subject")
+
+
+def spoken(email: Dict[str, Any], field: str) -> str:
+    """Speakable form of a field - stored at ingest, or normalized now for mail that bypassed the store"""
+    return email.get(f"speech_{field}") or normalize_for_speech(str(email.get(field, "")))
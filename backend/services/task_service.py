@@ -0,0 +1,255 @@
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from backend.services.change_log import (ADDED, CHANGED, DEFAULT_USER, ChangeLogStore, get_mail_store, mail_stores,
+                                         subscribe_evictions)
+from backend.utils.storage import data_path
+
+# Task extraction - turns each user's actionable mail into persisted tasks, one email at a time
+
+ACTION_PATTERNS = [
+    re.compile(r"\bplease\s+(confirm|review|submit|send|reply|update|complete|approve|sign|prepare|respond)\b", re.I),
+    re.compile(r"\baction required\b", re.I),
+    re.compile(r"\bmust be\b", re.I),
+    re.compile(r"\b(due|deadline)\b", re.I),
+]
+LEADING_NOISE = re.compile(r"^(reminder|fyi|note|action required)\s*:\s*", re.I)
+LEADING_PLEASE = re.compile(r"^.*?\bplease\s+", re.I)
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+CLOCK_PATTERN = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b", re.I)
+END_OF_DAY_HOUR = 17
+MAX_TASKS_PER_EMAIL = 2
+SQL_BATCH = 500   # Ids per IN (...) lookup, under SQLite's variable limit
+SCHEMA_VERSION = 2   # 2: rows keyed by user
+
+
+def parse_due_date(text: str, received: datetime) -> Optional[datetime]:
+    """Find a due date in text like "by end of day Friday" or "3 PM today"
+
+    Relative words are resolved against when the email was received.
+    """
+    lowered = text.lower()
+    day = None
+    if "tomorrow" in lowered:
+        day = received.date() + timedelta(days=1)
+    elif "today" in lowered or "tonight" in lowered:
+        day = received.date()
+    else:
+        for offset, name in enumerate(WEEKDAYS):
+            if re.search(rf"\b{name}\b", lowered):
+                days_ahead = (offset - received.weekday()) % 7
+                day = received.date() + timedelta(days=days_ahead)
+                break
+
+    clock = CLOCK_PATTERN.search(lowered)
+    if day is None:
+        if not clock:
+            return None
+        day = received.date()
+
+    if clock:
+        hour = int(clock.group(1)) % 12 + (12 if clock.group(3).lower() == "pm" else 0)
+        minute = int(clock.group(2) or 0)
+    else:
+        hour, minute = END_OF_DAY_HOUR, 0
+    return datetime(day.year, day.month, day.day, hour, minute)
+
+
+def task_title(sentence: str) -> str:
+    """Short imperative title for a task sentence"""
+    title = LEADING_NOISE.sub("", sentence.strip()).rstrip(".!")
+    if re.search(r"\bplease\s+", title, re.I):
+        title = LEADING_PLEASE.sub("", title)
+    return title[:1].upper() + title[1:]
+
+
+def received_at(email: Dict[str, Any]) -> str:
+    """When an email arrived - mailbox exports say received, the mail store timestamp"""
+    return str(email.get("received") or email["timestamp"])
+
+
+def extract_tasks(email: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Extract actionable items from one email (rule-based, no model call)"""
+    received = datetime.fromisoformat(received_at(email).replace("Z", "+00:00")).replace(tzinfo=None)
+    subject = email.get("subject", "")
+    sentences = [s for s in SENTENCE_SPLIT.split(email.get("preview") or email.get("snippet") or "") if s]
+
+    actionable = [s for s in sentences if any(p.search(s) for p in ACTION_PATTERNS)]
+    if not actionable and any(p.search(subject) for p in ACTION_PATTERNS):
+        actionable = [subject]
+
+    tasks = []
+    for number, sentence in enumerate(actionable[:MAX_TASKS_PER_EMAIL]):
+        due = parse_due_date(sentence, received) or parse_due_date(subject, received)
+        tasks.append({
+            "id": f"{email['id']}:{number}",
+            "email_id": email["id"],
+            "title": task_title(sentence),
+            "due": due.isoformat() if due else None,
+            "sender": email.get("from_name") or email.get("sender", ""),
+            "source_subject": subject,
+            "importance": email.get("importance") or email.get("priority", "normal"),
+            "received": received_at(email),
+        })
+    return tasks
+
+
+class TaskStore:
+    """SQLite-backed task index, keyed by user.
+
+    Each of a user's emails is processed exactly once, tracked by message
+    id in the processed table. Ids are looked up in batches, so a re-run over a
+    mailbox that is already processed costs one indexed query per batch.
+    Received timestamps are never used to skip mail: a delayed delivery,
+    or a folder synced late, can bring in mail older than anything seen.
+    Several workers may share the file; whoever marks an email first wins.
+    """
+
+    def __init__(self, db_path: Union[str, Path, None] = None):
+        self.db_path = str(db_path or data_path("tasks.db"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self._migrate()
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    user_id TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    email_id TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    due TEXT,
+                    sender TEXT,
+                    source_subject TEXT,
+                    importance TEXT,
+                    received TEXT,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, id)
+                );
+                CREATE INDEX IF NOT EXISTS tasks_due ON tasks (user_id, done, due);
+                CREATE TABLE IF NOT EXISTS processed_emails (
+                    user_id TEXT NOT NULL,
+                    email_id TEXT NOT NULL,
+                    received TEXT NOT NULL,
+                    PRIMARY KEY (user_id, email_id)
+                );
+                PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+
+    def _migrate(self):
+        """Version 1 tables had no user column: their rows belonged to the default user"""
+        tables = {row["name"] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "tasks" not in tables:
+            return
+        self._conn.executescript(f"""
+            DROP INDEX IF EXISTS tasks_due;
+            ALTER TABLE tasks RENAME TO tasks_v1;
+            ALTER TABLE processed_emails RENAME TO processed_emails_v1;
+            CREATE TABLE tasks (
+                user_id TEXT NOT NULL, id TEXT NOT NULL, email_id TEXT NOT NULL, title TEXT NOT NULL, due TEXT,
+                sender TEXT, source_subject TEXT, importance TEXT, received TEXT, done INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, id)
+            );
+            CREATE TABLE processed_emails (
+                user_id TEXT NOT NULL, email_id TEXT NOT NULL, received TEXT NOT NULL,
+                PRIMARY KEY (user_id, email_id)
+            );
+            INSERT INTO tasks SELECT '{DEFAULT_USER}', id, email_id, title, due, sender, source_subject, importance,
+                                     received, done FROM tasks_v1;
+            INSERT INTO processed_emails SELECT '{DEFAULT_USER}', email_id, received FROM processed_emails_v1;
+            DROP TABLE tasks_v1;
+            DROP TABLE processed_emails_v1;
+        """)
+
+    def processed_ids(self, email_ids: List[str], user_id: str = DEFAULT_USER) -> Set[str]:
+        """The ids among a user's `email_ids` that were already processed"""
+        seen: Set[str] = set()
+        for start in range(0, len(email_ids), SQL_BATCH):
+            batch = email_ids[start:start + SQL_BATCH]
+            rows = self._conn.execute(
+                f"SELECT email_id FROM processed_emails WHERE user_id = ? AND email_id IN ({', '.join('?' * len(batch))})",
+                [user_id, *batch]
+            )
+            seen.update(row["email_id"] for row in rows)
+        return seen
+
+    def process_new_mail(self, emails: Iterable[Dict[str, Any]], user_id: str = DEFAULT_USER) -> int:
+        """Extract tasks from a user's emails not seen before; returns how many were processed"""
+        with self._lock:
+            emails = {str(email["id"]): email for email in emails}
+            seen = self.processed_ids(list(emails), user_id)
+            candidates = sorted((e for email_id, e in emails.items() if email_id not in seen), key=received_at)
+            processed = 0
+            for email in candidates:
+                # Tasks and the processed marker move together in one transaction
+                with self._conn:
+                    marked = self._conn.execute(
+                        "INSERT OR IGNORE INTO processed_emails (user_id, email_id, received) VALUES (?, ?, ?)",
+                        (user_id, str(email["id"]), received_at(email)),
+                    )
+                    if not marked.rowcount:
+                        continue   # Another worker got there first
+                    for task in extract_tasks(email):
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO tasks (user_id, id, email_id, title, due, sender, source_subject, "
+                            "importance, received) VALUES (:user_id, :id, :email_id, :title, :due, :sender, "
+                            ":source_subject, :importance, :received)",
+                            dict(task, user_id=user_id),
+                        )
+                processed += 1
+            return processed
+
+    def list_tasks(self, include_done: bool = False, user_id: str = DEFAULT_USER) -> List[Dict[str, Any]]:
+        """A user's tasks ordered by due date (undated last)"""
+        query = "SELECT * FROM tasks WHERE user_id = ?"
+        if not include_done:
+            query += " AND done = 0"
+        query += " ORDER BY due IS NULL, due, received"
+        rows = self._conn.execute(query, (user_id,)).fetchall()
+        return [dict(row, done=bool(row["done"])) for row in rows]
+
+    def mark_done(self, task_id: str, user_id: str = DEFAULT_USER) -> bool:
+        """Mark one of a user's tasks complete; False if they have no such task"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("UPDATE tasks SET done = 1 WHERE user_id = ? AND id = ?", (user_id, task_id))
+        return cursor.rowcount > 0
+
+
+_task_store: Optional[TaskStore] = None
+
+def get_task_store() -> TaskStore:
+    """Shared task store (opened on first use)"""
+    global _task_store
+    if _task_store is None:
+        _task_store = TaskStore()
+    return _task_store
+
+_ingest_cursors: Dict[str, int] = {}   # user_id -> mail store cursor already ingested
+
+def ingest_user_mail(user_id: str = DEFAULT_USER, store: Optional[ChangeLogStore] = None) -> int:
+    """Extract tasks from mail added or changed in a user's store since the last run"""
+    store = store or get_mail_store(user_id)
+    cursor = store.cursor
+    changes = store.changes_since(_ingest_cursors[user_id]) if user_id in _ingest_cursors else None
+    # First run, or the log no longer reaches back: the whole mailbox, of which only unseen mail costs anything
+    emails = store.snapshot() if changes is None else changes[ADDED] + changes[CHANGED]
+    processed = get_task_store().process_new_mail(emails, user_id) if emails else 0
+    _ingest_cursors[user_id] = cursor
+    return processed
+
+def ingest_new_mail() -> int:
+    """Run extraction for every user with a mail store; only new mail does any work"""
+    return sum(ingest_user_mail(user_id, store) for user_id, store in mail_stores().items())
+
+def forget_ingest_cursor(user_id: str):
+    """An evicted store comes back with a new epoch - start that user over (processed mail is still skipped)"""
+    _ingest_cursors.pop(user_id, None)
+
+subscribe_evictions(forget_ingest_cursor)
@@ -0,0 +1,29 @@
+import re
+from typing import Dict, Optional
+
+# Voice intent helpers - turn spoken requests into structured queries
+
+FROM_PATTERN = re.compile(r"\b(?:from|by)\s+(.+?)(?:\s+(?:about|regarding|on)\s+(.+))?$")
+ABOUT_PATTERN = re.compile(r"\b(?:about|regarding|mentioning)\s+(.+)$")
+FILLER_PATTERN = re.compile(r"^(?:any|anything|are there|is there|do i have|did i get|read|find|search|show)\s+", re.I)
+
+
+def parse_search_intent(text: str) -> Dict[str, Optional[str]]:
+    """Split a spoken search into sender and topic
+
+    "any email from Sarah?" -> sender "sarah"
+    "anything about Q4?" -> query "q4"
+    """
+    spoken = text.lower().strip().rstrip("?.! ")
+    spoken = FILLER_PATTERN.sub("", spoken)
+
+    from_match = FROM_PATTERN.search(spoken)
+    if from_match:
+        return {"sender": from_match.group(1).strip(), "query": (from_match.group(2) or "").strip()}
+
+    about_match = ABOUT_PATTERN.search(spoken)
+    if about_match:
+        return {"sender": None, "query": about_match.group(1).strip()}
+
+    return {"sender": None, "query": spoken}
+
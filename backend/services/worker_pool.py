@@ -0,0 +1,146 @@
+import asyncio
+import math
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from backend.config.settings import Settings, get_settings
+from backend.services.deadline import DeadlineExceeded, remaining, run_until
+
+# CPU-heavy jobs (audio rendering, summarization) run in worker processes, off the event loop
+
+LATENCY_WINDOW = 200
+
+
+class PoolSaturated(Exception):
+    """Every worker is busy and the queue is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Worker pool saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobTimeout(Exception):
+    """A job missed its deadline"""
+
+
+class WorkerPool:
+    """Process pool with a bounded queue, per-job deadlines and metrics.
+
+    Admission is decided on the event loop before anything is queued, so a
+    flood of heavy requests is turned away with a retry hint instead of
+    piling up behind the workers. Cheap requests never touch the pool, so
+    their latency stays flat while heavy jobs run.
+
+    Sizes left as None follow the live settings; a change to the worker
+    count takes effect through `resize` without dropping running jobs.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self._max_workers = max_workers
+        self._max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timed_out": 0}
+        self._durations = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers or get_settings().workers.workers
+
+    @property
+    def max_queue(self) -> int:
+        return self._max_queue if self._max_queue is not None else get_settings().workers.queue_size
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.max_workers)
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free, from recent job durations"""
+        average = sum(self._durations) / len(self._durations) if self._durations else 1.0
+        waves = (self.queued + 1) / self.max_workers
+        return max(1, math.ceil(average * waves))
+
+    async def submit(self, fn: Callable, *args: Any, deadline_s: Optional[float] = None) -> Any:
+        """Run fn(*args) in a worker process and await the result (within the request's deadline, if any)"""
+        deadline_s = deadline_s or get_settings().workers.deadline_s
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                # The caller has given up - don't spend a worker on it
+                self.counters["timed_out"] += 1
+                raise JobTimeout(f"{getattr(fn, '__name__', 'job')} arrived after its request deadline")
+            deadline_s = min(deadline_s, left)
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.counters["rejected"] += 1
+            raise PoolSaturated(self._retry_after())
+
+        self.counters["submitted"] += 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        # The worker gets the deadline too: a job it picks up too late is skipped, not run
+        future = asyncio.get_running_loop().run_in_executor(self.executor, run_until, time.monotonic() + deadline_s,
+                                                            fn, *args)
+        try:
+            result = await asyncio.wait_for(future, timeout=deadline_s)
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            # Queued jobs are dropped; a job already running finishes in its worker
+            self.counters["timed_out"] += 1
+            raise JobTimeout(f"{getattr(fn, '__name__', 'job')} exceeded {deadline_s:.1f}s")
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self.counters["completed"] += 1
+        self._durations.append(time.perf_counter() - started)
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        """Counters plus current load and latency percentiles"""
+        durations = sorted(self._durations)
+
+        def percentile(p: float) -> Optional[float]:
+            if not durations:
+                return None
+            return round(durations[min(len(durations) - 1, int(p * len(durations)))] * 1000, 1)
+
+        return {
+            **self.counters,
+            "workers": self.max_workers,
+            "queue_limit": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "latency_ms_p50": percentile(0.5),
+            "latency_ms_p95": percentile(0.95),
+        }
+
+    def resize(self, previous: Settings, current: Settings):
+        """Settings listener: start a fresh executor when the worker count changes"""
+        if self._max_workers is None and previous.workers.workers != current.workers.workers:
+            old, self._executor = self._executor, None
+            if old is not None:
+                old.shutdown(wait=False)   # Jobs already handed to it still finish
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_worker_pool: Optional[WorkerPool] = None
+
+def get_worker_pool() -> WorkerPool:
+    """Shared worker pool (processes start on the first job)"""
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = WorkerPool()
+    return _worker_pool
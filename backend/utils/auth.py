@@ -0,0 +1,20 @@
+import re
+from typing import Optional
+from fastapi import Header, HTTPException, Query
+
+DEFAULT_USER = "default"
+USER_ID_PATTERN = re.compile(r"[A-Za-z0-9_.@-]{1,64}")   # Keeps junk ids from minting stores
+
+def valid_user_id(user_id: str) -> bool:
+    """True for ids a driver can actually have"""
+    return USER_ID_PATTERN.fullmatch(user_id) is not None
+
+def get_user_id(
+    x_user_id: Optional[str] = Header(None, description="Driver the request is for"),
+    user_id: Optional[str] = Query(None, description="Driver the request is for (when headers can't be set)")
+) -> str:
+    """Identify the driver behind a request (single-user installs fall back to 'default')"""
+    user_id = (x_user_id or user_id or DEFAULT_USER).strip() or DEFAULT_USER
+    if not valid_user_id(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user id")
+    return user_id
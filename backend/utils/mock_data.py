@@ -1,5 +1,9 @@
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from backend.config.settings import get_settings
+from backend.services.calendar_service import CalendarIndex, format_clock
+from backend.services.speech_budget import other_line, priority_line
+from backend.utils.auth import DEFAULT_USER
 
 # Realistic Mock Email Data for Mail Digest
 MOCK_EMAILS: List[Dict[str, Any]] = [
@@ -62,6 +66,9 @@ MOCK_CALENDAR_EVENTS = [
         "title": "Team Standup",
         "start_time": "09:00",
         "end_time": "09:30",
+        "rrule": "FREQ=DAILY",
+        "dtstart": "2025-01-06",
+        "exceptions": {},
         "location": "Conference Room A",
         "attendees": ["team@company.com"],
         "priority": "medium",
@@ -178,9 +185,10 @@ def generate_email_summary(unread_emails: List[Dict[str, Any]], priority_emails:
     return summary
 
 def generate_voice_summary(unread_emails: List[Dict[str, Any]], priority_emails: List[Dict[str, Any]]) -> str:
-    """Generate voice-optimized summary with proper breaks"""
+    """Generate voice-optimized summary with proper breaks (budgeted readouts come from the digest service)"""
     total = len(unread_emails)
     high_priority = len(priority_emails)
+    voice = get_settings().voice
     
     if total == 0:
         return "You have no unread emails. Your inbox is clear!"
@@ -194,38 +202,40 @@ def generate_voice_summary(unread_emails: List[Dict[str, Any]], priority_emails:
     if high_priority > 0:
         summary_parts.append(f"{high_priority} {'are' if high_priority != 1 else 'is'} high priority")
     
+    other_emails = [email for email in unread_emails if email.get("priority") != "high"]
+    spoken_priority = priority_emails[:voice.priority_readout]  # Limit for voice
+    spoken_other = other_emails[:voice.other_readout]
+    
     # 2. Priority emails section with clear break
-    if priority_emails:
+    if spoken_priority:
         summary_parts.append("Priority emails")  # Clear section header
-        for email in priority_emails[:2]:  # Limit to first 2 for voice
-            priority_text = f"{email['sender']} says {email['subject']}"
-            summary_parts.append(priority_text)
+        for email in spoken_priority:
+            summary_parts.append(priority_line(email))
     
     # 3. Other emails section with clear break
-    other_emails = [email for email in unread_emails if email.get("priority") != "high"]
-    if other_emails:
+    if spoken_other:
         summary_parts.append("Other emails")  # Clear section header
-        for email in other_emails[:3]:  # Limit to first 3 for voice
-            other_text = f"{email['sender']}: {email['subject']}"
-            summary_parts.append(other_text)
+        for email in spoken_other:
+            summary_parts.append(other_line(email))
     
     # Join with periods for natural TTS pauses
     return ". ".join(summary_parts) + "."
 
 # Utility Functions for Calendar  
 def get_todays_events() -> List[Dict[str, Any]]:
-    """Get today's calendar events"""
+    """Get today's calendar: one-off events plus recurring series (expanded per day by CalendarIndex)"""
     return MOCK_CALENDAR_EVENTS
 
 def get_high_priority_events() -> List[Dict[str, Any]]:
     """Get only high priority calendar events"""
     return [event for event in MOCK_CALENDAR_EVENTS if event.get("priority") == "high"]
 
-def get_next_meeting() -> Dict[str, Any]:
+def get_next_meeting(now: Optional[datetime] = None) -> Dict[str, Any]:
     """Get the next upcoming meeting"""
-    events = get_todays_events()
-    if events:
-        return events[0]  # Return first event as "next"
+    now = now or datetime.now()
+    event = CalendarIndex.from_dicts(get_todays_events(), now.date()).next_meeting(now)
+    if event:
+        return event.to_dict()
     return {}
 
 def generate_calendar_summary(events: List[Dict[str, Any]]) -> str:
@@ -243,32 +253,46 @@ def generate_calendar_summary(events: List[Dict[str, Any]]) -> str:
     
     return summary
 
-def generate_calendar_voice_summary(events: List[Dict[str, Any]]) -> str:
+def generate_calendar_voice_summary(events: List[Dict[str, Any]], now: Optional[datetime] = None,
+                                    user_id: str = DEFAULT_USER) -> str:
     """Generate voice-optimized calendar summary"""
-    total = len(events)
-    high_priority_events = [e for e in events if e.get("priority") == "high"]
+    now = now or datetime.now()
+    index = CalendarIndex.from_dicts(events, now.date(), user_id)
+    total = len(index)
     
     if total == 0:
         return "You have a clear schedule today. No meetings planned!"
     
+    high_priority_events = index.high_priority()
+    
     summary_parts = []
     summary_parts.append(f"You have {total} meeting{'s' if total != 1 else ''} today")
     
     # Mention high priority meetings
     if high_priority_events:
-        summary_parts.append(f"Your priority meeting{'s' if len(high_priority_events) != 1 else ''} {'are' if len(high_priority_events) != 1 else 'is'}:")
+        summary_parts.append(f"Your priority meeting{'s' if len(high_priority_events) != 1 else ''} {'are' if len(high_priority_events) != 1 else 'is'}")
         for event in high_priority_events:
-            summary_parts.append(f"{event['title']} at {event['start_time']}")
+            summary_parts.append(f"{event.title} at {format_clock(event.start)}")
+    
+    # Mention what is on now and what comes next
+    for event in index.current_meetings(now):
+        summary_parts.append(f"{event.title} is in progress until {format_clock(event.end)}")
+    next_meeting = index.next_meeting(now)
+    if next_meeting:
+        summary_parts.append(f"Next up is {next_meeting.title} at {format_clock(next_meeting.start)}")
     
-    # Mention first meeting
-    if events:
-        first_meeting = events[0]
-        summary_parts.append(f"Your day starts with {first_meeting['title']} at {first_meeting['start_time']}")
+    # Mention overlapping meetings
+    conflicts = index.conflicts()
+    if conflicts:
+        first, second = conflicts[0]
+        summary_parts.append(f"Heads up, {first.title} overlaps with {second.title}")
     
-    # Mention when the day ends
-    if events:
-        last_meeting = events[-1]
-        summary_parts.append(f"You'll be free after {last_meeting['end_time']}")
+    # Mention when the day ends (end of the last busy block, not the last start time)
+    free_after = index.free_after(now)
+    if free_after:
+        summary_parts.append(f"You'll be free after {format_clock(free_after)}")
+    else:
+        summary_parts.append("You're done with meetings for today")
     
     return ". ".join(summary_parts) + "."
 
@@ -0,0 +1,192 @@
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Wire format for digests: slim voice profile, JSON or msgpack, gzip or brotli
+
+# Optional encoders, negotiated only when installed
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "text/")
+MIN_COMPRESS_BYTES = 512   # Below this the headers cost more than compression saves
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5         # Dynamic content: fast settings, most of the gain
+
+# What the voice client reads - everything else stays on the server
+VOICE_KEYS = {
+    "mode", "cursor", "speech",
+    "total_unread", "priority_count", "priority_emails", "regular_emails", "email_ids",
+    "total_events", "high_priority_count", "events", "free_after",
+    "added", "changed", "removed", "new_count",
+    "omitted_count", "budget_s",
+}
+VOICE_ITEM_KEYS = {"id", "series_id", "sender", "subject", "title", "time", "start", "priority", "count", "kind",
+                   "thread_subject"}
+
+
+SPEECH_FIELDS = ("sender", "subject", "thread_subject")
+
+
+def voice_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """An item's voice fields, with the speech text computed at ingest in place of the raw text"""
+    slim = {k: v for k, v in item.items() if k in VOICE_ITEM_KEYS}
+    for field in SPEECH_FIELDS:
+        if item.get(f"speech_{field}"):
+            slim[field] = item[f"speech_{field}"]
+    return slim
+
+
+def slim_for_voice(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a digest down to the fields needed to speak it"""
+    slim = {}
+    for key, value in payload.items():
+        if key not in VOICE_KEYS:
+            continue
+        if isinstance(value, list):
+            value = [voice_item(item) if isinstance(item, dict) else item for item in value]
+        slim[key] = value
+    return slim
+
+
+def parse_accept(header: Optional[str]) -> List[Tuple[str, float]]:
+    """Media types or codings from an Accept-style header, best first"""
+    choices = []
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        choices.append((name.strip().lower(), quality))
+    return sorted(choices, key=lambda choice: -choice[1])
+
+
+def wants_msgpack(request: Request) -> bool:
+    """True when msgpack is installed and the client prefers it to JSON"""
+    if not MSGPACK_AVAILABLE:
+        return False
+    for media_type, quality in parse_accept(request.headers.get("accept")):
+        if quality <= 0:
+            continue
+        if media_type in MSGPACK_TYPES:
+            return True
+        if media_type in ("application/json", "*/*", "application/*"):
+            return False
+    return False
+
+
+def poll_headers(poll_s: int) -> Dict[str, str]:
+    """Cache-Control for HTTP caches, X-Poll-Interval for the client's refresher"""
+    return {"Cache-Control": f"private, max-age={poll_s}", "X-Poll-Interval": str(poll_s)}
+
+
+def digest_response(request: Request, payload: Dict[str, Any], profile: str = "full",
+                    poll_s: Optional[int] = None) -> Response:
+    """Encode a digest for the wire (compression is added by CompressionMiddleware)"""
+    if profile == "voice":
+        payload = slim_for_voice(payload)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if poll_s is not None:
+        headers.update(poll_headers(poll_s))
+    if wants_msgpack(request):
+        return Response(msgpack.packb(payload, use_bin_type=True), media_type="application/msgpack", headers=headers)
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """br if the client takes it and brotli is installed, else gzip, else nothing"""
+    accepted = {coding: quality for coding, quality in parse_accept(accept_encoding)}
+    if BROTLI_AVAILABLE and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Compresses whole JSON/msgpack bodies with the best coding the client accepts.
+
+    Streaming bodies (audio, NDJSON) and responses that are already encoded
+    pass through untouched, so Range requests on audio keep working.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        encoding = choose_encoding(request_headers.get("accept-encoding"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        passthrough = False
+        chunks: List[bytes] = []
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in message["headers"]}
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    return await send(message)
+                start_message = message
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                if len(chunks) == 1:
+                    return
+                # A real stream - send what we have uncompressed and step aside
+                passthrough = True
+                await send(start_message)
+                for chunk in chunks[:-1]:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                return await send(message)
+
+            body = b"".join(chunks)
+            headers = [(key, value) for key, value in start_message["headers"] if key.lower() != b"content-length"]
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                if not any(key.lower() == b"vary" for key, _ in headers):
+                    headers.append((b"vary", b"Accept-Encoding"))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
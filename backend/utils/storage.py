@@ -0,0 +1,11 @@
+import os
+from pathlib import Path
+
+# Local data directory for persisted indexes (SQLite files etc.)
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+def data_path(filename: str) -> Path:
+    """Path of a data file inside ZENDRIVE_DATA_DIR (created on demand)"""
+    data_dir = Path(os.getenv("ZENDRIVE_DATA_DIR", DEFAULT_DATA_DIR))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir / filename
@@ -0,0 +1,129 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Persistent cache of the last digests so the car can speak them offline
+
+DEFAULT_CACHE_PATH = Path.home() / ".zendrive" / "digest_cache.db"
+
+
+def describe_age(age_seconds: float) -> str:
+    """Spoken age of a cached digest, e.g. 'just now', '5 minutes ago'"""
+    minutes = int(age_seconds // 60)
+    if minutes < 1:
+        return "just now"
+    if minutes < 60:
+        return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
+    hours = minutes // 60
+    return f"{hours} hour{'s' if hours != 1 else ''} ago"
+
+
+class DigestCache:
+    """SQLite store of the last response per endpoint with its fetch time"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        path = Path(db_path or os.getenv("ZENDRIVE_CLIENT_CACHE", DEFAULT_CACHE_PATH))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS digests (
+                endpoint TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, endpoint: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Cached payload and its age in seconds, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, fetched_at FROM digests WHERE endpoint = ?", (endpoint,)
+            ).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0]), max(0.0, time.time() - row[1])
+
+    def put(self, endpoint: str, payload: Dict[str, Any]):
+        """Store the latest payload for an endpoint"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO digests (endpoint, payload, fetched_at) VALUES (?, ?, ?)",
+                (endpoint, json.dumps(payload), time.time()),
+            )
+
+
+def email_key(email: Dict[str, Any]) -> str:
+    """Stable identity for an email across digest versions"""
+    return str(email.get("id") or f"{email.get('sender')}|{email.get('subject')}")
+
+
+def mail_delta(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """New and removed emails between two mail digest payloads
+
+    The digest lists only what gets spoken (collapsed, truncated or fitted
+    to a time budget), so an email can drop out of the lists while still
+    unread. When both payloads carry the server's full `email_ids`, the
+    diff is on those; the lists only supply details for speaking.
+    """
+    def emails_of(data):
+        emails = data.get("priority_emails", []) + data.get("regular_emails", [])
+        return {email_key(email): email for email in emails}
+
+    old_emails, new_emails = emails_of(old), emails_of(new)
+    if "email_ids" in old and "email_ids" in new:
+        old_ids, new_ids = set(map(str, old["email_ids"])), set(map(str, new["email_ids"]))
+    else:
+        old_ids, new_ids = set(old_emails), set(new_emails)
+    added_ids, removed_ids = new_ids - old_ids, old_ids - new_ids
+    return {
+        "added": [email for key, email in new_emails.items() if key in added_ids],
+        "removed": [email for key, email in old_emails.items() if key in removed_ids],
+        "added_count": len(added_ids),
+        "removed_count": len(removed_ids),
+    }
+
+
+def event_key(event: Dict[str, Any]) -> str:
+    """Series an event belongs to - a recurring occurrence's id changes daily, its series id doesn't"""
+    return str(event.get("series_id") or event.get("id") or event.get("title"))
+
+
+def time_of_day(event: Dict[str, Any]) -> Optional[str]:
+    """Spoken start time, else the clock part of the ISO start"""
+    start = str(event.get("start") or "")
+    return event.get("time") or start.partition("T")[2][:5] or None
+
+
+def event_delta(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """New, removed and rescheduled events between two calendar digest payloads
+
+    Occurrences of a recurring series get a new id every day
+    (`<series>@<date>`), so events are matched by series and start time:
+    yesterday's 9 AM standup is today's 9 AM standup. Within a series,
+    occurrences left unmatched on both sides are paired up as moves.
+    """
+    def by_series(data):
+        series: Dict[str, List[Dict[str, Any]]] = {}
+        for event in data.get("events", []):
+            series.setdefault(event_key(event), []).append(event)
+        return series
+
+    old_series, new_series = by_series(old), by_series(new)
+    delta: Dict[str, List[Dict[str, Any]]] = {"added": [], "removed": [], "changed": []}
+    for key in list(new_series) + [key for key in old_series if key not in new_series]:
+        old_events, new_events = old_series.get(key, []), new_series.get(key, [])
+        old_times = {time_of_day(event) for event in old_events}
+        new_times = {time_of_day(event) for event in new_events}
+        gone = [event for event in old_events if time_of_day(event) not in new_times]
+        arrived = [event for event in new_events if time_of_day(event) not in old_times]
+        moved = min(len(gone), len(arrived))
+        delta["changed"] += arrived[:moved]
+        delta["added"] += arrived[moved:]
+        delta["removed"] += gone[moved:]
+    return delta
@@ -0,0 +1,121 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+# Async HTTP client for the ZenDrive backend (owned by the client event loop)
+
+# httpx gives real non-blocking I/O; without it requests runs on the default executor
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+
+class APIError(Exception):
+    """Backend answered with an error status"""
+
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(f"HTTP {status}: {message}" if message else f"HTTP {status}")
+        self.status = status
+
+
+def accept_header() -> str:
+    return "application/msgpack, application/json;q=0.9" if MSGPACK_AVAILABLE else "application/json"
+
+
+def deadline_header(timeout_s: float) -> Dict[str, str]:
+    """Tell the server how long we'll wait, so it stops working on requests we've given up on"""
+    return {"X-Deadline-Ms": str(int(timeout_s * 1000))}
+
+
+def decode_body(content_type: str, body: bytes) -> Dict[str, Any]:
+    """JSON or msgpack body to a dict"""
+    if content_type.startswith("application/msgpack"):
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+
+class ZenDriveAPI:
+    """Digest, search and activity calls, all awaitable.
+
+    One connection pool is shared by every call, so a section fetch can run
+    while the previous section is still being spoken.
+    """
+
+    def __init__(self, base_url: str, connect_timeout_s: float = 3.0, request_timeout_s: float = 15.0,
+                 budget_s: Optional[int] = None):
+        self.base_url = base_url.rstrip("/")
+        self.budget_s = budget_s
+        self.connect_timeout_s = connect_timeout_s
+        self.request_timeout_s = request_timeout_s
+        self._client: Optional["httpx.AsyncClient"] = None
+        if HTTPX_AVAILABLE:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(request_timeout_s, connect=connect_timeout_s),
+                headers={"Accept": accept_header(), **deadline_header(request_timeout_s)},
+            )
+        elif not REQUESTS_AVAILABLE:
+            raise RuntimeError("Install httpx (or requests) for the ZenDrive client")
+
+    async def _send(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                    headers: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, Any], Any]:
+        """Decoded body and the response headers"""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        if self._client is not None:
+            response = await self._client.request(method, url, params=params, headers=headers)
+        else:
+            def blocking():
+                return requests.request(method, url, params=params,
+                                        headers={"Accept": accept_header(), **deadline_header(self.request_timeout_s),
+                                                 **(headers or {})},
+                                        timeout=(self.connect_timeout_s, self.request_timeout_s))
+            response = await asyncio.get_running_loop().run_in_executor(None, blocking)
+
+        status, body = response.status_code, response.content
+        if status >= 400:
+            raise APIError(status, body[:200].decode("utf-8", "replace"))
+        return (decode_body(response.headers.get("content-type", ""), body) if body else {}), response.headers
+
+    async def _request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return (await self._send(method, path, params))[0]
+
+    async def get_digest(self, endpoint: str, prefetch: bool = False) -> Tuple[Dict[str, Any], Optional[float]]:
+        """A digest in the slim voice profile (fitted to the spoken-time budget, if any) and the server's poll hint"""
+        # Background refreshes are prefetches - they don't count as the driver being active
+        params = {"profile": "voice"}
+        if self.budget_s:
+            params["budget_s"] = self.budget_s
+        data, headers = await self._send("GET", endpoint, params=params,
+                                         headers={"Purpose": "prefetch"} if prefetch else None)
+        try:
+            poll_s = float(headers.get("x-poll-interval"))
+        except (TypeError, ValueError):
+            poll_s = None
+        return data, poll_s
+
+    async def search(self, query: str) -> Dict[str, Any]:
+        return await self._request("GET", "mail/search", params={"q": query})
+
+    async def report_activity(self):
+        """Tell the server the driver is active (errors are logged, never raised)"""
+        try:
+            await self._request("POST", "activity")
+        except Exception as e:
+            print(f"⚠️ Activity ping failed: {e}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
@@ -0,0 +1,351 @@
+import json
+import math
+import re
+import threading
+from array import array
+from collections import deque
+from typing import Callable, Iterable, List, Optional
+
+# Native streaming speech recognition: mic frames -> ring buffer -> VAD -> offline engine
+
+# Try to import audio packages, fallback if not available
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    PYAUDIO_AVAILABLE = False
+
+try:
+    from vosk import Model, KaldiRecognizer
+    VOSK_AVAILABLE = True
+except ImportError:
+    VOSK_AVAILABLE = False
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000   # 480 samples = 960 bytes of 16-bit mono
+PRE_ROLL_FRAMES = 10                              # 300 ms of audio kept from before speech onset
+PHRASE_PAUSE_FRAMES = 8                           # 240 ms of quiet: the driver finished a phrase
+WAKE_TIMEOUT_FRAMES = 8000 // FRAME_MS            # Listen for a command this long after the wake word
+
+
+def frame_rms(frame: bytes) -> float:
+    """Root-mean-square level of a 16-bit little-endian PCM frame"""
+    samples = array("h")
+    samples.frombytes(frame[:len(frame) - len(frame) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class AudioRingBuffer:
+    """Fixed-size buffer of the most recent audio frames"""
+
+    def __init__(self, capacity: int = PRE_ROLL_FRAMES):
+        self._frames = deque(maxlen=capacity)
+
+    def append(self, frame: bytes):
+        self._frames.append(frame)
+
+    def drain(self) -> List[bytes]:
+        """Return and clear the buffered frames, oldest first"""
+        frames = list(self._frames)
+        self._frames.clear()
+        return frames
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+
+class EnergyVAD:
+    """Energy-based voice activity detector with an adaptive noise floor.
+
+    A frame counts as speech when it is well above the running noise level.
+    Speech starts after `start_frames` loud frames in a row and ends after
+    `hangover_frames` quiet ones, so short pauses between words don't cut
+    an utterance in half.
+    """
+
+    def __init__(self, min_threshold: float = 300.0, ratio: float = 3.0,
+                 start_frames: int = 3, hangover_frames: int = 20):
+        self.min_threshold = min_threshold
+        self.ratio = ratio
+        self.start_frames = start_frames
+        self.hangover_frames = hangover_frames
+        self.noise_floor = min_threshold / ratio
+        self.in_speech = False
+        self._loud_run = 0
+        self._quiet_run = 0
+
+    def process(self, frame: bytes) -> Optional[str]:
+        """Feed one frame; returns "start", "end" or None"""
+        level = frame_rms(frame)
+        loud = level > max(self.min_threshold, self.noise_floor * self.ratio)
+
+        if not loud:
+            # Track background noise only while nobody is talking
+            if not self.in_speech:
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * level
+            self._loud_run = 0
+            self._quiet_run += 1
+        else:
+            self._loud_run += 1
+            self._quiet_run = 0
+
+        if not self.in_speech and self._loud_run >= self.start_frames:
+            self.in_speech = True
+            return "start"
+        if self.in_speech and self._quiet_run >= self.hangover_frames:
+            self.in_speech = False
+            return "end"
+        return None
+
+    @property
+    def quiet_frames(self) -> int:
+        """Quiet frames in a row so far (a pause inside speech, before the hangover ends it)"""
+        return self._quiet_run
+
+
+class RecognizerEngine:
+    """Interface for offline speech engines"""
+
+    def start_utterance(self):
+        """Reset for a new utterance"""
+
+    def accept_frame(self, frame: bytes) -> Optional[str]:
+        """Feed audio; return the current partial hypothesis if it changed"""
+        raise NotImplementedError
+
+    def finish(self) -> str:
+        """Final transcript for the utterance"""
+        raise NotImplementedError
+
+
+class StubEngine(RecognizerEngine):
+    """Deterministic engine for tests: reveals scripted transcripts word by word"""
+
+    def __init__(self, transcripts: Iterable[str], frames_per_word: int = 5):
+        self.transcripts = deque(transcripts)
+        self.frames_per_word = frames_per_word
+        self._words: List[str] = []
+        self._frames = 0
+        self._revealed = 0
+
+    def start_utterance(self):
+        self._words = self.transcripts.popleft().split() if self.transcripts else []
+        self._frames = 0
+        self._revealed = 0
+
+    def accept_frame(self, frame: bytes) -> Optional[str]:
+        self._frames += 1
+        revealed = min(len(self._words), self._frames // self.frames_per_word)
+        if revealed == self._revealed:
+            return None
+        self._revealed = revealed
+        return " ".join(self._words[:revealed])
+
+    def finish(self) -> str:
+        return " ".join(self._words)
+
+
+class VoskEngine(RecognizerEngine):
+    """Offline recognition with a local Vosk model.
+
+    Vosk finalizes a segment whenever it hears an internal pause, and the
+    partials after that start from empty, so finalized segments are kept
+    and the hypothesis is always all of them plus the current partial.
+    """
+
+    def __init__(self, model_path: str, sample_rate: int = SAMPLE_RATE):
+        if not VOSK_AVAILABLE:
+            raise RuntimeError("vosk is not installed")
+        self.model = Model(model_path)
+        self.sample_rate = sample_rate
+        self._recognizer = None
+        self._segments: List[str] = []
+        self._last_partial = ""
+
+    def start_utterance(self):
+        self._recognizer = KaldiRecognizer(self.model, self.sample_rate)
+        self._segments = []
+        self._last_partial = ""
+
+    def _text(self, current: str = "") -> str:
+        return " ".join(part for part in self._segments + [current] if part)
+
+    def accept_frame(self, frame: bytes) -> Optional[str]:
+        if self._recognizer.AcceptWaveform(frame):
+            self._segments.append(json.loads(self._recognizer.Result()).get("text", ""))
+            partial = self._text()
+        else:
+            partial = self._text(json.loads(self._recognizer.PartialResult()).get("partial", ""))
+        if partial == self._last_partial:
+            return None
+        self._last_partial = partial
+        return partial
+
+    def finish(self) -> str:
+        return self._text(json.loads(self._recognizer.FinalResult()).get("text", "")) or self._last_partial
+
+
+# Intents that are safe to act on before the driver finishes speaking.
+# Mail commands wait for the final transcript because "emails from Sarah"
+# only becomes a search once the sender has been said; "priority emails"
+# also waits for a phrase-ending pause, in case "from Sarah" follows.
+EARLY_INTENTS = [
+    ("stop", re.compile(r"\b(stop|quit|exit|goodbye)\b"), False),
+    ("priority", re.compile(r"\b(priority|urgent|important)\b"), True),
+    ("calendar", re.compile(r"\b(calendar|schedule|meetings)\b"), False),
+]
+WAKE_PATTERN = re.compile(r"\bzen\s?drive\b")
+
+
+def match_early_intent(hypothesis: str, paused: bool = False) -> Optional[str]:
+    """Intent that a partial hypothesis already commits to, if any
+
+    `paused` says the driver has stopped for a moment; intents that the
+    next words could still turn into a search only commit then.
+    """
+    if re.search(r"\b(from|about|regarding)\b", hypothesis):
+        return None
+    for intent, pattern, needs_pause in EARLY_INTENTS:
+        if pattern.search(hypothesis) and (paused or not needs_pause):
+            return intent
+    return None
+
+
+class StreamingRecognizer:
+    """Runs frames through the VAD and engine and dispatches commands early.
+
+    `on_command` is called at most once per utterance: as soon as a partial
+    hypothesis commits to an early intent (after a short phrase-ending pause
+    for intents that more words could still change), or with the final
+    transcript otherwise. Until the wake word is heard, utterances are
+    ignored; the wake word covers one command, or lapses after
+    `wake_timeout_frames` with no command.
+    """
+
+    def __init__(self, engine: RecognizerEngine, on_command: Callable[[str], None],
+                 on_wake: Optional[Callable[[], None]] = None, vad: Optional[EnergyVAD] = None,
+                 require_wake_word: bool = True, phrase_pause_frames: int = PHRASE_PAUSE_FRAMES,
+                 wake_timeout_frames: int = WAKE_TIMEOUT_FRAMES):
+        self.engine = engine
+        self.on_command = on_command
+        self.on_wake = on_wake
+        self.vad = vad or EnergyVAD()
+        self.pre_roll = AudioRingBuffer()
+        self.require_wake_word = require_wake_word
+        self.phrase_pause_frames = phrase_pause_frames
+        self.wake_timeout_frames = wake_timeout_frames
+        self.activated = not require_wake_word
+        self._awake_frames = 0
+        self._in_utterance = False
+        self._dispatched = False
+        self._command = ""
+        self.partials: List[str] = []   # This utterance's hypotheses
+
+    def _dispatch(self, command: str):
+        self._dispatched = True
+        # A wake word is good for one command; the next needs it again
+        self.activated = not self.require_wake_word
+        self.on_command(command)
+
+    def _hypothesis(self, text: str):
+        self.partials.append(text)
+        if not self.activated:
+            if not WAKE_PATTERN.search(text):
+                return
+            self.activated = True
+            self._awake_frames = 0
+            print("✅ Wake word detected - ZenDrive activated")
+            if self.on_wake:
+                self.on_wake()
+
+        self._command = WAKE_PATTERN.sub("", text).strip()
+        if not self._dispatched and match_early_intent(self._command):
+            print(f"⚡ Dispatching on partial: '{self._command}'")
+            self._dispatch(self._command)
+
+    def _track_wake(self):
+        if not self.activated or not self.require_wake_word:
+            return
+        self._awake_frames += 1
+        if self._awake_frames > self.wake_timeout_frames and not self._in_utterance:
+            self.activated = False
+            print("💤 No command after the wake word - going back to sleep")
+
+    def process_frame(self, frame: bytes):
+        """Feed one captured frame"""
+        event = self.vad.process(frame)
+        self._track_wake()
+
+        if event == "start":
+            self._in_utterance = True
+            self._dispatched = False
+            self._command = ""
+            self.partials = []
+            self.engine.start_utterance()
+            # Replay the pre-roll so the first syllable isn't clipped
+            for buffered in self.pre_roll.drain():
+                partial = self.engine.accept_frame(buffered)
+                if partial:
+                    self._hypothesis(partial)
+
+        if not self._in_utterance:
+            self.pre_roll.append(frame)
+            return
+
+        partial = self.engine.accept_frame(frame)
+        if partial:
+            self._hypothesis(partial)
+
+        # End of a phrase: commit intents that were waiting to hear what came next
+        if (self.activated and not self._dispatched and self._command
+                and self.vad.quiet_frames >= self.phrase_pause_frames
+                and match_early_intent(self._command, paused=True)):
+            print(f"⚡ Dispatching after pause: '{self._command}'")
+            self._dispatch(self._command)
+
+        if event == "end":
+            self._in_utterance = False
+            final = self.engine.finish()
+            if final and not self._dispatched:
+                self._hypothesis(final)
+                if self.activated and self._command and not self._dispatched:
+                    self._dispatch(self._command)
+
+
+class MicrophoneStream:
+    """PyAudio capture that yields fixed-size PCM frames"""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, frame_samples: int = FRAME_SAMPLES):
+        if not PYAUDIO_AVAILABLE:
+            raise RuntimeError("PyAudio is not installed")
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self._audio = None
+        self._stream = None
+
+    def __enter__(self):
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate,
+                                        input=True, frames_per_buffer=self.frame_samples)
+        return self
+
+    def __exit__(self, *exc):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._audio.terminate()
+
+    def frames(self, stop_event: Optional[threading.Event] = None):
+        """Yield frames until stop_event is set"""
+        while stop_event is None or not stop_event.is_set():
+            yield self._stream.read(self.frame_samples, exception_on_overflow=False)
+
+
+def run_microphone_recognition(recognizer: StreamingRecognizer, stop_event: Optional[threading.Event] = None):
+    """Capture from the default microphone and feed the recognizer until stopped"""
+    with MicrophoneStream() as mic:
+        print("🎙️ Native speech recognition listening...")
+        for frame in mic.frames(stop_event):
+            recognizer.process_frame(frame)
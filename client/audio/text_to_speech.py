@@ -0,0 +1,489 @@
+import heapq
+import itertools
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Pluggable TTS: backends synthesize sentences to PCM, one shared output stream plays them
+
+# Try to import voice packages, fallback if not available
+try:
+    import pyttsx3
+    PYTTSX3_AVAILABLE = True
+except ImportError:
+    PYTTSX3_AVAILABLE = False
+
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    PYAUDIO_AVAILABLE = False
+
+SAMPLE_WIDTH = 2                  # 16-bit PCM
+PLAYBACK_BLOCK_SECONDS = 0.05     # Granularity for interrupting playback
+LOOKAHEAD_SENTENCES = 1           # Sentences synthesized ahead of the one playing
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?:])\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences so synthesis can run ahead of playback"""
+    return [sentence.strip() for sentence in SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+
+@dataclass
+class AudioChunk:
+    pcm: bytes
+    sample_rate: int
+    channels: int = 1
+    text: str = ""
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (self.sample_rate * self.channels * SAMPLE_WIDTH)
+
+
+def silence(seconds: float, sample_rate: int = 22050) -> AudioChunk:
+    """A chunk of silence (used for section pauses)"""
+    return AudioChunk(b"\x00" * (int(seconds * sample_rate) * SAMPLE_WIDTH), sample_rate)
+
+
+def read_wav(path: str, text: str = "") -> AudioChunk:
+    """Load a 16-bit WAV file into a chunk"""
+    with wave.open(path, "rb") as wav:
+        return AudioChunk(wav.readframes(wav.getnframes()), wav.getframerate(), wav.getnchannels(), text)
+
+
+# Backends
+
+class TTSBackend:
+    """Interface for speech synthesizers"""
+
+    name = "base"
+
+    def synthesize(self, text: str) -> AudioChunk:
+        """Render one sentence to PCM"""
+        raise NotImplementedError
+
+    def reset(self):
+        """Recover after a failed synthesis (cheap - not a full restart)"""
+
+
+class Pyttsx3Backend(TTSBackend):
+    """System voices via pyttsx3, rendered to a temp WAV instead of the speakers"""
+
+    name = "pyttsx3"
+
+    def __init__(self, rate: int = 150, volume: float = 1.0):
+        if not PYTTSX3_AVAILABLE:
+            raise RuntimeError("pyttsx3 is not installed")
+        self.rate = rate
+        self.volume = volume
+        self._engine = None
+        self._tmpdir = tempfile.mkdtemp(prefix="zendrive_tts_")
+
+    def _get_engine(self):
+        # Created lazily so it lives on the synthesis thread
+        if self._engine is None:
+            self._engine = pyttsx3.init()
+            voices = self._engine.getProperty('voices') or []
+            for voice in voices:
+                if 'female' in voice.name.lower() or 'zira' in voice.name.lower() or 'hazel' in voice.name.lower():
+                    self._engine.setProperty('voice', voice.id)
+                    break
+            self._engine.setProperty('rate', self.rate)
+            self._engine.setProperty('volume', self.volume)
+        return self._engine
+
+    def synthesize(self, text: str) -> AudioChunk:
+        path = os.path.join(self._tmpdir, "sentence.wav")
+        engine = self._get_engine()
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        return read_wav(path, text)
+
+    def reset(self):
+        self._engine = None
+
+
+class PiperBackend(TTSBackend):
+    """Offline neural voices via the piper CLI (raw PCM on stdout)"""
+
+    name = "piper"
+
+    def __init__(self, model_path: str, sample_rate: int = 22050):
+        if not shutil.which("piper"):
+            raise RuntimeError("piper is not on PATH")
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+
+    def synthesize(self, text: str) -> AudioChunk:
+        result = subprocess.run(
+            ["piper", "--model", self.model_path, "--output-raw"],
+            input=text.encode("utf-8"), capture_output=True, check=True,
+        )
+        return AudioChunk(result.stdout, self.sample_rate, text=text)
+
+
+class StubBackend(TTSBackend):
+    """Deterministic backend for tests: silence sized like the spoken text"""
+
+    name = "stub"
+
+    def __init__(self, chars_per_second: float = 18.0, sample_rate: int = 8000):
+        self.chars_per_second = chars_per_second
+        self.sample_rate = sample_rate
+        self.synthesized: List[str] = []
+
+    def synthesize(self, text: str) -> AudioChunk:
+        self.synthesized.append(text)
+        chunk = silence(len(text) / self.chars_per_second, self.sample_rate)
+        chunk.text = text
+        return chunk
+
+
+def create_backend(name: Optional[str] = None, rate: int = 150) -> TTSBackend:
+    """Backend from ZENDRIVE_TTS_BACKEND (pyttsx3, piper or stub)"""
+    name = name or os.getenv("ZENDRIVE_TTS_BACKEND", "pyttsx3")
+    if name == "piper":
+        return PiperBackend(os.getenv("ZENDRIVE_PIPER_MODEL", "en_US-lessac-medium.onnx"))
+    if name == "stub":
+        return StubBackend()
+    return Pyttsx3Backend(rate=rate)
+
+
+# Output
+
+class AudioOutput:
+    """Plays chunks in small blocks so playback can be interrupted"""
+
+    def play(self, chunk: AudioChunk, interrupted: threading.Event):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAudioOutput(AudioOutput):
+    """One long-lived PyAudio stream shared by every utterance"""
+
+    def __init__(self):
+        if not PYAUDIO_AVAILABLE:
+            raise RuntimeError("PyAudio is not installed")
+        self._audio = pyaudio.PyAudio()
+        self._stream = None
+        self._format = None
+
+    def _stream_for(self, chunk: AudioChunk):
+        # Reopen only when a backend switches sample rate or channel count
+        if self._format != (chunk.sample_rate, chunk.channels):
+            if self._stream:
+                self._stream.close()
+            self._stream = self._audio.open(format=pyaudio.paInt16, channels=chunk.channels,
+                                            rate=chunk.sample_rate, output=True)
+            self._format = (chunk.sample_rate, chunk.channels)
+        return self._stream
+
+    def play(self, chunk: AudioChunk, interrupted: threading.Event):
+        stream = self._stream_for(chunk)
+        block = int(chunk.sample_rate * PLAYBACK_BLOCK_SECONDS) * chunk.channels * SAMPLE_WIDTH
+        for offset in range(0, len(chunk.pcm), block):
+            if interrupted.is_set():
+                return
+            stream.write(chunk.pcm[offset:offset + block])
+
+    def close(self):
+        if self._stream:
+            self._stream.close()
+        self._audio.terminate()
+
+
+class NullOutput(AudioOutput):
+    """No sound card: waits for the chunk's duration so pacing stays realistic"""
+
+    def __init__(self, realtime: bool = True):
+        self.realtime = realtime
+        self.played: List[str] = []
+
+    def play(self, chunk: AudioChunk, interrupted: threading.Event):
+        self.played.append(chunk.text)
+        if self.realtime:
+            interrupted.wait(chunk.duration)
+
+
+# Scheduling
+
+URGENT = 0       # Safety and anything the driver is waiting on right now (wake ack, sign-off)
+RESPONSE = 1     # Answers to the command just given
+BACKGROUND = 2   # Long tails and unprompted updates (other emails, refresh deltas)
+
+PRIORITY_NAMES = {URGENT: "urgent", RESPONSE: "response", BACKGROUND: "background"}
+
+# Seconds an utterance may wait before it is too stale to start speaking
+DEFAULT_DEADLINES = {URGENT: 3.0, RESPONSE: 20.0, BACKGROUND: 60.0}
+
+Part = Tuple[str, Any, int]   # ("speech", sentence, priority) or ("pause", seconds, priority)
+
+
+def utterance_key(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class Utterance:
+    """One say() call: its sentences and trailing pause, spoken in order"""
+
+    __slots__ = ("key", "priority", "seq", "parts", "expires_at", "started", "cancelled")
+
+    def __init__(self, key: str, priority: int, seq: int, parts: List[Tuple[str, Any]], expires_at: Optional[float]):
+        self.key = key
+        self.priority = priority
+        self.seq = seq
+        self.parts: Deque[Tuple[str, Any]] = deque(parts)
+        self.expires_at = expires_at
+        self.started = False
+        self.cancelled = False
+
+    def __lt__(self, other: "Utterance") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class SpeechScheduler:
+    """Priority queue of utterances, handed out one sentence at a time.
+
+    Higher classes go first and, because work is taken a sentence at a
+    time, a new urgent utterance preempts a long readout at the next
+    sentence boundary; the readout resumes afterwards. An utterance that is
+    already pending (same words) is not queued twice - a higher-priority
+    duplicate replaces the pending one. An utterance that waits past its
+    class deadline is dropped unspoken; once its first sentence is out it
+    is always finished.
+
+    Counts unfinished parts like queue.Queue: consumers call task_done()
+    for every part they get, and join() waits for all of them.
+    """
+
+    def __init__(self, deadlines: Optional[Dict[int, Optional[float]]] = None):
+        self.deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+        self.condition = threading.Condition()
+        self._heap: List[Utterance] = []
+        self._pending: Dict[str, Utterance] = {}
+        self._seq = itertools.count()
+        self._current: Optional[Utterance] = None
+        self._in_flight = 0
+        self._closed = False
+        self.stats = {"queued": 0, "deduplicated": 0, "expired": 0, "preempted": 0}
+
+    def put(self, text: str, priority: int = RESPONSE, pause_after: float = 0.0) -> bool:
+        """Queue text; False when an identical utterance is already pending"""
+        parts: List[Tuple[str, Any]] = [("speech", sentence) for sentence in split_sentences(text)]
+        if pause_after > 0:
+            parts.append(("pause", pause_after))
+        if not parts:
+            return False
+
+        key = utterance_key(text)
+        with self.condition:
+            existing = self._pending.get(key)
+            if existing is not None:
+                if existing.started or existing.priority <= priority:
+                    self.stats["deduplicated"] += 1
+                    return False
+                existing.cancelled = True
+                self.stats["deduplicated"] += 1
+
+            deadline = self.deadlines.get(priority)
+            utterance = Utterance(key, priority, next(self._seq), parts,
+                                  time.monotonic() + deadline if deadline is not None else None)
+            current = self._current
+            if current is not None and current.parts and not current.cancelled and current.priority > priority:
+                self.stats["preempted"] += 1
+            heapq.heappush(self._heap, utterance)
+            self._pending[key] = utterance
+            self.stats["queued"] += 1
+            self.condition.notify_all()
+            return True
+
+    def _forget(self, utterance: Utterance):
+        if self._pending.get(utterance.key) is utterance:
+            del self._pending[utterance.key]
+
+    def _pop_locked(self) -> Optional[Part]:
+        now = time.monotonic()
+        dropped = False
+        while self._heap:
+            utterance = self._heap[0]
+            if utterance.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            if not utterance.started and utterance.expires_at is not None and now > utterance.expires_at:
+                heapq.heappop(self._heap)
+                self._forget(utterance)
+                self.stats["expired"] += 1
+                dropped = True
+                print(f"⌛ Dropped stale {PRIORITY_NAMES.get(utterance.priority, utterance.priority)} speech: "
+                      f"{utterance.key[:40]}")
+                continue
+
+            utterance.started = True
+            kind, value = utterance.parts.popleft()
+            if not utterance.parts:
+                heapq.heappop(self._heap)
+                self._forget(utterance)
+            self._current = utterance
+            self._in_flight += 1
+            return kind, value, utterance.priority
+
+        if dropped:
+            self.condition.notify_all()
+        return None
+
+    def pop(self) -> Optional[Part]:
+        """Next part without blocking, or None"""
+        with self.condition:
+            return self._pop_locked()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Part]:
+        """Next part, blocking; None on timeout or once closed"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.condition:
+            while True:
+                part = self._pop_locked()
+                if part is not None or self._closed:
+                    return part
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+    def task_done(self):
+        with self.condition:
+            self._in_flight -= 1
+            self.condition.notify_all()
+
+    def clear(self) -> int:
+        """Drop everything not yet handed out; returns the number of utterances dropped"""
+        with self.condition:
+            dropped = sum(1 for utterance in self._heap if not utterance.cancelled)
+            self._heap.clear()
+            self._pending.clear()
+            self.condition.notify_all()
+            return dropped
+
+    def close(self):
+        """Wake blocked getters with None (replaces the old "STOP" sentinel)"""
+        with self.condition:
+            self._closed = True
+            self.condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def unfinished(self) -> int:
+        """Parts queued or handed out but not yet marked done"""
+        with self.condition:
+            queued = sum(len(utterance.parts) for utterance in self._heap if not utterance.cancelled)
+            return queued + self._in_flight
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Block until every part has been handed out and marked done"""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self._in_flight <= 0 and all(utterance.cancelled for utterance in self._heap), timeout)
+
+    def __len__(self) -> int:
+        with self.condition:
+            return sum(1 for utterance in self._heap if not utterance.cancelled)
+
+
+# Pipeline
+
+class StreamingSpeaker:
+    """Synthesis and playback on separate threads joined by a small queue.
+
+    While sentence N plays, sentence N+1 is already being synthesized, so a
+    digest plays without gaps. The bounded queue keeps synthesis at most
+    LOOKAHEAD_SENTENCES ahead. Sentences come from a SpeechScheduler, so
+    urgent speech cuts in at the next sentence boundary. A failed sentence
+    is logged and skipped after a backend reset; it does not take the whole
+    speaker down.
+    """
+
+    def __init__(self, backend: TTSBackend, output: Optional[AudioOutput] = None,
+                 scheduler: Optional[SpeechScheduler] = None):
+        self.backend = backend
+        self.output = output or (PyAudioOutput() if PYAUDIO_AVAILABLE else NullOutput())
+        self.scheduler = scheduler or SpeechScheduler()
+        self._audio_queue: "queue.Queue" = queue.Queue(maxsize=LOOKAHEAD_SENTENCES)
+        self._interrupted = threading.Event()
+        self._sample_rate = 22050   # Pauses match the backend's last sample rate
+        threading.Thread(target=self._synthesis_loop, daemon=True).start()
+        threading.Thread(target=self._playback_loop, daemon=True).start()
+
+    def say(self, text: str, pause_after: float = 0.0, priority: int = RESPONSE):
+        """Queue text (split into sentences) with an optional trailing pause"""
+        self._interrupted.clear()
+        self.scheduler.put(text, priority, pause_after)
+
+    def _synthesis_loop(self):
+        while True:
+            part = self.scheduler.get()
+            if part is None:
+                break
+            kind, value, _ = part
+            if self._interrupted.is_set():
+                self.scheduler.task_done()
+                continue
+            try:
+                if kind == "pause":
+                    chunk = silence(value, self._sample_rate)
+                else:
+                    started = time.time()
+                    chunk = self.backend.synthesize(value)
+                    self._sample_rate = chunk.sample_rate
+                    print(f"🎵 Synthesized {len(value)} chars in {time.time() - started:.2f}s ({self.backend.name})")
+            except Exception as e:
+                print(f"❌ TTS synthesis error: {e}")
+                self.backend.reset()
+                self.scheduler.task_done()
+                continue
+            self._audio_queue.put(chunk)
+
+    def _playback_loop(self):
+        while True:
+            chunk = self._audio_queue.get()
+            try:
+                if not self._interrupted.is_set():
+                    self.output.play(chunk, self._interrupted)
+            except Exception as e:
+                print(f"❌ Audio playback error: {e}")
+            finally:
+                self.scheduler.task_done()
+
+    def stop(self):
+        """Cut the current sentence short and drop everything queued"""
+        self._interrupted.set()
+        self.scheduler.clear()
+        while True:
+            try:
+                self._audio_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.scheduler.task_done()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued has played"""
+        return self.scheduler.join(timeout)
+
+    @property
+    def busy(self) -> bool:
+        return self.scheduler.unfinished() > 0
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+# Car client settings: the "client" section of config/settings.json, overridden by ZENDRIVE_CLIENT__* env vars.
+# Kept apart from backend.config so the client installs and runs without the server package.
+
+DEFAULT_SETTINGS_FILE = Path(__file__).resolve().parents[1] / "config" / "settings.json"
+ENV_PREFIX = "ZENDRIVE_CLIENT__"
+WATCH_INTERVAL_SECONDS = 5.0
+
+
+class ClientSettings(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    api_base_url: str = "http://localhost:8000/api"
+    voice_server_port: int = 8001
+    tts_rate: int = Field(150, ge=50, le=400, description="Speech rate in words per minute")
+    connect_timeout_s: float = Field(3.0, gt=0, description="Short so a car without signal falls back quickly")
+    request_timeout_s: float = Field(15.0, gt=0)
+    max_section_pause_s: float = Field(2.0, ge=0)
+    digest_budget_s: Optional[int] = Field(None, ge=5, le=600, description="Ask for digests that fit this many seconds")
+    urgent_deadline_s: float = Field(3.0, gt=0, description="Urgent speech older than this is dropped unspoken")
+    response_deadline_s: float = Field(20.0, gt=0)
+    background_deadline_s: float = Field(60.0, gt=0)
+    refresh_enabled: bool = Field(True, description="Keep cached digests fresh in the background")
+    refresh_min_s: float = Field(15.0, gt=0, description="Never poll one digest more often than this")
+    refresh_max_s: float = Field(3600.0, gt=0, description="Backoff ceiling while nothing changes")
+    meeting_refresh_s: float = Field(60.0, gt=0, description="Poll interval while a meeting is coming up")
+    meeting_window_s: float = Field(900.0, ge=0, description="How soon a meeting must start to count as coming up")
+
+
+def settings_file() -> Path:
+    """Settings file from ZENDRIVE_SETTINGS_FILE, else config/settings.json"""
+    return Path(os.getenv("ZENDRIVE_SETTINGS_FILE", DEFAULT_SETTINGS_FILE))
+
+
+def load_client_settings(path: Optional[Path] = None) -> ClientSettings:
+    """Validate the file's client section with env overrides (raises on bad values)"""
+    path = path or settings_file()
+    values: Dict[str, Any] = {}
+    try:
+        values.update(json.loads(path.read_text(encoding="utf-8")).get("client", {}))
+    except FileNotFoundError:
+        pass
+    for name, value in os.environ.items():
+        if name.startswith(ENV_PREFIX):
+            values[name[len(ENV_PREFIX):].lower()] = value or None
+    return ClientSettings(**values)
+
+
+class ClientSettingsManager:
+    """Current client settings snapshot, reloaded off the hot path.
+
+    `current` is a plain attribute read - speaking a sentence never touches
+    the filesystem. `check` (run by the watcher thread) reloads when the
+    file's mtime changes; a bad edit keeps the previous values. Listeners
+    get (old, new) so settings copied into long-lived objects follow along.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or settings_file()
+        self._mtime = self._stat()
+        self.current = load_client_settings(self.path)
+        self._listeners: List[Callable[[ClientSettings, ClientSettings], None]] = []
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return None
+
+    def subscribe(self, listener: Callable[[ClientSettings, ClientSettings], None]):
+        """Call listener(old, new) after each reload that changed something"""
+        self._listeners.append(listener)
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last load; True if the settings changed"""
+        with self._lock:
+            mtime = self._stat()
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            try:
+                fresh = load_client_settings(self.path)
+            except Exception as e:
+                print(f"⚠️ Client settings reload rejected, keeping previous values: {e}")
+                return False
+            previous = self.current
+            if fresh == previous:
+                return False
+            self.current = fresh
+        for listener in self._listeners:
+            try:
+                listener(previous, fresh)
+            except Exception as e:
+                print(f"⚠️ Client settings listener failed: {e}")
+        return True
+
+    def watch(self, interval_s: float = WATCH_INTERVAL_SECONDS):
+        """Poll the settings file on a daemon thread"""
+        if self._watcher is not None:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval_s)
+                self.check()
+
+        self._watcher = threading.Thread(target=poll, name="client-settings-watcher", daemon=True)
+        self._watcher.start()
+
+
+_manager: Optional[ClientSettingsManager] = None
+
+def get_client_settings_manager() -> ClientSettingsManager:
+    """Shared manager for the settings file in use (ZENDRIVE_SETTINGS_FILE can point elsewhere)"""
+    global _manager
+    if _manager is None or _manager.path != settings_file():
+        _manager = ClientSettingsManager()
+    return _manager
+
+def get_client_settings() -> ClientSettings:
+    """Current client settings snapshot - no file access, cheap enough for every utterance"""
+    return get_client_settings_manager().current
@@ -0,0 +1,426 @@
+import asyncio
+import json
+import re
+import threading
+import webbrowser
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+try:
+    from api.digest_cache import describe_age
+    from api.zendrive_client import APIError, ZenDriveAPI
+    from audio import speech_recognition as native_asr
+    from audio import text_to_speech
+    from config import get_client_settings
+except ImportError:
+    from client.api.digest_cache import describe_age
+    from client.api.zendrive_client import APIError, ZenDriveAPI
+    from client.audio import speech_recognition as native_asr
+    from client.audio import text_to_speech
+    from client.config import get_client_settings
+
+# Asyncio client runtime: one event loop owns the command server, backend calls and speech
+
+MAX_REQUEST_BYTES = 64 * 1024
+LONG_RUNNING_MODES = {"web", "keyboard", "native"}   # Modes that outlive a single command
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+
+
+MAIL_WORDS = re.compile(r"\b(e-?mails?|mails?|messages?|inbox)\b")
+CALENDAR_WORDS = re.compile(r"\b(calendar|schedule|meetings?|appointments?)\b")
+# "from"/"about" plus a sender or topic - not a time, as in "emails from today" or "my calendar from 3"
+TIME_WORDS = (r"today|tonight|yesterday|tomorrow|now|earlier|this|last|next|the\s+(?:last|past)|"
+              r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|noon|midnight")
+SEARCH_WORDS = re.compile(rf"\b(?:from|about|regarding)\s+(?!(?:{TIME_WORDS})\b)[a-z]")
+
+
+def classify_command(command: str) -> str:
+    """Intent for a spoken command: stop, search, briefing, priority, mail, calendar or unknown
+
+    "from"/"about" only make a mail search when the command is not about
+    the calendar, so "what's my meeting about" stays a calendar command.
+    """
+    command = command.lower().strip()
+    if any(word in command for word in ["stop", "quit", "exit", "goodbye"]):
+        return "stop"
+    if re.search(r"\b(briefing|brief me|catch me up|everything)\b", command):
+        return "briefing"
+    if CALENDAR_WORDS.search(command) and not MAIL_WORDS.search(command):
+        return "calendar"
+    if SEARCH_WORDS.search(command):
+        return "search"
+    if any(word in command for word in ["priority", "urgent", "important"]):
+        return "priority"
+    if any(word in command for word in ["email", "mail", "message", "get", "digest"]):
+        return "mail"
+    if re.search(r"\btoday\b", command):
+        return "calendar"
+    return "unknown"
+
+
+class DigestRefresher:
+    """Keeps the cached digests fresh between commands, at the pace the server hints.
+
+    Each digest is polled again after the server's X-Poll-Interval. When a
+    poll brings nothing new the wait doubles (up to `max_s`), so an idle car
+    soon polls rarely; any change goes straight back to the hint. While a
+    meeting is coming up, waits are capped at `meeting_s`.
+
+    Only the background poll backs off. For the server's hinted interval a
+    digest counts as fresh and commands speak it without refetching; after
+    that a command revalidates, speaking the cached copy with its age first.
+    """
+
+    ENDPOINTS = ("mail-digest/priority", "mail-digest", "calendar-digest")
+
+    def __init__(self, runtime: "AsyncVoiceRuntime", min_s: float = 15.0, max_s: float = 3600.0,
+                 meeting_s: float = 60.0, meeting_window_s: float = 900.0):
+        self.runtime = runtime
+        self.min_s = min_s
+        self.max_s = max_s
+        self.meeting_s = meeting_s
+        self.meeting_window_s = meeting_window_s
+        self._interval: Dict[str, float] = {}
+        self._due: Dict[str, float] = {}
+        self._fresh_until: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self.counters = {"polls": 0, "unchanged": 0, "failures": 0}
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
+
+    def fresh(self, endpoint: str) -> bool:
+        return self._now() < self._fresh_until.get(endpoint, 0.0)
+
+    def meeting_in(self) -> Optional[float]:
+        """Seconds until the next meeting starts, from the cached calendar digest"""
+        digest_cache = self.runtime.client.digest_cache
+        cached = digest_cache.get("calendar-digest") if digest_cache else None
+        if not cached:
+            return None
+        now = datetime.now()
+        starts = [datetime.fromisoformat(event["start"]) for event in cached[0].get("events", []) if event.get("start")]
+        upcoming = [(start - now).total_seconds() for start in starts if start > now]
+        return min(upcoming) if upcoming else None
+
+    def _schedule(self, endpoint: str, interval: float):
+        meeting_in = self.meeting_in()
+        if meeting_in is not None and meeting_in <= self.meeting_window_s:
+            interval = min(interval, self.meeting_s)
+        self._interval[endpoint] = interval
+        self._due[endpoint] = self._now() + interval
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def record(self, endpoint: str, changed: bool, hint_s: Optional[float]):
+        """A digest was fetched (by a command or by the refresher): plan its next poll"""
+        base = max(self.min_s, hint_s or self.min_s)
+        previous = self._interval.get(endpoint)
+        if not changed:
+            self.counters["unchanged"] += 1
+        interval = base if changed or previous is None else max(base, previous * 2)
+        self._schedule(endpoint, min(interval, self.max_s))
+        self._fresh_until[endpoint] = self._now() + min(base, self._interval[endpoint])
+
+    def failed(self, endpoint: str):
+        """Offline or server trouble: back off the same way"""
+        self.counters["failures"] += 1
+        self._schedule(endpoint, min(self.max_s, max(self.min_s, self._interval.get(endpoint, self.min_s) * 2)))
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        for endpoint in self.ENDPOINTS:
+            self._due.setdefault(endpoint, self._now())
+        while True:
+            for endpoint in [endpoint for endpoint in self.ENDPOINTS if self._due[endpoint] <= self._now()]:
+                self.counters["polls"] += 1
+                try:
+                    await self.runtime.fetch_digest(endpoint, prefetch=True)
+                except Exception as e:
+                    print(f"⚠️ Background refresh of {endpoint} failed (still offline?): {e}")
+            # Sleep until the next poll is due, or until a command's fetch reschedules one
+            self._wakeup.clear()
+            wait = min(self._due[endpoint] for endpoint in self.ENDPOINTS) - self._now()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait, 0.01))
+            except asyncio.TimeoutError:
+                pass
+
+
+class AsyncVoiceRuntime:
+    """Runs a ZenDriveVoiceClient on one event loop.
+
+    The client's formatting methods (`_speak_mail_digest` and friends) are
+    reused as-is: `client.speak` only queues text on the client's
+    StreamingSpeaker, so a digest is laid out instantly and spoken in the
+    background. Backend calls are awaited, so a briefing fetches every
+    section at once and speaks each one as soon as it and everything before
+    it has arrived.
+    """
+
+    def __init__(self, client, api: Optional[ZenDriveAPI] = None,
+                 speaker: Optional[text_to_speech.StreamingSpeaker] = None):
+        self.client = client
+        self.api = api
+        self.speaker = speaker or client.speaker
+        self.stopped: Optional[asyncio.Event] = None
+        self.refresher: Optional[DigestRefresher] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self, refresh: bool = True):
+        """Connect; `refresh` keeps digests fresh in the background (pointless for a one-shot command)"""
+        settings = get_client_settings()
+        self.stopped = asyncio.Event()
+        if self.api is None:
+            self.api = ZenDriveAPI(settings.api_base_url, settings.connect_timeout_s, settings.request_timeout_s,
+                                   settings.digest_budget_s)
+        self.refresher = DigestRefresher(self, settings.refresh_min_s, settings.refresh_max_s,
+                                         settings.meeting_refresh_s, settings.meeting_window_s)
+        if refresh and settings.refresh_enabled:
+            self.spawn(self.refresher.run())
+
+    async def drain(self):
+        """Wait (off the loop) until everything queued has been spoken"""
+        await asyncio.get_running_loop().run_in_executor(None, self.speaker.wait)
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        self.speaker.stop()
+        await self.api.close()
+
+    def spawn(self, coro: Awaitable) -> asyncio.Task:
+        """Run a coroutine in the background, keeping a reference until it finishes"""
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # Digests
+
+    async def fetch_digest(self, endpoint: str, prefetch: bool = False) -> Dict:
+        digest_cache = self.client.digest_cache
+        cached = digest_cache.get(endpoint) if digest_cache else None
+        try:
+            data, poll_s = await self.api.get_digest(endpoint, prefetch=prefetch)
+        except Exception:
+            self.refresher.failed(endpoint)
+            raise
+        if digest_cache:
+            digest_cache.put(endpoint, data)
+        self.refresher.record(endpoint, cached is None or cached[0].get("speech") != data.get("speech"), poll_s)
+        return data
+
+    async def speak_digest(self, endpoint: str, label: str, speak_digest: Callable, speak_delta: Callable,
+                           fetch: Optional[asyncio.Task] = None):
+        """Stale-while-revalidate: cached digest now, fresh data when it arrives"""
+        cached = self.client.digest_cache.get(endpoint) if self.client.digest_cache else None
+        if cached and fetch is None and self.refresher.fresh(endpoint):
+            # Within the server's poll interval - nothing newer to fetch
+            speak_digest(cached[0])
+            return
+        fetch = fetch or self.spawn(self.fetch_digest(endpoint))
+        if cached:
+            data, age = cached
+            print(f"💾 Using cached {label} from {describe_age(age)}")
+            self.client.speak(f"Here's your {label} from {describe_age(age)}", section_pause=0.5)
+            speak_digest(data)
+            self.spawn(self._speak_when_fresh(fetch, endpoint, data, speak_delta))
+            return
+        try:
+            speak_digest(await fetch)
+        except (APIError, OSError) as e:
+            print(f"❌ Could not fetch {endpoint}: {e}")
+            self.client.speak(f"Sorry, I couldn't get your {label} right now.")
+
+    async def _speak_when_fresh(self, fetch: asyncio.Task, endpoint: str, cached_data: Dict, speak_delta: Callable):
+        try:
+            fresh_data = await fetch
+        except Exception as e:
+            print(f"⚠️ Background refresh of {endpoint} failed (still offline?): {e}")
+            return
+        print(f"🔄 Refreshed cached {endpoint}")
+        speak_delta(cached_data, fresh_data)
+
+    async def briefing(self):
+        """Priority mail then calendar - both fetched at once, spoken in order"""
+        client = self.client
+        sections = [
+            ("mail-digest/priority", "priority emails", client._speak_priority_emails, client._speak_mail_delta),
+            ("calendar-digest", "calendar", client._speak_calendar_digest, client._speak_calendar_delta),
+        ]
+        fetches = [None if self.refresher.fresh(endpoint) else self.spawn(self.fetch_digest(endpoint))
+                   for endpoint, *_ in sections]
+        for (endpoint, label, speak_digest, speak_delta), fetch in zip(sections, fetches):
+            await self.speak_digest(endpoint, label, speak_digest, speak_delta, fetch=fetch)
+
+    async def search(self, command: str):
+        try:
+            data = await self.api.search(command)
+        except (APIError, OSError) as e:
+            print(f"❌ Search Error: {e}")
+            self.client.speak("Sorry, I couldn't search your emails right now.")
+            return
+        print(f"🔎 {data.get('result_count', 0)} results in {data.get('took_ms', 0)} ms")
+        self.client.speak(data.get("speech", "I couldn't find any matching emails."))
+
+    async def handle_command(self, command: str) -> str:
+        """Route one command; returns "stop" or "continue" once its speech is queued"""
+        command = command.lower().strip()
+        print(f"🔍 Processing VOICE command: '{command}'")
+        self.spawn(self.api.report_activity())
+        client = self.client
+        intent = classify_command(command)
+
+        # Acknowledgements are queued, not awaited - the fetch starts right away
+        if intent == "stop":
+            self.speaker.stop()
+            client.speak("Safe driving! ZenDrive signing off.", priority=text_to_speech.URGENT)
+            self.stopped.set()
+            return "stop"
+        if intent == "search":
+            client.speak("Searching your emails.")
+            await self.search(command)
+        elif intent == "briefing":
+            client.speak("Here's your briefing.")
+            await self.briefing()
+        elif intent == "priority":
+            client.speak("Getting your priority emails now.")
+            await self.speak_digest("mail-digest/priority", "priority emails",
+                                    client._speak_priority_emails, client._speak_mail_delta)
+        elif intent == "mail":
+            client.speak("Getting your complete email digest now.")
+            await self.speak_digest("mail-digest", "email digest", client._speak_mail_digest, client._speak_mail_delta)
+        elif intent == "calendar":
+            client.speak("Getting your calendar for today.")
+            await self.speak_digest("calendar-digest", "calendar",
+                                    client._speak_calendar_digest, client._speak_calendar_delta)
+        else:
+            client.speak("I didn't understand. Try saying emails, priority, calendar, briefing, or stop.")
+        return "continue"
+
+    # Browser command server
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Optional[Dict] = None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        headers = {**CORS_HEADERS, "Content-Length": str(len(body)), "Connection": "close"}
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                  500: "Internal Server Error"}.get(status, "OK")
+        head = f"HTTP/1.1 {status} {reason}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                return await self._respond(writer, 400)
+            method, path = request_line[0], request_line[1]
+
+            if method == "OPTIONS":
+                return await self._respond(writer, 200)
+            if method != "POST" or path != "/voice-command":
+                return await self._respond(writer, 404)
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_REQUEST_BYTES:
+                return await self._respond(writer, 413)
+            command_data = json.loads(await reader.readexactly(length) or b"{}")
+            command = command_data.get("command", "").lower().strip()
+            print(f"🎤 VOICE COMMAND RECEIVED: '{command}'")
+
+            if command and command != "wake":
+                result = await self.handle_command(command)
+                await self._respond(writer, 200, {"status": "success", "command": command, "result": result})
+            else:
+                self.spawn(self.api.report_activity())
+                await self._respond(writer, 200, {"status": "activated",
+                                                  "message": "ZenDrive activated - listening for commands"})
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            print(f"❌ Bad voice command request: {e}")
+            await self._respond(writer, 400)
+        except Exception as e:
+            print(f"❌ Error processing voice command: {e}")
+            await self._respond(writer, 500)
+        finally:
+            writer.close()
+
+    # Modes
+
+    async def run_web(self):
+        """Browser recognition -> local command server -> this loop"""
+        server = await asyncio.start_server(self._handle_connection, "", self.client.voice_server_port)
+        print(f"🌐 Voice command server started on port {self.client.voice_server_port}")
+        html_file = self.client.create_voice_interface()
+        await asyncio.get_running_loop().run_in_executor(None, webbrowser.open, html_file)
+        self.client.speak("ZenDrive voice interface is ready.")
+        async with server:
+            await self.stopped.wait()
+        await self.drain()
+
+    async def run_command(self, command: str):
+        """One command, spoken to the end"""
+        await self.handle_command(command)
+        await self.drain()
+
+    async def run_keyboard(self):
+        """Typed commands; input() waits on an executor thread"""
+        loop = asyncio.get_running_loop()
+        while not self.stopped.is_set():
+            command = (await loop.run_in_executor(None, input, "\n🗣️ [Type your command]: ")).lower().strip()
+            if command == "test":
+                self.client.test_tts_functionality()
+            elif command:
+                await self.handle_command(command)
+        await self.drain()
+
+    async def run_native(self, model_path: str):
+        """Offline recognition; the capture loop runs on an executor thread"""
+        loop = asyncio.get_running_loop()
+        capture_stop = threading.Event()
+
+        def on_command(command: str):
+            asyncio.run_coroutine_threadsafe(self.handle_command(command), loop)
+
+        def on_wake():
+            asyncio.run_coroutine_threadsafe(self.api.report_activity(), loop)
+            self.client.speak("ZenDrive activated. Go ahead.", priority=text_to_speech.URGENT)
+
+        recognizer = native_asr.StreamingRecognizer(native_asr.VoskEngine(model_path),
+                                                    on_command=on_command, on_wake=on_wake)
+        self.client.speak("ZenDrive native voice mode ready. Say ZenDrive to activate.")
+        capture = loop.run_in_executor(None, native_asr.run_microphone_recognition, recognizer, capture_stop)
+        await self.stopped.wait()
+        capture_stop.set()
+        await capture
+        await self.drain()
+
+
+def run_client(client, mode: str, **kwargs):
+    """Run one client mode (web, keyboard, native or command) on a fresh event loop"""
+    async def main():
+        runtime = AsyncVoiceRuntime(client)
+        await runtime.start(refresh=mode in LONG_RUNNING_MODES)
+        try:
+            await getattr(runtime, f"run_{mode}")(**kwargs)
+        finally:
+            await runtime.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🛑 ZenDrive shutting down...")
@@ -1,470 +1,258 @@
 import requests
-import http.server
-import socketserver
-import threading
-import webbrowser
-import json
 import os
-import time
-import queue
-from urllib.parse import urlparse, parse_qs
 
-# Try to import voice packages, fallback if not available
 try:
-    import pyttsx3
-    TTS_AVAILABLE = True
-    print("✅ Text-to-Speech loaded successfully!")
-except ImportError as e:
-    TTS_AVAILABLE = False
-    print(f"⚠️ Voice packages not available: {e}")
+    from api.digest_cache import DigestCache, mail_delta, event_delta
+    from config import get_client_settings, get_client_settings_manager
+    from audio import speech_recognition as native_asr
+    from audio import text_to_speech
+    from runtime import run_client
+except ImportError:
+    from client.api.digest_cache import DigestCache, mail_delta, event_delta
+    from client.config import get_client_settings, get_client_settings_manager
+    from client.audio import speech_recognition as native_asr
+    from client.audio import text_to_speech
+    from client.runtime import run_client
 
-class VoiceCommandHandler(http.server.BaseHTTPRequestHandler):
-    """HTTP handler for receiving voice commands from browser"""
-    
-    def __init__(self, *args, voice_client=None, **kwargs):
-        self.voice_client = voice_client
-        super().__init__(*args, **kwargs)
-    
-    def do_POST(self):
-        """Handle POST requests from browser with voice commands"""
-        print("🌐 HTTP POST REQUEST RECEIVED")
-        try:
-            if self.path == '/voice-command':
-                print("🌐 Processing /voice-command endpoint")
-                
-                # Read the command from browser
-                content_length = int(self.headers['Content-Length'])
-                post_data = self.rfile.read(content_length)
-                command_data = json.loads(post_data.decode('utf-8'))
-                
-                command = command_data.get('command', '').lower().strip()
-                print(f"🎤 VOICE COMMAND RECEIVED: '{command}'")
-                
-                # Process the command INSTANTLY
-                if command and command != 'wake':
-                    print(f"🔄 About to call process_voice_command with: '{command}'")
-                    result = self.voice_client.process_voice_command(command)
-                    print(f"✅ process_voice_command returned: {result}")
-                    
-                    # Send response back to browser
-                    response = {
-                        'status': 'success',
-                        'command': command,
-                        'result': result
-                    }
-                else:
-                    response = {
-                        'status': 'activated',
-                        'message': 'ZenDrive activated - listening for commands'
-                    }
-                
-                # Send JSON response
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.send_header('Access-Control-Allow-Methods', 'POST')
-                self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-                self.end_headers()
-                self.wfile.write(json.dumps(response).encode('utf-8'))
-                return
-                
-        except Exception as e:
-            print(f"❌ Error processing voice command: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # Default response
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(b'OK')
-    
-    def do_OPTIONS(self):
-        """Handle CORS preflight requests"""
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-    
-    def log_message(self, format, *args):
-        """Suppress server log messages"""
-        pass
-
-def create_voice_handler(voice_client):
-    """Create handler class with voice client reference"""
-    print(f"🔧 Creating handler with voice_client: {voice_client}")
-    def handler(*args, **kwargs):
-        print("🔧 Handler instance being created")
-        return VoiceCommandHandler(*args, voice_client=voice_client, **kwargs)
-    return handler
+def speech_deadlines(settings):
+    """Seconds each speech class may wait before it is dropped unspoken"""
+    return {
+        text_to_speech.URGENT: settings.urgent_deadline_s,
+        text_to_speech.RESPONSE: settings.response_deadline_s,
+        text_to_speech.BACKGROUND: settings.background_deadline_s,
+    }
 
 class ZenDriveVoiceClient:
     def __init__(self):
         """Initialize voice client for ZenDrive"""
-        self.tts_enabled = TTS_AVAILABLE
-        self.api_base_url = "http://localhost:8000/api"
-        self.voice_server_port = 8001
+        settings = get_client_settings()
+        self.api_base_url = settings.api_base_url
+        self.voice_server_port = settings.voice_server_port
         self.current_command = None
-        self.server_running = False
         
-        # Initialize TTS with queue-based system
-        if self.tts_enabled:
-            try:
-                self.tts_queue = queue.Queue()
-                self.tts_engine = None
-                self.tts_thread = None
-                self._start_tts_worker()
-                print("🎤 ZenDrive Voice Client initialized!")
-            except Exception as e:
-                print(f"⚠️ TTS initialization failed: {e}")
-                self.tts_enabled = False
-
-    def _start_tts_worker(self):
-        """Start a single TTS worker thread that processes the queue"""
-        def tts_worker():
-            try:
-                # Initialize TTS engine in this dedicated thread
-                self.tts_engine = pyttsx3.init()
-                
-                # Configure TTS settings for better performance and reliability
-                voices = self.tts_engine.getProperty('voices')
-                if voices:
-                    # Try to use a female voice if available, otherwise use first voice
-                    female_voice = None
-                    for voice in voices:
-                        if 'female' in voice.name.lower() or 'zira' in voice.name.lower() or 'hazel' in voice.name.lower():
-                            female_voice = voice
-                            break
-                    
-                    if female_voice:
-                        self.tts_engine.setProperty('voice', female_voice.id)
-                        print(f"🎵 Using voice: {female_voice.name}")
-                    else:
-                        self.tts_engine.setProperty('voice', voices[0].id)
-                        print(f"🎵 Using default voice: {voices[0].name}")
-                
-                # Optimized TTS settings for clear, structured delivery
-                self.tts_engine.setProperty('rate', 150)  # Balanced speed for clarity
-                self.tts_engine.setProperty('volume', 1.0)  # Full volume
-                
-                print("🎵 TTS worker thread started with optimized delivery settings")
-                
-                while True:
-                    try:
-                        # Get text from queue (blocks until available)
-                        text = self.tts_queue.get(timeout=30)
-                        
-                        if text == "STOP":
-                            break
-                        
-                        print(f"🎵 TTS worker processing: {text[:50]}...")
-                        print(f"🎵 Message length: {len(text)} characters")
-                        
-                        # Clear any existing speech and speak the text
-                        try:
-                            # Stop any current speech
-                            self.tts_engine.stop()
-                            
-                            # Minimal delay to ensure engine is ready
-                            time.sleep(0.1)
-                            
-                            # Speak the entire message
-                            print("🎵 Speaking message...")
-                            self.tts_engine.say(text)
-                            
-                            start_time = time.time()
-                            self.tts_engine.runAndWait()  # Block until speech completes
-                            actual_duration = time.time() - start_time
-                            
-                            print(f"✅ TTS completed successfully in {actual_duration:.1f} seconds")
-                            
-                            # Minimal pause to ensure audio clears
-                            time.sleep(0.2)
-                            
-                        except Exception as speech_error:
-                            print(f"❌ TTS speech error: {speech_error}")
-                            # Try recovery
-                            try:
-                                print("🔄 Attempting TTS recovery...")
-                                self.tts_engine = pyttsx3.init()
-                                self.tts_engine.setProperty('rate', 150)
-                                self.tts_engine.setProperty('volume', 1.0)
-                                self.tts_engine.say(text)
-                                self.tts_engine.runAndWait()
-                                print("✅ TTS recovery successful")
-                            except Exception as fallback_error:
-                                print(f"❌ TTS recovery failed: {fallback_error}")
-                        
-                        # Mark task as done
-                        self.tts_queue.task_done()
-                        
-                    except queue.Empty:
-                        print("🎵 TTS worker waiting for next message...")
-                        continue
-                    except Exception as e:
-                        print(f"❌ TTS worker error: {e}")
-                        
-            except Exception as e:
-                print(f"❌ TTS worker thread error: {e}")
+        # Offline-first digest cache (spoken immediately, refreshed in the background)
+        try:
+            self.digest_cache = DigestCache()
+        except Exception as e:
+            print(f"⚠️ Digest cache unavailable: {e}")
+            self.digest_cache = None
+        
+        # Pending speech is ordered by class (urgent, response, background); stale items are dropped
+        self.speech_scheduler = text_to_speech.SpeechScheduler(speech_deadlines(settings))
+        # Settings edits apply without a restart (deadlines included)
+        settings_manager = get_client_settings_manager()
+        settings_manager.subscribe(self._apply_settings)
+        settings_manager.watch()
         
-        # Start the worker thread
-        self.tts_thread = threading.Thread(target=tts_worker, daemon=True)
-        self.tts_thread.start()
+        # Streaming TTS pipeline (synthesis overlaps playback); text-only without an engine
+        try:
+            backend = text_to_speech.create_backend(rate=settings.tts_rate)
+            print(f"🎵 Streaming TTS ready ({backend.name})")
+        except Exception as e:
+            print(f"⚠️ TTS unavailable, text-only mode: {e}")
+            backend = text_to_speech.StubBackend()
+        self.speaker = text_to_speech.StreamingSpeaker(backend, scheduler=self.speech_scheduler)
+        print("🎤 ZenDrive Voice Client initialized!")
+
+    def _apply_settings(self, previous, current):
+        """Settings reloaded: carry over the values copied at startup"""
+        self.speech_scheduler.deadlines = {**self.speech_scheduler.deadlines, **speech_deadlines(current)}
 
-    def speak(self, text: str, section_pause: float = 0):
-        """Convert text to speech with optional section pause (max 2 seconds)"""
+    def speak(self, text: str, section_pause: float = 0, priority: int = text_to_speech.RESPONSE):
+        """Queue text for speech with an optional section pause (capped); never blocks"""
         print(f"🔊 Message: {text}")
-        
-        if self.tts_enabled and self.tts_queue:
-            try:
-                # Add text to queue
-                self.tts_queue.put(text)
-                print("🎵 Text added to TTS queue")
-                
-                # OPTIMIZED wait times - keep attention span
-                estimated_time = len(text) / 18 + 1  # Faster estimate: 18 chars per second at 150 WPM
-                actual_wait = max(1.5, min(estimated_time, 4))  # Between 1.5-4 seconds only
-                
-                if section_pause > 0:
-                    # Cap section pause at 2 seconds maximum
-                    capped_pause = min(section_pause, 2.0)
-                    actual_wait += capped_pause
-                    print(f"🕐 Waiting {actual_wait:.1f}s (including {capped_pause:.1f}s section pause)")
-                else:
-                    print(f"🕐 Waiting {actual_wait:.1f}s for TTS")
-                
-                time.sleep(actual_wait)
-                
-                # Debug queue status
-                print(f"🔍 TTS Queue size: {self.tts_queue.qsize()}")
-                
-            except Exception as e:
-                print(f"⚠️ TTS queue error: {e}")
-                print("💬 (Fallback to text display)")
-        else:
-            print("💬 (Text-only mode)")
+        pause = min(section_pause, get_client_settings().max_section_pause_s)
+        self.speaker.say(text, pause_after=pause, priority=priority)
+
+    def _email_line(self, email, separator):
+        """One digest entry - a single email, or a collapsed thread spoken as one item"""
+        sender = email.get('sender', 'Unknown sender')
+        subject = email.get('subject', 'No subject')
+        count = email.get('count', 1)
+        if count > 1 and email.get('kind') == 'similar':
+            return f"{count} similar messages, like {sender}: {subject}"
+        if count > 1:
+            return f"{count} messages in the {email.get('thread_subject', subject)} thread, latest from {sender}"
+        return f"{sender}{separator}{subject}"
 
-    def get_mail_digest(self):
-        """Get comprehensive email digest with SHORT structured pauses"""
-        print("🚀 ENTERING get_mail_digest() method - START")
+    def _speak_mail_digest(self, data):
+        """Speak a mail digest payload section by section"""
+        print(f"📧 Comprehensive email data received successfully")
+        
+        # Extract structured data
+        total_count = data.get("total_unread", 0)
+        priority_count = data.get("priority_count", 0)
+        priority_emails = data.get("priority_emails", [])
+        regular_emails = data.get("regular_emails", [])
+        
+        print(f"🔊 Speaking structured email digest with SHORT pauses...")
         
         try:
-            print("📡 Calling comprehensive email API...")
-            print(f"🔗 DEBUG: Full API URL = {self.api_base_url}/mail-digest")
+            # Section 1: Overview with SHORT pause
+            overview = f"You have {total_count} unread emails"
+            if priority_count > 0:
+                overview += f". {priority_count} are high priority"
             
-            response = requests.get(f"{self.api_base_url}/mail-digest", timeout=15)
+            self.speak(overview, section_pause=1.0)  # 1 second pause
             
-            print(f"📊 Response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"📧 Comprehensive email data received successfully")
-                
-                # Extract structured data
-                total_count = data.get("total_unread", 0)
-                priority_count = data.get("priority_count", 0)
-                priority_emails = data.get("priority_emails", [])
-                regular_emails = data.get("regular_emails", [])
+            # Section 2: Priority emails with SHORT pauses
+            if priority_emails:
+                self.speak("Priority emails", section_pause=0.5)  # 0.5 second pause
                 
-                print(f"🔊 Speaking structured email digest with SHORT pauses...")
-                
-                try:
-                    # Section 1: Overview with SHORT pause
-                    overview = f"You have {total_count} unread emails"
-                    if priority_count > 0:
-                        overview += f". {priority_count} are high priority"
-                    
-                    self.speak(overview, section_pause=1.0)  # 1 second pause
-                    
-                    # Section 2: Priority emails with SHORT pauses
-                    if priority_emails:
-                        self.speak("Priority emails", section_pause=0.5)  # 0.5 second pause
-                        
-                        for i, email in enumerate(priority_emails):
-                            sender = email.get('sender', 'Unknown sender')
-                            subject = email.get('subject', 'No subject')
-                            priority_text = f"{sender} says {subject}"
-                            
-                            # SHORT pauses between priority emails
-                            pause_time = 0.8 if i < len(priority_emails) - 1 else 1.0  # 0.8-1.0 seconds
-                            self.speak(priority_text, section_pause=pause_time)
+                for i, email in enumerate(priority_emails):
+                    priority_text = self._email_line(email, " says ")
                     
-                    # Section 3: Other emails with SHORT pauses
-                    if regular_emails:
-                        self.speak("Other emails", section_pause=0.5)  # 0.5 second pause
-                        
-                        # Limit to first 3 regular emails for voice
-                        display_emails = regular_emails[:3]
-                        
-                        for i, email in enumerate(display_emails):
-                            sender = email.get('sender', 'Unknown sender')
-                            subject = email.get('subject', 'No subject')
-                            other_text = f"{sender}: {subject}"
-                            
-                            # SHORT pauses between emails
-                            pause_time = 0.6 if i < len(display_emails) - 1 else 0.8  # 0.6-0.8 seconds
-                            self.speak(other_text, section_pause=pause_time)
-                        
-                        # If there are more emails, mention count
-                        if len(regular_emails) > 3:
-                            remaining = len(regular_emails) - 3
-                            self.speak(f"Plus {remaining} more emails", section_pause=0.3)  # 0.3 seconds
-                    
-                    print("✅ Structured email digest completed with SHORT pauses")
-                    
-                except Exception as speech_error:
-                    print(f"❌ Speech error: {speech_error}")
-                    # Fallback to single speech
-                    fallback_speech = data.get("speech", "Error retrieving email summary")
-                    self.speak(fallback_speech)
+                    # SHORT pauses between priority emails
+                    pause_time = 0.8 if i < len(priority_emails) - 1 else 1.0  # 0.8-1.0 seconds
+                    self.speak(priority_text, section_pause=pause_time)
+            
+            # Section 3: Other emails with SHORT pauses (background - anything urgent cuts in first)
+            if regular_emails:
+                self.speak("Other emails", section_pause=0.5, priority=text_to_speech.BACKGROUND)  # 0.5 second pause
                 
-                return data
-            else:
-                print(f"❌ API Error: Status {response.status_code}")
-                self.speak("Sorry, I couldn't retrieve your emails right now.")
-                return None
+                # A time-budgeted digest already holds just what fits; otherwise limit to the first 3
+                display_emails = regular_emails if "omitted_count" in data else regular_emails[:3]
                 
-        except Exception as e:
-            print(f"❌ Exception in get_mail_digest: {e}")
-            import traceback
-            traceback.print_exc()
-            self.speak("Sorry, there was an unexpected error with the email service.")
-            return None
-        finally:
-            print("🏁 EXITING get_mail_digest() method - END")
+                for i, email in enumerate(display_emails):
+                    other_text = self._email_line(email, ": ")
+                    
+                    # SHORT pauses between emails
+                    pause_time = 0.6 if i < len(display_emails) - 1 else 0.8  # 0.6-0.8 seconds
+                    self.speak(other_text, section_pause=pause_time, priority=text_to_speech.BACKGROUND)
+                
+            # If there are more emails, mention count
+            remaining = data.get("omitted_count", max(0, len(regular_emails) - 3))
+            if remaining:
+                self.speak(f"Plus {remaining} more emails", section_pause=0.3,
+                           priority=text_to_speech.BACKGROUND)  # 0.3 seconds
+            
+            print("✅ Structured email digest completed with SHORT pauses")
+            
+        except Exception as speech_error:
+            print(f"❌ Speech error: {speech_error}")
+            # Fallback to single speech
+            fallback_speech = data.get("speech", "Error retrieving email summary")
+            self.speak(fallback_speech)
 
-    def get_priority_emails(self):
-        """Get only high priority emails - quick urgent check with SHORT pauses"""
-        print("🚀 ENTERING get_priority_emails() method - START")
+    def _speak_mail_delta(self, old_data, new_data):
+        """Speak only the emails that arrived since the cached digest"""
+        delta = mail_delta(old_data, new_data)
+        count = delta["added_count"]
         
-        try:
-            print("📡 Getting priority emails only...")
-            print(f"🔗 DEBUG: Full API URL = {self.api_base_url}/mail-digest/priority")
-            
-            response = requests.get(f"{self.api_base_url}/mail-digest/priority", timeout=15)
-            
-            print(f"📊 Priority response status: {response.status_code}")
+        if not count:
+            print("✅ Cached email digest is still current")
+            return
+        
+        # Unprompted updates wait behind anything the driver asked for
+        background = text_to_speech.BACKGROUND
+        self.speak(f"Update: {count} new email{'s' if count != 1 else ''}", section_pause=0.5, priority=background)
+        named = delta["added"][:3]
+        for email in named:
+            self.speak(f"{email.get('sender', 'Unknown sender')} says {email.get('subject', 'No subject')}",
+                       section_pause=0.6, priority=background)
+        if count > len(named):
+            self.speak(f"Plus {count - len(named)} more new emails", section_pause=0.3, priority=background)
+
+    def _speak_priority_emails(self, data):
+        """Speak a priority digest payload"""
+        print(f"⚡ Priority data received: {data}")
+        
+        priority_count = data.get("priority_count", 0)
+        priority_emails = data.get("priority_emails", [])
+        
+        if priority_count == 0:
+            self.speak("You have no priority emails right now. All clear!")
+        else:
+            # Speak count first with SHORT pause
+            count_text = f"You have {priority_count} priority email{'s' if priority_count != 1 else ''}"
+            self.speak(count_text, section_pause=0.7)  # 0.7 seconds
             
-            if response.status_code == 200:
-                data = response.json()
-                print(f"⚡ Priority data received: {data}")
-                
-                priority_count = data.get("priority_count", 0)
-                priority_emails = data.get("priority_emails", [])
-                
-                if priority_count == 0:
-                    self.speak("You have no priority emails right now. All clear!")
-                else:
-                    # Speak count first with SHORT pause
-                    count_text = f"You have {priority_count} priority email{'s' if priority_count != 1 else ''}"
-                    self.speak(count_text, section_pause=0.7)  # 0.7 seconds
-                    
-                    # Speak each priority email with SHORT pauses
-                    for i, email in enumerate(priority_emails):
-                        sender = email.get('sender', 'Unknown sender')
-                        subject = email.get('subject', 'No subject')
-                        email_text = f"{sender} says {subject}"
-                        
-                        # SHORT pauses between emails
-                        pause_time = 0.8 if i < len(priority_emails) - 1 else 0.3  # 0.8/0.3 seconds
-                        self.speak(email_text, section_pause=pause_time)
+            # Speak each priority email with SHORT pauses
+            for i, email in enumerate(priority_emails):
+                email_text = self._email_line(email, " says ")
                 
-                print("✅ Priority emails spoken with SHORT pauses")
-                
-                return data
-            else:
-                print(f"❌ Priority API Error: Status {response.status_code}")
-                self.speak("Sorry, couldn't get priority emails right now.")
-                return None
-        except Exception as e:
-            print(f"❌ Priority Error: {e}")
-            self.speak("Error getting priority emails.")
-            return None
-        finally:
-            print("🏁 EXITING get_priority_emails() method - END")
+                # SHORT pauses between emails
+                pause_time = 0.8 if i < len(priority_emails) - 1 else 0.3  # 0.8/0.3 seconds
+                self.speak(email_text, section_pause=pause_time)
+            
+            if data.get("omitted_count"):
+                self.speak(f"Plus {data['omitted_count']} more", section_pause=0.3)
+        
+        print("✅ Priority emails spoken with SHORT pauses")
 
-    def get_calendar_digest(self):
-        """Get today's calendar summary with structured speaking and SHORT pauses"""
-        print("🚀 ENTERING get_calendar_digest() method - START")
+    def _speak_calendar_digest(self, data):
+        """Speak a calendar digest payload"""
+        print(f"📅 Calendar data received: {data}")
+        
+        total_events = data.get("total_events", 0)
+        events = data.get("events", [])
+        high_priority_count = data.get("high_priority_count", 0)
+        
+        print(f"🔊 Speaking structured calendar digest with SHORT pauses...")
         
         try:
-            print("📅 Getting your calendar...")
-            print(f"🔗 DEBUG: Full API URL = {self.api_base_url}/calendar-digest")
-            
-            response = requests.get(f"{self.api_base_url}/calendar-digest", timeout=15)
-            
-            print(f"📊 Calendar response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"📅 Calendar data received: {data}")
-                
-                total_events = data.get("total_events", 0)
-                events = data.get("events", [])
-                high_priority_count = data.get("high_priority_count", 0)
+            if total_events == 0:
+                self.speak("You have no meetings scheduled for today. Your calendar is free!")
+            else:
+                # Overview with SHORT pause
+                overview = f"You have {total_events} meeting{'s' if total_events != 1 else ''} today"
+                if high_priority_count > 0:
+                    overview += f". {high_priority_count} high priority"
                 
-                print(f"🔊 Speaking structured calendar digest with SHORT pauses...")
+                self.speak(overview, section_pause=1.0)  # 1.0 seconds
                 
-                try:
-                    if total_events == 0:
-                        self.speak("You have no meetings scheduled for today. Your calendar is free!")
-                    else:
-                        # Overview with SHORT pause
-                        overview = f"You have {total_events} meeting{'s' if total_events != 1 else ''} today"
-                        if high_priority_count > 0:
-                            overview += f". {high_priority_count} high priority"
-                        
-                        self.speak(overview, section_pause=1.0)  # 1.0 seconds
-                        
-                        # High priority meetings first with SHORT pause
-                        high_priority_events = [e for e in events if e.get("priority") == "high"]
-                        if high_priority_events:
-                            self.speak("Priority meetings", section_pause=0.5)  # 0.5 seconds
-                            
-                            for event in high_priority_events:
-                                time_str = event.get("time", "Unknown time")
-                                title = event.get("title", "Untitled meeting")
-                                meeting_text = f"{title} at {time_str}"
-                                self.speak(meeting_text, section_pause=0.8)  # 0.8 seconds
-                        
-                        # First meeting of the day with SHORT pause
-                        if events:
-                            first_meeting = events[0]
-                            if first_meeting.get("priority") != "high":  # Don't repeat if already mentioned
-                                first_text = f"Your day starts with {first_meeting.get('title', 'a meeting')} at {first_meeting.get('time', 'unknown time')}"
-                                self.speak(first_text, section_pause=0.6)  # 0.6 seconds
-                        
-                        # End time with SHORT pause
-                        if events:
-                            last_meeting = events[-1]
-                            end_time = last_meeting.get("time", "unknown time")
-                            try:
-                                duration = last_meeting.get("duration", "30 minutes")
-                                self.speak(f"You'll be free after your last meeting", section_pause=0.3)  # 0.3 seconds
-                            except:
-                                self.speak(f"Your last meeting is at {end_time}", section_pause=0.3)  # 0.3 seconds
+                # High priority meetings first with SHORT pause
+                high_priority_events = [e for e in events if e.get("priority") == "high"]
+                if high_priority_events:
+                    self.speak("Priority meetings", section_pause=0.5)  # 0.5 seconds
                     
-                    print("✅ Calendar digest spoken with SHORT pauses")
-                    
-                except Exception as speech_error:
-                    print(f"❌ Calendar speech error: {speech_error}")
-                    # Fallback to original speech
-                    fallback_speech = data.get("speech", "Error retrieving calendar")
-                    self.speak(fallback_speech)
-                
-                return data
-            else:
-                print(f"❌ Calendar API Error: Status {response.status_code}")
-                self.speak("Sorry, I couldn't retrieve your calendar right now.")
-                return None
-                
-        except Exception as e:
-            print(f"❌ Calendar Error: {e}")
-            self.speak("Sorry, there was an error getting your calendar.")
-            return None
-        finally:
-            print("🏁 EXITING get_calendar_digest() method - END")
+                    for event in high_priority_events:
+                        time_str = event.get("time", "Unknown time")
+                        title = event.get("title", "Untitled meeting")
+                        meeting_text = f"{title} at {time_str}"
+                        self.speak(meeting_text, section_pause=0.8)  # 0.8 seconds
+                
+                # First meeting of the day with SHORT pause
+                if events:
+                    first_meeting = events[0]
+                    if first_meeting.get("priority") != "high":  # Don't repeat if already mentioned
+                        first_text = f"Your day starts with {first_meeting.get('title', 'a meeting')} at {first_meeting.get('time', 'unknown time')}"
+                        self.speak(first_text, section_pause=0.6)  # 0.6 seconds
+                
+                # End time with SHORT pause
+                if events:
+                    free_after = data.get("free_after")
+                    if free_after:
+                        self.speak(f"You'll be free after {free_after}", section_pause=0.3)  # 0.3 seconds
+                    else:
+                        self.speak("You're done with meetings for today", section_pause=0.3)  # 0.3 seconds
+            
+            print("✅ Calendar digest spoken with SHORT pauses")
+            
+        except Exception as speech_error:
+            print(f"❌ Calendar speech error: {speech_error}")
+            # Fallback to original speech
+            fallback_speech = data.get("speech", "Error retrieving calendar")
+            self.speak(fallback_speech)
+
+    def _speak_calendar_delta(self, old_data, new_data):
+        """Speak only calendar changes since the cached digest"""
+        delta = event_delta(old_data, new_data)
+        
+        if not any(delta.values()):
+            print("✅ Cached calendar is still current")
+            return
+        
+        background = text_to_speech.BACKGROUND
+        self.speak("Calendar update", section_pause=0.5, priority=background)
+        for event in delta["added"]:
+            self.speak(f"New: {event.get('title', 'a meeting')} at {event.get('time', 'unknown time')}",
+                       section_pause=0.6, priority=background)
+        for event in delta["changed"]:
+            self.speak(f"Moved: {event.get('title', 'a meeting')} is now at {event.get('time', 'unknown time')}",
+                       section_pause=0.6, priority=background)
+        for event in delta["removed"]:
+            self.speak(f"Cancelled: {event.get('title', 'a meeting')}", section_pause=0.6, priority=background)
 
     def test_tts_functionality(self):
         """Test TTS with structured sections and SHORT pauses"""
@@ -490,34 +278,6 @@ class ZenDriveVoiceClient:
         
         print("🧪 Structured TTS test completed with SHORT pauses")
 
-    def process_voice_command(self, command):
-        """Process voice command and execute action"""
-        command = command.lower().strip()
-        print(f"🔍 Processing VOICE command: '{command}'")
-        
-        if any(word in command for word in ["stop", "quit", "exit", "goodbye"]):
-            self.speak("Safe driving! ZenDrive signing off.")
-            return "stop"
-            
-        elif any(word in command for word in ["priority", "urgent", "important"]):
-            self.speak("Getting your priority emails now.")
-            self.get_priority_emails()
-            return "continue"
-            
-        elif any(word in command for word in ["email", "mail", "message", "get", "digest"]):
-            self.speak("Getting your complete email digest now.")
-            self.get_mail_digest()
-            return "continue"
-            
-        elif any(word in command for word in ["calendar", "schedule", "meetings", "today"]):
-            self.speak("Getting your calendar for today.")
-            self.get_calendar_digest()
-            return "continue"
-            
-        else:
-            self.speak("I didn't understand. Try saying emails, priority, calendar, or stop.")
-            return "continue"
-
     def create_voice_interface(self):
         """Create HTML interface with enhanced voice recognition"""
         html_content = '''<!DOCTYPE html>
@@ -1007,24 +767,6 @@ class ZenDriveVoiceClient:
         
         return 'zendrive_voice.html'
 
-    def start_voice_server(self):
-        """Start HTTP server to receive voice commands from browser"""
-        print("🔧 Creating voice command handler...")
-        handler = create_voice_handler(self)
-        print(f"✅ Handler created with voice_client: {self}")
-        
-        try:
-            with socketserver.TCPServer(("", self.voice_server_port), handler) as httpd:
-                print(f"🌐 Voice command server started on port {self.voice_server_port}")
-                print("🎯 Server ready to receive HTTP POST requests...")
-                self.server_running = True
-                httpd.serve_forever()
-        except Exception as e:
-            print(f"❌ Error starting voice server: {e}")
-            import traceback
-            traceback.print_exc()
-            self.server_running = False
-
     def start_web_voice_mode(self):
         """Start voice-first web interface"""
         print("🌐 Starting ZenDrive Voice Interface...")
@@ -1038,28 +780,6 @@ class ZenDriveVoiceClient:
             print(f"⚠️ Error: {e}")
             print("⚠️ Make sure to run: python -m uvicorn backend.main:app --reload --port 8000")
         
-        # Start voice command server in background
-        server_thread = threading.Thread(target=self.start_voice_server, daemon=True)
-        server_thread.start()
-        
-        # Wait for server to start
-        time.sleep(2)
-        
-        if not self.server_running:
-            print("❌ Failed to start voice server")
-            return
-        
-        # Create HTML interface
-        html_file = self.create_voice_interface()
-        
-        print("✅ Voice interface created!")
-        print("🌐 Opening browser...")
-        
-        # Open browser
-        webbrowser.open(html_file)
-        
-        self.speak("ZenDrive voice interface is ready with optimized SHORT pause delivery.")
-        
         print("\n" + "="*80)
         print("🎤 ZENDRIVE VOICE INTERFACE - COMPLETELY FIXED TTS VERSION")
         print("🌐 Browser opened with voice recognition")
@@ -1084,18 +804,29 @@ class ZenDriveVoiceClient:
         print("• 📧 'get emails' - FAST structured comprehensive digest")
         print("• ⚡ 'priority' - FAST structured priority-only check")
         print("• 📅 'calendar' - FAST structured calendar overview")
+        print("• 📰 'briefing' - Priority emails and calendar, fetched together")
         print("• ⏹️ 'stop' - Deactivate ZenDrive")
         print("="*80)
         
-        try:
-            # Keep the main thread alive
-            while True:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print("\n🛑 ZenDrive shutting down...")
-        
+        # Command server, backend calls and speech all run on one event loop
+        run_client(self, "web")
         print("🌐 Voice interface ended.")
 
+    def start_native_voice_mode(self):
+        """Start on-device streaming recognition (PyAudio + VAD + offline engine)"""
+        print("🎙️ Starting native ZenDrive voice recognition...")
+        
+        model_path = os.getenv("ZENDRIVE_VOSK_MODEL")
+        if not native_asr.PYAUDIO_AVAILABLE:
+            print("❌ PyAudio is not installed - use the browser voice interface instead")
+            return
+        if not (native_asr.VOSK_AVAILABLE and model_path):
+            print("❌ No offline engine - install vosk and set ZENDRIVE_VOSK_MODEL to a model directory")
+            return
+        
+        run_client(self, "native", model_path=model_path)
+        print("🎙️ Native voice mode ended.")
+
     def keyboard_simulation_mode(self):
         """Keyboard simulation for testing optimized SHORT pause speech"""
         self.speak("ZenDrive keyboard simulation mode with optimized SHORT pauses activated.")
@@ -1106,25 +837,14 @@ class ZenDriveVoiceClient:
         print("• 'emails' / 'digest' - Get FAST structured email digest") 
         print("• 'priority' / 'urgent' - Get FAST structured priority emails")
         print("• 'calendar' - Get FAST structured calendar")
+        print("• 'briefing' - Priority emails and calendar, fetched together")
         print("• 'test' - Test OPTIMIZED TTS functionality")
         print("• 'stop' - Exit")
         print("")
         print("⚡ Timing: SHORT pauses (0.3-1.0s), Fast delivery, No attention loss")
         print("="*70)
         
-        while True:
-            command = input("\n🗣️ [Type your command]: ").lower().strip()
-            
-            if not command:
-                continue
-            
-            if command == "test":
-                self.test_tts_functionality()
-                continue
-                
-            result = self.process_voice_command(command)
-            if result == "stop":
-                break
+        run_client(self, "keyboard")
 
 # Test the client
 if __name__ == "__main__":
@@ -1138,23 +858,24 @@ if __name__ == "__main__":
     print("4. 🧪 OPTIMIZED TTS functionality test (SHORT pauses)")
     print("5. ⌨️ Keyboard simulation mode")
     print("6. 🚗 Voice Assistant Interface")
+    print("7. 🎙️ Native Voice Mode (offline recognition)")
     
-    choice = input("Enter 1, 2, 3, 4, 5, or 6: ")
+    choice = input("Enter 1, 2, 3, 4, 5, 6, or 7: ")
     
     if choice == "1":
-        client.speak("Getting your FAST structured email digest")
-        client.get_mail_digest()
+        run_client(client, "command", command="email digest")
     elif choice == "2":
-        client.speak("Getting your FAST structured priority emails")
-        client.get_priority_emails()
+        run_client(client, "command", command="priority emails")
     elif choice == "3":
-        client.speak("Getting your FAST structured calendar digest")
-        client.get_calendar_digest()
+        run_client(client, "command", command="calendar")
     elif choice == "4":
         client.test_tts_functionality()
     elif choice == "5":
         client.keyboard_simulation_mode()
     elif choice == "6":
         client.start_web_voice_mode()
+    elif choice == "7":
+        client.start_native_voice_mode()
     else:
-        client.speak("Invalid choice. Goodbye!")
\ No newline at end of file
+        client.speak("Invalid choice. Goodbye!")    
+    client.speaker.wait()   # Speech plays on daemon threads - let it finish before exiting
@@ -0,0 +1,139 @@
+"""Throughput of the digest endpoint against the number of server workers.
+
+Starts gunicorn with 1, 2, 4... uvicorn workers on one box (shared SQLite
+digest tier), drives /api/mail-digest from concurrent keep-alive clients
+spread over many users, and prints requests/second and latency per worker
+count.
+
+    python scripts/bench_workers.py --workers 1 2 4 --clients 64 --seconds 15
+"""
+import argparse
+import http.client
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def start_server(workers: int, port: int, data_dir: str) -> subprocess.Popen:
+    env = dict(os.environ,
+               ZENDRIVE_DATA_DIR=data_dir,
+               ZENDRIVE_CACHE__SHARED_TIER="sqlite",
+               ZENDRIVE_WORKERS__WORKERS="1",
+               ZENDRIVE_RATE_LIMIT__ENABLED="false")   # Measure serving, not the limiter
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "backend.main:app",
+         "--worker-class", "uvicorn.workers.UvicornWorker",
+         "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, start_new_session=True,
+    )
+
+
+def wait_ready(port: int, timeout_s: float = 30.0):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not come up")
+
+
+def client_loop(port: int, users: int, stop_at: float, latencies: list, errors: list):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    while time.time() < stop_at:
+        path = f"/api/mail-digest?user_id=driver-{random.randrange(users)}"
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def load_process(port: int, clients: int, users: int, seconds: float):
+    """One load-generator process: `clients` threads, returns (latencies, errors)"""
+    latencies, errors = [], []
+    stop_at = time.time() + seconds
+    threads = [threading.Thread(target=client_loop, args=(port, users, stop_at, latencies, errors))
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def run_load(port: int, clients: int, users: int, seconds: float, procs: int) -> dict:
+    # Clients are spread over processes so the load generator isn't what saturates
+    latencies, errors = [], []
+    with ProcessPoolExecutor(max_workers=procs) as pool:
+        futures = [pool.submit(load_process, port, max(1, clients // procs), users, seconds) for _ in range(procs)]
+        for future in futures:
+            proc_latencies, proc_errors = future.result()
+            latencies.extend(proc_latencies)
+            errors.extend(proc_errors)
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else float("nan")
+    return {"rps": len(latencies) / seconds, "p50_ms": percentile(0.5), "p95_ms": percentile(0.95),
+            "errors": len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent keep-alive connections")
+    parser.add_argument("--users", type=int, default=500, help="Distinct user ids to spread requests over")
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--procs", type=int, default=4, help="Load-generator processes")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory(prefix="zendrive_bench_") as data_dir:
+            server = start_server(workers, args.port, data_dir)
+            try:
+                wait_ready(args.port)
+                run_load(args.port, args.clients, args.users, args.warmup, args.procs)
+                result = run_load(args.port, args.clients, args.users, args.seconds, args.procs)
+            finally:
+                os.killpg(server.pid, signal.SIGTERM)
+                server.wait(timeout=30)
+        results.append((workers, result))
+        print(f"{workers} worker(s): {result['rps']:8.0f} req/s  p50 {result['p50_ms']:6.1f} ms  "
+              f"p95 {result['p95_ms']:6.1f} ms  errors {result['errors']}")
+
+    base_rps = results[0][1]["rps"] / results[0][0]
+    print("\nworkers  req/s  speedup  efficiency")
+    for workers, result in results:
+        speedup = result["rps"] / results[0][1]["rps"] if results[0][1]["rps"] else float("nan")
+        efficiency = result["rps"] / (base_rps * workers) if base_rps else float("nan")
+        print(f"{workers:7d}  {result['rps']:5.0f}  {speedup:6.2f}x  {efficiency:9.0%}")
+
+
+if __name__ == "__main__":
+    main()
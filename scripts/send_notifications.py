@@ -0,0 +1,79 @@
+"""Local stand-in for the upstream change-notification sender.
+
+Subscribes a user's folder through the backend, performs the validation
+handshake the way Graph does, then posts a burst of change notifications
+(plus one with a wrong clientState, which must be rejected) and shows how
+the burst was coalesced.
+
+    python scripts/send_notifications.py --user driver-1 --folder mail --burst 20
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+
+def call(method: str, url: str, body=None, headers=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method,
+                                     headers={"Content-Type": "application/json", **(headers or {})})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+def notification(subscription, change_type: str = "created", client_state=None):
+    item_id = uuid.uuid4().hex
+    return {
+        "subscriptionId": subscription["id"],
+        "clientState": client_state or subscription["clientState"],
+        "changeType": change_type,
+        "resource": f"{subscription['resource']}/{item_id}",
+        "resourceData": {"@odata.type": "#Microsoft.Graph.Message", "id": item_id},
+        "subscriptionExpirationDateTime": subscription["expirationDateTime"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--api", default="http://localhost:8000/api")
+    parser.add_argument("--user", default="default")
+    parser.add_argument("--folder", choices=["mail", "calendar"], default="mail")
+    parser.add_argument("--burst", type=int, default=20, help="Notifications sent back to back")
+    args = parser.parse_args()
+
+    user = {"X-User-Id": args.user}
+    status, body = call("POST", f"{args.api}/notifications/subscriptions", {"folder": args.folder}, headers=user)
+    if status != 200:
+        raise SystemExit(f"Subscribe failed: HTTP {status} {body}")
+    subscription = json.loads(body)
+    print(f"Subscribed {subscription['resource']} ({subscription['id']})")
+
+    token = uuid.uuid4().hex
+    status, body = call("POST", f"{subscription['notificationUrl']}?validationToken={urllib.parse.quote(token)}")
+    print(f"Validation handshake: HTTP {status}, token echoed: {body == token}")
+
+    started = time.perf_counter()
+    for i in range(args.burst):
+        status, body = call("POST", subscription["notificationUrl"],
+                            {"value": [notification(subscription, "created" if i % 3 else "updated")]})
+    print(f"Sent {args.burst} notifications in {(time.perf_counter() - started) * 1000:.0f} ms (last: HTTP {status} {body})")
+
+    status, body = call("POST", subscription["notificationUrl"],
+                        {"value": [notification(subscription, client_state="forged")]})
+    print(f"Forged clientState: HTTP {status} {body}")
+
+    time.sleep(3)   # Let the coalescing window close
+    status, body = call("GET", f"{args.api}/notifications/status", headers=user)
+    print(f"Status: {body}")
+
+    call("DELETE", f"{args.api}/notifications/subscriptions/{subscription['id']}", headers=user)
+
+
+if __name__ == "__main__":
+    main()
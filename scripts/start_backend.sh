@@ -0,0 +1,33 @@
+#!/usr/bin/env bash
+# Start the ZenDrive API.
+#
+#   scripts/start_backend.sh              # one uvicorn process with --reload (development)
+#   WORKERS=4 scripts/start_backend.sh    # gunicorn with 4 uvicorn workers sharing a digest tier
+#
+# With several workers, digests are shared through the SQLite tier in the data
+# directory and each worker follows the others' invalidations. Set
+# ZENDRIVE_CACHE__SHARED_TIER=redis (and ZENDRIVE_CACHE__REDIS_URL) to use a
+# Redis-compatible server instead, and ZENDRIVE_RATE_LIMIT__BACKEND=redis so
+# rate limits are shared too. Delta cursors are per worker, so put a sticky
+# load balancer in front if clients use ?since=/?session=.
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+HOST="${HOST:-0.0.0.0}"
+PORT="${PORT:-8000}"
+WORKERS="${WORKERS:-1}"
+
+if [ "$WORKERS" -le 1 ]; then
+    exec python -m uvicorn backend.main:app --host "$HOST" --port "$PORT" --reload
+fi
+
+export ZENDRIVE_CACHE__SHARED_TIER="${ZENDRIVE_CACHE__SHARED_TIER:-sqlite}"
+# Heavy-job processes are per worker: split the cores between them
+export ZENDRIVE_WORKERS__WORKERS="${ZENDRIVE_WORKERS__WORKERS:-1}"
+
+exec gunicorn backend.main:app \
+    --worker-class uvicorn.workers.UvicornWorker \
+    --workers "$WORKERS" \
+    --bind "$HOST:$PORT" \
+    --timeout 60 \
+    --graceful-timeout 30
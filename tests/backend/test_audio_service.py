@@ -0,0 +1,136 @@
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import audio_service
+from backend.services.audio_service import AudioCache, PiperEngine, parse_range
+
+client = TestClient(app)
+
+
+class InlinePool:
+    """Renders in-process, counting jobs"""
+
+    def __init__(self):
+        self.jobs = 0
+
+    async def submit(self, fn, *args, **kwargs):
+        self.jobs += 1
+        return fn(*args)
+
+
+@pytest.fixture
+def stub_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("ZENDRIVE_AUDIO_ENGINE", "stub")
+    pool = InlinePool()
+    monkeypatch.setattr(audio_service, "get_worker_pool", lambda: pool)
+    monkeypatch.setattr(audio_service, "_audio_cache", AudioCache(root=tmp_path))
+    return pool
+
+
+def put(cache, name, size, age_s):
+    path = cache.path_for(name * 8, "wav")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+    stamp = time.time() - age_s
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    for bad in ("bytes=100-", "bytes=-", "items=0-1", "bytes=9-2"):
+        with pytest.raises(HTTPException) as error:
+            parse_range(bad, 100)
+        assert error.value.status_code == 416
+
+
+def test_prune_drops_expired_then_least_recently_used(tmp_path):
+    cache = AudioCache(root=tmp_path, max_bytes=250, max_age_s=3600)
+    expired = put(cache, "aa", 10, age_s=7200)
+    oldest = put(cache, "bb", 100, age_s=300)
+    newer = put(cache, "cc", 100, age_s=200)
+    newest = put(cache, "dd", 100, age_s=100)
+    assert cache.prune() == 2
+    assert [p.exists() for p in (expired, oldest, newer, newest)] == [False, False, True, True]
+
+
+def test_prune_keeps_the_file_just_rendered(tmp_path):
+    cache = AudioCache(root=tmp_path, max_bytes=50, max_age_s=3600)
+    old = put(cache, "aa", 100, age_s=100)
+    fresh = put(cache, "bb", 100, age_s=100)
+    cache.prune(keep=fresh)
+    assert fresh.exists() and not old.exists()
+
+
+def test_audio_is_rendered_once_and_served_in_ranges(stub_cache):
+    headers = {"X-User-Id": "audio-driver"}
+    full = client.get("/api/mail-digest/audio", headers=headers)
+    assert full.status_code == 200
+    assert full.headers["content-type"] == "audio/wav"
+    assert full.content[:4] == b"RIFF"
+    size = len(full.content)
+
+    part = client.get("/api/mail-digest/audio", headers={**headers, "Range": "bytes=100-199"})
+    assert part.status_code == 206
+    assert part.headers["content-range"] == f"bytes 100-199/{size}"
+    assert part.content == full.content[100:200]
+
+    tail = client.get("/api/mail-digest/audio", headers={**headers, "Range": "bytes=-44"})
+    assert tail.content == full.content[-44:]
+    assert client.get("/api/mail-digest/audio", headers={**headers, "Range": f"bytes={size}-"}).status_code == 416
+
+    cached = client.get("/api/mail-digest/audio", headers={**headers, "If-None-Match": full.headers["etag"]})
+    assert cached.status_code == 304
+    assert stub_cache.jobs == 1
+
+
+def test_piper_voices_must_be_model_files_in_the_model_dir(tmp_path):
+    engine = PiperEngine(str(tmp_path))
+    assert engine.valid_voice("default")
+    assert not engine.valid_voice("en_US-amy-low.onnx")           # Not installed
+    (tmp_path / "en_US-amy-low.onnx").write_bytes(b"model")
+    assert engine.valid_voice("en_US-amy-low.onnx")
+    for bad in ("../../etc/passwd", "/etc/passwd.onnx", "sub/x.onnx", "en_US-amy-low"):
+        assert not engine.valid_voice(bad), bad
+
+
+def test_bad_voice_names_are_rejected(stub_cache):
+    for voice in ("../secrets", "--help", "a/b"):
+        response = client.get("/api/mail-digest/audio", params={"voice": voice}, headers={"X-User-Id": "voice-driver"})
+        assert response.status_code == 400, voice
+    assert stub_cache.jobs == 0
+
+
+def test_known_etag_is_answered_without_rendering(stub_cache):
+    headers = {"X-User-Id": "etag-driver"}
+    script = client.get("/api/mail-digest", headers=headers).json()["speech"]
+    etag = f'"{audio_service._audio_cache.key(script, "default", "wav")}"'
+    cached = client.get("/api/mail-digest/audio", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert stub_cache.jobs == 0
+
+
+def test_audio_pruned_before_it_is_served_is_rendered_again(stub_cache, monkeypatch):
+    cache = audio_service._audio_cache
+    render, served = cache.get_or_render, []
+
+    async def pruned_once(*args):
+        key, path = await render(*args)
+        if not served:
+            path.unlink()                                           # Another render's prune got there first
+        served.append(path)
+        return key, path
+
+    monkeypatch.setattr(cache, "get_or_render", pruned_once)
+    response = client.get("/api/mail-digest/audio", headers={"X-User-Id": "pruned-driver"})
+    assert response.status_code == 200 and response.content[:4] == b"RIFF"
+    assert stub_cache.jobs == 2
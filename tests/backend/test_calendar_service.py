@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta
+
+from backend.services.calendar_service import CalendarEvent, CalendarIndex, format_clock, parse_event_time
+from backend.services.change_log import get_calendar_index, get_calendar_store
+
+DAY = date(2025, 10, 21)
+
+
+def event(event_id, start, end, **fields):
+    return {"id": event_id, "title": fields.pop("title", event_id), "start_time": start, "end_time": end, **fields}
+
+
+def index_of(*events):
+    return CalendarIndex.from_dicts(list(events), DAY)
+
+
+def at(clock):
+    return parse_event_time(clock, DAY)
+
+
+def test_parse_event_time_formats():
+    assert parse_event_time("09:30", DAY) == datetime(2025, 10, 21, 9, 30)
+    assert parse_event_time("2:15 PM", DAY) == datetime(2025, 10, 21, 14, 15)
+    assert parse_event_time("11 AM", DAY) == datetime(2025, 10, 21, 11, 0)
+    assert parse_event_time("2025-10-22T08:00:00", DAY) == datetime(2025, 10, 22, 8, 0)
+
+
+def test_format_clock_drops_leading_zero():
+    assert format_clock(datetime(2025, 10, 21, 9, 5)) == "9:05 AM"
+
+
+def test_next_meeting_and_upcoming():
+    index = index_of(event("late", "15:00", "16:00"), event("early", "09:00", "09:30"),
+                     event("mid", "11:00", "12:00"))
+    assert [e.id for e in index.events] == ["early", "mid", "late"]
+    assert index.next_meeting(at("10:00")).id == "mid"
+    assert index.next_meeting(at("16:30")) is None
+    assert [e.id for e in index.upcoming(at("11:30"), 240)] == ["mid", "late"]
+
+
+def test_current_meetings_sees_long_meeting_behind_short_ones():
+    index = index_of(event("allday", "08:00", "18:00"), event("short", "09:00", "09:15"))
+    assert [e.id for e in index.current_meetings(at("12:00"))] == ["allday"]
+
+
+def test_free_slots_and_busy_blocks():
+    index = index_of(event("a", "09:00", "10:00"), event("b", "09:30", "10:30"), event("c", "13:00", "14:00"))
+    assert index.busy_blocks == [(at("09:00"), at("10:30")), (at("13:00"), at("14:00"))]
+    assert index.free_slots(at("08:00"), at("15:00"), min_minutes=60) == [
+        (at("08:00"), at("09:00")), (at("10:30"), at("13:00")), (at("14:00"), at("15:00"))]
+    assert index.free_slots(at("08:00"), at("15:00"), min_minutes=90) == [(at("10:30"), at("13:00"))]
+    assert not index.is_free(at("10:15"))
+    assert index.is_free(at("12:00"))
+    assert index.free_after(at("12:00")) == at("14:00")
+    assert index.free_after(at("14:30")) is None
+
+
+def test_conflicts():
+    index = index_of(event("a", "09:00", "10:00"), event("b", "09:30", "10:30"), event("c", "10:00", "11:00"))
+    pairs = [(a.id, b.id) for a, b in index.conflicts()]
+    assert pairs == [("a", "b"), ("b", "c")]
+    assert [(a.id, b.id) for a, b in index.conflicts(at("10:15"), at("12:00"))] == [("b", "c")]
+
+
+def test_event_dict_round_trip():
+    raw = event("x", "14:00", "15:30", location="Room 4", attendees=["a@b.com"])
+    parsed = CalendarEvent.from_dict(raw, DAY)
+    assert parsed.to_dict()["duration"] == "1 hour 30 minutes"
+    assert parsed.attendees == ("a@b.com",)
+
+
+def test_user_calendar_index_follows_the_store():
+    store = get_calendar_store("calendar-index-user")
+    today = date.today()
+    index = get_calendar_index("calendar-index-user", today)
+    assert get_calendar_index("calendar-index-user", today) is index
+
+    start = datetime.combine(today, datetime.min.time()) + timedelta(hours=23)
+    store.upsert({"id": "late_call", "title": "Late call", "start": start.isoformat(),
+                  "end": (start + timedelta(minutes=30)).isoformat()})
+    rebuilt = get_calendar_index("calendar-index-user", today)
+    assert rebuilt is not index
+    assert rebuilt.get("late_call") is not None
+    assert get_calendar_index("other-calendar-user", today).get("late_call") is None
@@ -0,0 +1,178 @@
+import threading
+import time
+
+from backend.config.settings import CacheSettings, Settings
+from backend.services import calendar_service, change_log, mail_groups
+from backend.services.change_log import ChangeLogStore, evict_stores, get_calendar_store, get_mail_store
+
+
+def mail(item_id, subject="Hello"):
+    return {"id": item_id, "subject": subject}
+
+
+def ids(items):
+    return sorted(item["id"] for item in items)
+
+
+def test_sync_logs_only_real_changes():
+    store = ChangeLogStore()
+    assert store.sync([mail("a"), mail("b")]) == 2
+    assert store.sync([mail("a"), mail("b")]) == 0
+    assert store.sync([mail("a", "Edited"), mail("c")]) == 3   # changed a, removed b, added c
+    assert ids(store.snapshot()) == ["a", "c"]
+
+
+def test_changes_since_collapses_to_net_changes():
+    store = ChangeLogStore()
+    store.sync([mail("a"), mail("b")])
+    cursor = store.cursor
+    store.upsert(mail("c"))
+    store.remove("c")                  # Added then removed: nothing to report
+    store.upsert(mail("a", "Edited"))
+    store.remove("b")
+    store.upsert(mail("d"))
+    changes = store.changes_since(cursor)
+    assert ids(changes["added"]) == ["d"]
+    assert ids(changes["changed"]) == ["a"]
+    assert ids(changes["removed"]) == ["b"]
+    assert store.changes_since(store.cursor) == {"added": [], "changed": [], "removed": []}
+
+
+def test_cursor_past_the_log_falls_back_to_full():
+    store = ChangeLogStore(max_entries=2)
+    store.sync([mail("a")])
+    cursor = store.cursor
+    for n in range(3):
+        store.upsert(mail(f"n{n}"))
+    assert store.changes_since(cursor) is None
+
+
+def test_cursor_from_another_store_is_rejected():
+    # Two workers (or a rebuilt store) with the same sequence numbers
+    first, second = ChangeLogStore(), ChangeLogStore()
+    first.sync([mail("a")])
+    second.sync([mail("a")])
+    assert first.seq == second.seq and first.cursor != second.cursor
+    assert second.changes_since(first.cursor) is None
+    assert second.changes_since(0) is None
+    assert first.changes_since(first.cursor) is not None
+
+
+def test_fingerprint_tracks_contents_not_history():
+    first, second = ChangeLogStore(), ChangeLogStore()
+    first.sync([mail("a"), mail("b")])
+    second.sync([mail("b")])
+    second.upsert(mail("x"))
+    second.sync([mail("b"), mail("a")])
+    assert first.fingerprint == second.fingerprint
+
+
+def test_sessions_resume_from_their_own_cursor():
+    store = ChangeLogStore()
+    store.sync([mail("a")])
+    store.advance_session("car")
+    store.upsert(mail("b"))
+    changes = store.changes_since(store.session_cursor("car"))
+    assert ids(changes["added"]) == ["b"]
+    assert store.session_cursor("unknown") is None
+
+
+def test_prepare_runs_only_for_new_or_changed_items():
+    calls = []
+    store = ChangeLogStore(prepare=lambda item: calls.append(item["id"]) or dict(item, prepared=True))
+    store.sync([mail("a"), mail("b")])
+    store.sync([mail("a"), mail("b", "Edited")])
+    assert calls == ["a", "b", "b"]
+    assert store.items["b"]["prepared"]
+
+
+def test_views_follow_every_change():
+    class Recorder:
+        def __init__(self):
+            self.ops = []
+
+        def apply(self, op, item_id, item):
+            self.ops.append((op, item_id))
+
+    store = ChangeLogStore()
+    store.sync([mail("a")])
+    view = store.view("recorder", Recorder)
+    assert store.view("recorder", Recorder) is view
+    store.sync([mail("b")])
+    assert view.ops == [("added", "a"), ("removed", "a"), ("added", "b")]
+
+
+def test_concurrent_syncs_leave_a_consistent_store():
+    store = ChangeLogStore()
+    snapshots = [[mail(f"{n}-{i}") for i in range(200)] for n in range(2)]
+
+    def run(snapshot):
+        for _ in range(20):
+            store.sync(snapshot)
+
+    threads = [threading.Thread(target=run, args=(snapshot,)) for snapshot in snapshots]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store.items) == 200
+    assert store.changes_since(store.cursor) is not None
+    rebuilt = ChangeLogStore()
+    rebuilt.sync(store.snapshot())
+    assert rebuilt.fingerprint == store.fingerprint
+
+
+def test_idle_and_excess_user_stores_are_evicted(monkeypatch):
+    settings = Settings(cache=CacheSettings(user_stores=3, store_idle_s=60))
+    monkeypatch.setattr(change_log, "get_settings", lambda: settings)
+    for registry in ("_mail_stores", "_calendar_stores", "_calendar_indexes", "_last_used"):
+        monkeypatch.setattr(change_log, registry, {})
+    evicted = []
+    monkeypatch.setattr(change_log, "_eviction_listeners", change_log._eviction_listeners + [evicted.append])
+
+    first = get_mail_store("u1")
+    get_calendar_store("u1")
+    change_log.get_calendar_index("u1")
+    mail_groups.get_mail_groups("u1")
+    get_mail_store("u2")
+    get_mail_store("u3")
+    assert evicted == []
+    get_mail_store("u4")                                 # Past the cap: the least recently used goes
+    assert evicted == ["u1"]
+    assert "u1" not in change_log._calendar_stores and "u1" not in mail_groups._user_groups
+    assert "u1" not in calendar_service._series
+
+    again = get_mail_store("u1")
+    assert again is not first
+    assert again.changes_since(first.cursor) is None    # Old cursors get a full digest
+
+    assert evicted == ["u1", "u2"]
+
+    get_mail_store(change_log.DEFAULT_USER)
+    assert sorted(evict_stores(now=time.monotonic() + 120)) == ["u1", "u4"]
+    assert set(change_log._last_used) == {change_log.DEFAULT_USER}
+
+
+def test_background_sync_does_not_keep_idle_stores_alive(monkeypatch):
+    settings = Settings(cache=CacheSettings(store_idle_s=60))
+    monkeypatch.setattr(change_log, "get_settings", lambda: settings)
+    for registry in ("_mail_stores", "_calendar_stores", "_calendar_indexes", "_last_used"):
+        monkeypatch.setattr(change_log, registry, {})
+
+    get_mail_store("idle-driver")
+    used = change_log._last_used["idle-driver"]
+    change_log.sync_user("idle-driver", notify=False)
+    assert change_log._last_used["idle-driver"] == used
+    assert evict_stores(now=used + 120) == ["idle-driver"]
+
+
+def test_session_cursors_are_capped_per_store(monkeypatch):
+    monkeypatch.setattr(change_log, "get_settings", lambda: Settings(cache=CacheSettings(sessions_per_store=2)))
+    store = ChangeLogStore()
+    store.sync([{"id": "1"}])
+    store.advance_session("car-a")
+    store.advance_session("car-b")
+    store.advance_session("car-a")                       # Refreshes car-a, so car-b is now the stalest
+    store.advance_session("car-c")
+    assert store.session_cursor("car-b") is None
+    assert store.session_cursor("car-a") == store.session_cursor("car-c") == store.cursor
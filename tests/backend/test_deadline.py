@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.services.deadline import (DeadlineExceeded, _deadline, check_deadline, current_deadline, remaining,
+                                       run_until)
+from backend.services.digest_service import DigestCache
+from backend.services.single_flight import SingleFlight
+from backend.services.worker_pool import WorkerPool
+
+
+def deadline_left():
+    return remaining()
+
+
+def test_run_until_hands_the_deadline_to_the_work():
+    left = run_until(time.monotonic() + 10, deadline_left)
+    assert 9 < left <= 10
+    assert run_until(None, deadline_left) is None
+    assert current_deadline() is None                     # Reset afterwards
+
+
+def test_run_until_skips_work_past_its_deadline():
+    calls = []
+    with pytest.raises(DeadlineExceeded):
+        run_until(time.monotonic() - 1, calls.append, "late")
+    assert calls == []
+
+
+def test_flight_work_sees_the_starting_request_deadline():
+    async def scenario():
+        token = _deadline.set(time.monotonic() + 5)
+        try:
+            return await SingleFlight().run("key", deadline_left)
+        finally:
+            _deadline.reset(token)
+
+    assert 4 < asyncio.run(scenario()) <= 5
+
+
+def test_caller_with_time_left_restarts_a_flight_cut_short_by_another_deadline():
+    flights, calls = SingleFlight(), []
+
+    def build():
+        calls.append(current_deadline())
+        time.sleep(0.1)
+        check_deadline()
+        return "digest"
+
+    async def hurried():
+        token = _deadline.set(time.monotonic() + 0.05)
+        try:
+            await flights.run("key", build)
+        finally:
+            _deadline.reset(token)
+
+    async def scenario():
+        first = asyncio.ensure_future(hurried())
+        await asyncio.sleep(0.01)
+        patient = await flights.run("key", build)
+        with pytest.raises(DeadlineExceeded):
+            await first
+        return patient
+
+    assert asyncio.run(scenario()) == "digest"
+    assert len(calls) == 2 and calls[1] is None
+    assert flights.metrics()["in_flight"] == 0
+
+
+def test_pool_jobs_run_under_their_deadline():
+    pool = WorkerPool(max_workers=1, max_queue=0)
+    try:
+        left = asyncio.run(pool.submit(deadline_left, deadline_s=5))
+    finally:
+        pool.shutdown()
+    assert 3 < left <= 5                                   # Seen in the worker process
+
+
+def test_digest_cache_serves_hits_but_skips_builds_past_the_deadline():
+    cache, builds = DigestCache(max_entries=10), []
+    cache.get_or_build("deadline-user", "mail", 1, lambda: {"speech": "cached"})
+    token = _deadline.set(time.monotonic() - 1)
+    try:
+        assert cache.get_or_build("deadline-user", "mail", 1, builds.append)["speech"] == "cached"
+        with pytest.raises(DeadlineExceeded):
+            cache.get_or_build("deadline-user", "mail", 2, lambda: builds.append(2) or {})
+    finally:
+        _deadline.reset(token)
+    assert builds == []
@@ -0,0 +1,56 @@
+from backend.services.change_log import ChangeLogStore
+from backend.services.mail_groups import SIMILAR, THREAD, MailGroups, conversation_key, group_mail
+
+
+def mail(n, subject, snippet="", timestamp=None, **extra):
+    return {"id": f"m{n}", "sender": f"Sender {n}", "subject": subject, "snippet": snippet,
+            "timestamp": timestamp or f"2026-10-19T08:{n:02d}:00", **extra}
+
+
+SHIPPED = "Your order has shipped and will arrive on Tuesday between 9am and 5pm"
+
+
+def test_conversation_key_ignores_reply_prefixes_and_prefers_ids():
+    assert conversation_key(mail(1, "RE: Fwd: Budget review")) == conversation_key(mail(2, "Budget review"))
+    assert conversation_key(mail(3, "Budget review", conversation_id="abc")) == "id:abc"
+
+
+def test_replies_collapse_into_one_thread_with_the_newest_message():
+    entries = group_mail([mail(1, "Budget review"), mail(2, "RE: Budget review"), mail(3, "Lunch")])
+    assert [(e["id"], e["count"], e["kind"]) for e in entries] == [("m2", 2, THREAD), ("m3", 1, THREAD)]
+    assert entries[0]["thread_subject"] == "Budget review"
+    assert entries[0]["member_ids"] == ["m1", "m2"]
+
+
+def test_near_identical_notifications_collapse_as_similar():
+    entries = group_mail([mail(1, "Order 1234 shipped", SHIPPED), mail(2, "Order 5678 shipped", SHIPPED),
+                          mail(3, "Quarterly planning offsite", "Agenda for the planning offsite next month")])
+    assert [(e["count"], e["kind"]) for e in entries] == [(2, SIMILAR), (1, THREAD)]
+
+
+def test_a_high_priority_member_makes_the_group_high_priority():
+    entries = group_mail([mail(1, "Outage", priority="normal"), mail(2, "RE: Outage", priority="high")])
+    assert entries[0]["priority"] == "high"
+
+
+def test_refresh_follows_the_store_incrementally():
+    store = ChangeLogStore()
+    store.sync([mail(1, "Budget review"), mail(2, "Lunch")])
+    groups = MailGroups().refresh(store)
+    assert len(groups.groups) == 2
+
+    store.upsert(mail(3, "RE: Budget review"))
+    store.remove("m2")
+    groups.refresh(store)
+    assert sorted(len(g.members) for g in groups.groups.values()) == [2]
+    assert groups.cursor == store.cursor
+
+
+def test_refresh_regroups_from_scratch_for_a_new_store():
+    first = ChangeLogStore()
+    first.sync([mail(1, "Budget review")])
+    groups = MailGroups().refresh(first)
+    rebuilt = ChangeLogStore()                        # E.g. the store was evicted and rebuilt
+    rebuilt.sync([mail(2, "Lunch"), mail(3, "Dinner")])
+    groups.refresh(rebuilt)
+    assert sorted(groups.emails) == ["m2", "m3"]
@@ -0,0 +1,88 @@
+from datetime import date, datetime
+
+from backend.services.calendar_service import CalendarEvent, CalendarIndex
+from backend.services.change_log import get_mail_store
+from backend.services.meeting_service import (MeetingBriefService, RelatedMailIndex, get_brief_service,
+                                              get_related_mail_index)
+
+DAY = date(2025, 10, 21)
+
+
+def email(email_id, sender, subject, received="2025-10-21T08:00:00"):
+    return {"id": email_id, "from_email": sender, "from_name": sender.split("@")[0], "subject": subject,
+            "received": received}
+
+
+def meeting(title="Acme roadmap review", attendees=("pat@acme.com",), start="15:00", **fields):
+    return CalendarEvent.from_dict({"id": "m1", "title": title, "start_time": start, "end_time": "16:00",
+                                    "attendees": list(attendees), **fields}, DAY)
+
+
+def index_with(*emails):
+    index = RelatedMailIndex()
+    for item in emails:
+        index.add_email(item)
+    return index
+
+
+def test_related_mail_ranks_client_domain_over_shared_domain():
+    index = index_with(
+        email("e1", "pat@acme.com", "Roadmap slides"),
+        email("e2", "lee@company.com", "Lunch order"),
+        email("e3", "kim@company.com", "Parking"),
+        email("e4", "sam@company.com", "Acme roadmap notes"),
+    )
+    related = [item["id"] for item in index.related_to(meeting())]
+    assert related[0] == "e1"
+    assert "e2" not in related and "e3" not in related
+
+
+def test_related_mail_index_follows_removals():
+    index = index_with(email("e1", "pat@acme.com", "Roadmap slides"))
+    version = index.version
+    index.apply("removed", "e1", None)
+    assert index.version > version
+    assert index.related_to(meeting()) == []
+    assert not index.postings
+
+
+def test_brief_rebuilds_when_related_mail_arrives():
+    index = index_with(email("e1", "lee@company.com", "Lunch order"))
+    service = MeetingBriefService(index)
+    assert service.get_brief(meeting())["related_count"] == 0
+    index.add_email(email("e2", "pat@acme.com", "Roadmap slides"))
+    assert service.get_brief(meeting())["related_count"] == 1
+
+
+def test_brief_rebuilds_when_the_event_is_edited():
+    service = MeetingBriefService(RelatedMailIndex())
+    first = service.get_brief(meeting())
+    assert service.get_brief(meeting()) is first
+    moved = service.get_brief(meeting(start="16:00"))
+    assert moved is not first
+    assert "4:00 PM" in moved["speech"]
+
+
+def test_recurring_occurrences_share_one_cache_entry():
+    series = {"id": "standup", "title": "Standup", "start_time": "09:00", "end_time": "09:15",
+              "rrule": "FREQ=DAILY", "dtstart": "2025-10-01"}
+    service = MeetingBriefService(RelatedMailIndex())
+    for day in (date(2025, 10, 21), date(2025, 10, 22)):
+        event = CalendarIndex.from_dicts([series], day).get("standup")
+        assert event.id == f"standup@{day.isoformat()}"
+        assert service.get_brief(event)["meeting"]["id"] == event.id
+    assert len(service._briefs) == 1
+
+
+def test_brief_service_reads_the_users_mail_store():
+    store = get_mail_store("brief-user")
+    store.upsert({"id": "brief-mail", "from_email": "ops@zebra.io", "from_name": "Ops",
+                  "subject": "Zebra migration checklist", "received": datetime.now().isoformat()})
+    assert "brief-mail" in get_related_mail_index("brief-user").emails
+    assert "brief-mail" not in get_related_mail_index("other-brief-user").emails
+
+    event = CalendarEvent.from_dict({"id": "z", "title": "Zebra migration", "start_time": "10:00",
+                                     "end_time": "11:00", "attendees": ["ops@zebra.io"]}, DAY)
+    assert get_brief_service("brief-user").get_brief(event)["related_count"] == 1
+    store.remove("brief-mail")
+    assert get_brief_service("brief-user").get_brief(event)["related_count"] == 0
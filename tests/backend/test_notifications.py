@@ -0,0 +1,113 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import notifications
+from backend.services.notifications import (NotificationCoalescer, SubscriptionRegistry, accept_notification,
+                                            parse_resource)
+
+client = TestClient(app)
+
+
+def notification(subscription, resource=None, **fields):
+    return {"subscriptionId": subscription.id, "clientState": subscription.client_state,
+            "resource": resource or f"users/{subscription.user_id}/messages/m1", **fields}
+
+
+def test_parse_resource():
+    assert parse_resource("users/ann/messages/m1") == ("ann", None, "mail")
+    assert parse_resource("/users/ann/mailFolders('Inbox')/messages/m1") == ("ann", "Inbox", "mail")
+    assert parse_resource("users/ann/events/e1") == ("ann", None, "calendar")
+    assert parse_resource("groups/x/threads/1") is None
+
+
+def test_registry_tracks_which_folders_still_need_polling():
+    registry = SubscriptionRegistry()
+    subscription = registry.create("ann", "mail", ttl_s=60)
+    assert registry.covers("ann", "mail") and not registry.covers("ann", "calendar")
+    assert registry.folders_to_poll("ann") == ["calendar"]
+    expired = registry.create("bob", "calendar", ttl_s=60)
+    expired.expires_at = 0
+    assert registry.get(expired.id) is None and registry.renew(expired.id) is None
+    assert [s.id for s in registry.active()] == [subscription.id]
+    assert registry.remove(subscription.id) and registry.folders_to_poll("ann") == ["mail", "calendar"]
+
+
+def test_notifications_are_checked_against_their_subscription():
+    registry, coalescer = SubscriptionRegistry(), NotificationCoalescer()
+    mail = registry.create("ann", "mail")
+    assert accept_notification(notification(mail), registry, coalescer) == "accepted"
+    assert accept_notification(notification(mail, clientState="guess"), registry, coalescer) == "rejected"
+    assert accept_notification(notification(mail, resource="users/bob/messages/m1"), registry, coalescer) == "rejected"
+    assert accept_notification(notification(mail, resource="users/ann/events/e1"), registry, coalescer) == "rejected"
+    assert accept_notification(notification(mail, resource="users/ann/mailFolders('Archive')/messages/m1"),
+                               registry, coalescer) == "ignored"
+    assert accept_notification(notification(mail, lifecycleEvent="reauthorizationRequired"),
+                               registry, coalescer) == "ignored"
+    assert accept_notification(notification(mail, lifecycleEvent="missed"), registry, coalescer) == "accepted"
+    assert coalescer.counters["notifications"] == 2 and coalescer.pending == 1
+    assert accept_notification(notification(mail, lifecycleEvent="subscriptionRemoved"),
+                               registry, coalescer) == "accepted"
+    assert registry.get(mail.id) is None
+
+
+def test_a_burst_is_synced_once_per_folder_after_the_window(monkeypatch):
+    synced = []
+    monkeypatch.setattr(notifications, "sync_folder", lambda user_id, folder: synced.append((user_id, folder)) or 1)
+    coalescer = NotificationCoalescer()
+
+    async def scenario():
+        for _ in range(5):
+            coalescer.add("ann", "mail")
+        coalescer.add("ann", "calendar")
+        opened = coalescer._pending[("ann", "mail")]
+        coalescer.flush(now=opened + 0.1)                 # Window still open
+        assert synced == []
+        coalescer.flush(now=opened + 60)
+        while coalescer._running:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert sorted(synced) == [("ann", "calendar"), ("ann", "mail")]
+    assert coalescer.counters == {"notifications": 6, "syncs": 2, "changes": 2, "failures": 0}
+
+
+def test_failed_resyncs_are_counted(monkeypatch):
+    def sync_folder(user_id, folder):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(notifications, "sync_folder", sync_folder)
+    coalescer = NotificationCoalescer()
+
+    async def scenario():
+        coalescer.add("ann", "mail")
+        coalescer.flush(now=coalescer._pending[("ann", "mail")] + 60)
+        while coalescer._running:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert coalescer.counters["failures"] == 1 and coalescer.counters["syncs"] == 0
+
+
+def test_webhook_handshake_subscription_and_delivery():
+    assert client.post("/api/notifications", params={"validationToken": "abc 123"}).text == "abc 123"
+
+    created = client.post("/api/notifications/subscriptions", json={"folder": "calendar"},
+                          headers={"X-User-Id": "hook-driver"}).json()
+    assert created["resource"] == "users/hook-driver/events"
+    item = {"subscriptionId": created["id"], "clientState": created["clientState"],
+            "resource": "users/hook-driver/events/e1"}
+    accepted = client.post("/api/notifications", json={"value": [item, {"subscriptionId": "nope"}]})
+    assert accepted.status_code == 202
+    assert accepted.json() == {"accepted": 1, "ignored": 0, "rejected": 1}
+    assert client.post("/api/notifications", json={"value": [{"subscriptionId": "nope"}]}).status_code == 403
+    assert client.post("/api/notifications", json={"items": []}).status_code == 400
+
+    owner, stranger = {"X-User-Id": "hook-driver"}, {"X-User-Id": "hook-stranger"}
+    status = client.get("/api/notifications/status", headers=owner).json()
+    assert created["id"] in [s["id"] for s in status["subscriptions"]]
+    assert client.get("/api/notifications/status", headers=stranger).json()["subscriptions"] == []
+    assert client.delete(f"/api/notifications/subscriptions/{created['id']}", headers=stranger).status_code == 404
+    assert client.delete(f"/api/notifications/subscriptions/{created['id']}", headers=owner).json()["removed"]
+    assert client.delete(f"/api/notifications/subscriptions/{created['id']}", headers=owner).status_code == 404
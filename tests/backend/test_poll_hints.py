@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services.change_log import ChangeLogStore
+from backend.services.poll_hints import calendar_poll_s, clamp_interval, digest_poll_s, is_prefetch, store_poll_s
+
+client = TestClient(app)
+
+
+def quiet_store(quiet_s, now=1_000_000.0):
+    store = ChangeLogStore()
+    store.changed_at = now - quiet_s
+    return store
+
+
+def test_interval_is_clamped_to_the_configured_range():
+    assert clamp_interval(1) == 30
+    assert clamp_interval(100_000) == 1800
+    assert clamp_interval(120.7) == 120
+
+
+def test_quiet_data_is_polled_less_often():
+    assert store_poll_s(quiet_store(60), now=1_000_000.0) == 30
+    assert store_poll_s(quiet_store(2000), now=1_000_000.0) == 500
+    assert store_poll_s(quiet_store(86_400), now=1_000_000.0) == 1800
+
+
+def test_calendar_fits_polls_in_before_the_next_meeting():
+    now = datetime(2025, 10, 21, 9, 0)
+    store = ChangeLogStore()
+    store.changed_at -= 86_400
+    soon = {"next_meeting": {"start": (now + timedelta(minutes=10)).isoformat()}}
+    later = {"next_meeting": {"start": (now + timedelta(hours=3)).isoformat()}}
+    assert calendar_poll_s(store, soon, now=now) == 150
+    assert calendar_poll_s(store, later, now=now) == 1800
+
+
+def test_degraded_digests_ask_for_a_quick_retry():
+    store = ChangeLogStore()
+    store.changed_at -= 86_400
+    assert digest_poll_s(store, {"degraded": True}) == 30
+    assert digest_poll_s(store, {}) == 1800
+
+
+def test_prefetch_detection():
+    assert is_prefetch({"purpose": "prefetch"})
+    assert is_prefetch({"sec-purpose": "prefetch;prerender"})
+    assert not is_prefetch({})
+
+
+def test_digest_responses_carry_the_hint():
+    response = client.get("/api/calendar-digest", headers={"X-User-Id": "hint-driver"})
+    poll_s = int(response.headers["x-poll-interval"])
+    assert 30 <= poll_s <= 1800
+    assert response.headers["cache-control"] == f"private, max-age={poll_s}"
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.config.settings import RateLimitSettings
+from backend.main import app
+from backend.services import rate_limit
+from backend.services.deadline import DeadlineExceeded, _deadline
+from backend.services.rate_limit import MemoryBackend, RedisBackend, bucket_for
+from backend.services.single_flight import SingleFlight
+
+client = TestClient(app)
+
+
+def test_bucket_allows_a_burst_then_the_rate(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: clock[0])
+    backend = MemoryBackend()
+
+    async def takes(n):
+        return [await backend.take("driver:car", rate=2.0, burst=3) for _ in range(n)]
+
+    decisions = asyncio.run(takes(4))
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert decisions[-1].retry_after == pytest.approx(0.5)
+    clock[0] += 0.5                                     # One token back
+    assert [d.allowed for d in asyncio.run(takes(2))] == [True, False]
+    assert asyncio.run(backend.take("other:car", 2.0, 3)).remaining == 2
+
+
+def test_redis_backend_awaits_the_script():
+    class Script:
+        async def __call__(self, keys, args):
+            self.keys = keys
+            return [0, b"0.25"]
+
+    backend = RedisBackend.__new__(RedisBackend)
+    backend._take = Script()
+    decision = asyncio.run(backend.take("driver:car", 1.0, 10))
+    assert backend._take.keys == ["zendrive:ratelimit:driver:car"]
+    assert not decision.allowed and decision.retry_after == pytest.approx(0.75)
+
+
+def test_digest_endpoint_answers_429_past_the_burst():
+    headers = {"X-User-Id": "flood-driver", "X-Device-Id": "car-1"}
+    statuses = [client.get("/api/calendar-digest", headers=headers).status_code for _ in range(12)]
+    assert statuses[:10] == [200] * 10 and statuses[-1] == 429
+    limited = client.get("/api/calendar-digest", headers=headers)
+    assert int(limited.headers["Retry-After"]) >= 1
+    # Another device has its own bucket
+    assert client.get("/api/calendar-digest", headers={**headers, "X-Device-Id": "car-2"}).status_code == 200
+
+
+def test_fleet_batches_have_their_own_stricter_bucket():
+    settings = RateLimitSettings()
+    assert bucket_for("/api/fleet/digests", settings) == ("fleet:", 0.1, 2)
+    assert bucket_for("/api/mail-digest/audio", settings) == ("", 1.0, 10)
+    assert bucket_for("/api/tasks", settings) is None
+
+    headers = {"X-Device-Id": "fleet-gateway-flood"}
+    batch = {"user_ids": ["fleet-flood-a"], "sections": ["calendar"]}
+    statuses = [client.post("/api/fleet/digests", json=batch, headers=headers).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    # Digest requests from the same caller are unaffected
+    assert client.get("/api/calendar-digest", headers=headers).status_code == 200
+
+
+def test_concurrent_callers_share_one_call():
+    flights, calls, release = SingleFlight(), [], threading.Event()
+
+    def build(user_id):
+        calls.append(user_id)
+        release.wait(5)
+        return f"digest for {user_id}"
+
+    async def scenario():
+        waiting = [asyncio.ensure_future(flights.run(("mail", "a"), build, "a")) for _ in range(5)]
+        other = asyncio.ensure_future(flights.run(("mail", "b"), build, "b"))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*waiting), await other
+
+    shared, other = asyncio.run(scenario())
+    assert shared == ["digest for a"] * 5 and other == "digest for b"
+    assert sorted(calls) == ["a", "b"]
+    assert flights.metrics() == {"calls": 2, "shared": 4, "in_flight": 0}
+
+
+def test_a_caller_past_its_deadline_leaves_the_flight_running():
+    flights, release = SingleFlight(), threading.Event()
+
+    def build():
+        release.wait(5)
+        return "digest"
+
+    async def impatient():
+        token = _deadline.set(time.monotonic() + 0.05)
+        try:
+            await flights.run("key", build)
+        finally:
+            _deadline.reset(token)
+
+    async def scenario():
+        patient = asyncio.ensure_future(flights.run("key", build))
+        with pytest.raises(DeadlineExceeded):
+            await impatient()
+        release.set()
+        return await patient
+
+    assert asyncio.run(scenario()) == "digest"
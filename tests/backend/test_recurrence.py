@@ -0,0 +1,72 @@
+from datetime import date
+
+from backend.services import calendar_service
+from backend.services.calendar_service import RecurringSeries, events_on, forget_series, get_series
+
+MONDAY = date(2025, 10, 20)
+
+
+def series(**fields):
+    return {"id": "standup", "title": "Team Standup", "start_time": "09:00", "end_time": "09:30",
+            "rrule": "FREQ=WEEKLY;BYDAY=MO,WE,FR", "dtstart": "2025-01-06", **fields}
+
+
+def test_occurrences_follow_the_rule():
+    standup = RecurringSeries(series())
+    [monday] = standup.on_day(MONDAY)
+    assert monday.id == "standup@2025-10-20"
+    assert monday.to_dict()["series_id"] == "standup"
+    assert monday.start.hour == 9 and (monday.end - monday.start).seconds == 1800
+    assert standup.on_day(date(2025, 10, 21)) == []          # Tuesday
+    assert standup.on_day(date(2025, 1, 3)) == []            # Before dtstart
+
+
+def test_exceptions_cancel_and_move_single_occurrences():
+    standup = RecurringSeries(series(exceptions={"2025-10-20": None, "2025-10-22": {"start_time": "11:00"}}))
+    assert standup.on_day(MONDAY) == []
+    [moved] = standup.on_day(date(2025, 10, 22))
+    assert (moved.start.hour, (moved.end - moved.start).seconds) == (11, 1800)
+
+
+def test_expanded_days_are_cached_and_bounded():
+    standup = RecurringSeries(series(rrule="FREQ=DAILY"))
+    first = standup.on_day(MONDAY)
+    assert standup.on_day(MONDAY) is first
+    for offset in range(1, calendar_service.MAX_CACHED_WINDOWS + 1):
+        standup.on_day(date.fromordinal(MONDAY.toordinal() + offset))
+    assert MONDAY not in standup._windows
+
+
+def test_exception_edit_only_drops_the_day_it_touches():
+    standup = RecurringSeries(series())
+    monday, wednesday = standup.on_day(MONDAY), standup.on_day(date(2025, 10, 22))
+    updated = standup.update(series(exceptions={"2025-10-20": None}))
+    assert updated is standup
+    assert standup.on_day(MONDAY) == []
+    assert standup.on_day(date(2025, 10, 22)) is wednesday
+    assert monday
+
+
+def test_template_edit_rebuilds_the_series():
+    standup = RecurringSeries(series())
+    assert standup.update(series(start_time="08:30")) is not standup
+
+
+def test_events_on_mixes_one_offs_and_series():
+    raw = [series(id="recurrence-test-series"),
+           {"id": "lunch", "title": "Lunch", "start_time": "12:00", "end_time": "13:00"}]
+    assert [e.id for e in events_on(raw, MONDAY)] == ["recurrence-test-series@2025-10-20", "lunch"]
+    assert get_series(raw[0]) is get_series(dict(raw[0]))
+    assert [e.id for e in events_on(raw, date(2025, 10, 21))] == ["lunch"]
+
+
+def test_series_are_kept_per_user():
+    mine = get_series(series(id="recurrence-shared-id"), "recurrence-a")
+    theirs = get_series(series(id="recurrence-shared-id", start_time="15:00"), "recurrence-b")
+    assert mine is not theirs
+    assert mine.on_day(MONDAY)[0].start.hour == 9
+    assert theirs.on_day(MONDAY)[0].start.hour == 15
+
+    forget_series("recurrence-a")
+    assert "recurrence-a" not in calendar_service._series
+    assert get_series(series(id="recurrence-shared-id", start_time="15:00"), "recurrence-b") is theirs
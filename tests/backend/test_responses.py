@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.utils import responses
+from backend.utils.responses import choose_encoding, parse_accept, slim_for_voice
+
+client = TestClient(app)
+
+
+def test_parse_accept_orders_by_quality():
+    assert parse_accept("application/json;q=0.5, application/msgpack, */*;q=0.1") == [
+        ("application/msgpack", 1.0), ("application/json", 0.5), ("*/*", 0.1)]
+    assert parse_accept(None) == []
+
+
+def test_choose_encoding(monkeypatch):
+    monkeypatch.setattr(responses, "BROTLI_AVAILABLE", False)
+    assert choose_encoding("br, gzip") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("*") == "gzip"
+    assert choose_encoding(None) is None
+    monkeypatch.setattr(responses, "BROTLI_AVAILABLE", True)
+    assert choose_encoding("gzip, br") == "br"
+
+
+def test_voice_profile_keeps_only_speech_fields():
+    payload = {
+        "speech": "You have mail", "total_unread": 1, "generated_at": "now",
+        "priority_emails": [{"id": "m1", "sender": "Dr. Smith", "speech_sender": "Doctor Smith",
+                             "body": "long body", "received": "2026-10-19T08:00:00"}],
+    }
+    assert slim_for_voice(payload) == {
+        "speech": "You have mail", "total_unread": 1,
+        "priority_emails": [{"id": "m1", "sender": "Doctor Smith"}],
+    }
+
+
+def test_digest_is_gzipped_when_asked():
+    headers = {"X-User-Id": "gzip-driver", "Accept-Encoding": "gzip"}
+    response = client.get("/api/mail-digest", headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    raw = client.get("/api/mail-digest", headers={**headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert response.json()["email_ids"] == raw.json()["email_ids"]
+    assert int(response.headers["content-length"]) < len(raw.content)
+
+
+def test_voice_profile_is_smaller():
+    headers = {"X-User-Id": "slim-driver", "Accept-Encoding": "identity"}
+    full = client.get("/api/mail-digest", headers=headers)
+    voice = client.get("/api/mail-digest", params={"profile": "voice"}, headers=headers)
+    assert len(voice.content) < len(full.content)
+    assert set(voice.json()) <= responses.VOICE_KEYS
+
+
+def test_msgpack_falls_back_to_json_when_not_installed(monkeypatch):
+    monkeypatch.setattr(responses, "MSGPACK_AVAILABLE", False)
+    response = client.get("/api/calendar-digest", headers={"X-User-Id": "json-driver", "Accept": "application/msgpack"})
+    assert response.headers["content-type"].startswith("application/json")
+    assert json.loads(response.content)["speech"]
+
+
+def test_msgpack_when_preferred():
+    msgpack = pytest.importorskip("msgpack")
+    headers = {"X-User-Id": "msgpack-driver"}
+    response = client.get("/api/calendar-digest", headers={**headers, "Accept": "application/msgpack, application/json;q=0.5"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content, raw=False)["speech"]
+    json_first = client.get("/api/calendar-digest", headers={**headers, "Accept": "application/json, application/msgpack;q=0.5"})
+    assert json_first.headers["content-type"].startswith("application/json")
@@ -0,0 +1,72 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+
+client = TestClient(app)
+
+
+def test_calendar_queries_are_per_user():
+    for path in ("/api/calendar/next", "/api/calendar/upcoming?minutes=120", "/api/calendar/free",
+                 "/api/calendar/conflicts"):
+        response = client.get(path, headers={"X-User-Id": "route-driver"})
+        assert response.status_code == 200, path
+        assert response.json()["speech"]
+
+
+def test_meeting_brief_finds_a_recurring_series_by_its_id():
+    response = client.get("/api/meeting/meeting_001/brief")
+    assert response.status_code == 200
+    assert response.json()["meeting"]["series_id"] == "meeting_001"
+    assert client.get("/api/meeting/no-such-meeting/brief").status_code == 404
+
+
+def test_mail_search_reads_the_callers_mailbox():
+    response = client.get("/api/mail/search", params={"q": "emails from Sarah"}, headers={"X-User-Id": "search-driver"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["sender"].lower() == "sarah"
+    assert body["result_count"] >= 1
+
+
+def test_voice_mail_digest_keeps_the_full_id_set():
+    full = client.get("/api/mail-digest", params={"budget_s": 5}).json()
+    voice = client.get("/api/mail-digest", params={"budget_s": 5, "profile": "voice"}).json()
+    assert voice["email_ids"] == full["email_ids"]
+    assert len(voice["email_ids"]) == full["total_unread"]
+    assert len(voice["priority_emails"]) + len(voice["regular_emails"]) < len(voice["email_ids"])
+
+
+def test_delta_digest_with_a_foreign_cursor_returns_a_full_digest():
+    full = client.get("/api/mail-digest", headers={"X-User-Id": "delta-driver"}).json()
+    assert full["mode"] == "full"
+    delta = client.get("/api/mail-digest", params={"since": full["cursor"]}, headers={"X-User-Id": "delta-driver"}).json()
+    assert delta["mode"] == "delta" and delta["new_count"] == 0
+    # A cursor issued by another worker's store
+    foreign = client.get("/api/mail-digest", params={"since": full["cursor"] + (1 << 32)},
+                         headers={"X-User-Id": "delta-driver"}).json()
+    assert foreign["mode"] == "full"
+
+
+def test_junk_user_ids_are_rejected():
+    assert client.get("/api/calendar/next", headers={"X-User-Id": "x" * 65}).status_code == 400
+    assert client.get("/api/calendar/next", params={"user_id": "../etc"}).status_code == 400
+
+
+def test_fleet_digests_stream_one_line_per_driver_and_section():
+    response = client.post("/api/fleet/digests", json={"user_ids": ["fleet-a", "fleet-b"], "sections": ["calendar"],
+                                                       "profile": "voice"},
+                           headers={"X-Device-Id": "fleet-gateway-1"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["user_id"] for line in lines[:-1]) == ["fleet-a", "fleet-b"]
+    assert all("digest" in line for line in lines[:-1])
+    assert lines[-1]["done"] and lines[-1]["results"] == 2 and lines[-1]["failed"] == 0
+
+
+def test_fleet_batches_are_capped_and_validated():
+    too_many = [f"fleet-{n}" for n in range(201)]
+    gateway = {"X-Device-Id": "fleet-gateway-2"}
+    assert client.post("/api/fleet/digests", json={"user_ids": too_many}, headers=gateway).status_code == 413
+    assert client.post("/api/fleet/digests", json={"user_ids": ["ok", "not ok"]}, headers=gateway).status_code == 422
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+
+from backend.services import scheduler as scheduler_module
+from backend.services.scheduler import ActivityTracker, RefreshScheduler
+
+
+def test_tracker_forgets_idle_drivers():
+    tracker = ActivityTracker(window_s=60)
+    assert tracker.touch("a", now=1000)
+    assert not tracker.touch("a", now=1030)          # Still active: not newly active
+    tracker.touch("b", now=1050)
+    assert tracker.is_active("a", now=1080)
+    assert tracker.active_users(now=1100) == ["b"]
+    assert tracker.touch("a", now=1100)               # Back after going idle
+
+
+def test_tick_refreshes_each_active_driver_once_under_the_cap(monkeypatch):
+    calls, lock, peak = [], threading.Lock(), {"now": 0, "max": 0}
+    release = threading.Event()
+
+    def refresh_user(user_id):
+        with lock:
+            calls.append(user_id)
+            peak["now"] += 1
+            peak["max"] = max(peak["max"], peak["now"])
+        release.wait(5)
+        with lock:
+            peak["now"] -= 1
+        return []
+
+    monkeypatch.setattr(scheduler_module, "refresh_user", refresh_user)
+    scheduler = RefreshScheduler(ActivityTracker(window_s=600), interval_s=60, max_concurrent=2, warm_audio=False)
+
+    async def scenario():
+        for user_id in ("a", "b", "c"):
+            scheduler.record_activity(user_id)
+        scheduler.tick()
+        await asyncio.sleep(0.1)
+        scheduler.tick()                               # Running drivers aren't started again
+        assert scheduler.metrics()["running"] == 3
+        release.set()
+        while scheduler._running:
+            await asyncio.sleep(0.01)
+        scheduler.tick()                               # Nobody is due yet
+
+    asyncio.run(scenario())
+    assert sorted(calls) == ["a", "b", "c"]
+    assert peak["max"] == 2
+    assert scheduler.counters["refreshes"] == 3
+    assert all(due > time.monotonic() for due in scheduler._next_due.values())
+
+
+def test_failed_refresh_is_counted_and_rescheduled(monkeypatch):
+    def refresh_user(user_id):
+        raise RuntimeError("mail server down")
+
+    monkeypatch.setattr(scheduler_module, "refresh_user", refresh_user)
+    scheduler = RefreshScheduler(ActivityTracker(window_s=600), interval_s=60, warm_audio=False)
+
+    async def scenario():
+        scheduler.record_activity("a")
+        scheduler.tick()
+        while not scheduler.counters["failures"] or scheduler._running:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert scheduler.counters == {"refreshes": 0, "failures": 1, "audio_warmed": 0}
+    assert scheduler._next_due["a"] > time.monotonic()
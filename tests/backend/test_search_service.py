@@ -0,0 +1,59 @@
+from backend.services.change_log import get_mail_store
+from backend.services.search_service import build_search_index, deletes, get_search_index, within_one_edit
+
+EMAILS = [
+    {"id": "e1", "from_name": "Sarah Chen", "from_email": "sarah.chen@acme.com",
+     "subject": "Client meeting moved", "preview": "The demo moves to 3 PM."},
+    {"id": "e2", "from_name": "Mike Rodriguez", "from_email": "mike@company.com",
+     "subject": "Budget approval needed", "preview": "Please approve the Q4 budget."},
+    {"id": "e3", "from_name": "Alice Johnson", "from_email": "alice@company.com",
+     "subject": "Sprint planning agenda", "preview": "Review the budget backlog."},
+]
+
+
+def ids(results):
+    return [email["id"] for email in results]
+
+
+def test_edit_distance_helpers():
+    assert within_one_edit("budget", "budgte")   # swap
+    assert within_one_edit("budget", "budgets")
+    assert within_one_edit("budget", "bidget")
+    assert not within_one_edit("budget", "gadget")
+    assert "bdget" in deletes("budget")
+
+
+def test_exact_prefix_and_fuzzy_matches():
+    index = build_search_index(EMAILS)
+    assert ids(index.search("budget")) == ["e2", "e3"]      # Subject beats snippet
+    assert ids(index.search("budg")) == ["e2", "e3"]
+    assert ids(index.search("bugdet")) == ["e2", "e3"]      # ASR/typo tolerant
+    assert ids(index.search("emails about budget approval")) == ["e2"]
+
+
+def test_sender_only_matches_the_sender_field():
+    index = build_search_index(EMAILS)
+    assert ids(index.search(sender="sarah")) == ["e1"]
+    assert index.search("", sender="budget") == []
+
+
+def test_remove_prunes_terms():
+    index = build_search_index(EMAILS)
+    index.remove_email("e1")
+    assert index.search("sarah") == []
+    assert "sarah" not in index.vocabulary
+    assert len(index) == 2
+
+
+def test_user_index_follows_the_mail_store():
+    store = get_mail_store("search-user")
+    index = get_search_index("search-user")
+    assert index is get_search_index("search-user")
+
+    store.upsert({"id": "fresh", "from_name": "Quinn Zephyr", "from_email": "quinn@zephyr.io",
+                  "subject": "Zephyr contract", "received": "2025-10-21T09:00:00"})
+    assert ids(index.search("zephyr")) == ["fresh"]
+    assert get_search_index("other-search-user").search("zephyr") == []
+
+    store.remove("fresh")
+    assert index.search("zephyr") == []
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from backend.config.settings import Settings, SettingsManager
+
+
+@pytest.fixture
+def settings_path(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    monkeypatch.setenv("ZENDRIVE_SETTINGS_FILE", str(path))
+    return path
+
+
+def write(path, data):
+    path.write_text(json.dumps(data))
+
+
+def test_env_overrides_file_overrides_defaults(settings_path, monkeypatch):
+    write(settings_path, {"workers": {"queue_size": 7, "workers": 2}, "client": {"tts_rate": 200}})
+    monkeypatch.setenv("ZENDRIVE_WORKERS__WORKERS", "3")
+    settings = Settings()
+    assert (settings.workers.workers, settings.workers.queue_size) == (3, 7)
+    assert settings.workers.deadline_s == 30.0
+    assert not hasattr(settings, "client")      # The car client reads its own section
+
+
+def test_missing_file_means_defaults(settings_path):
+    assert Settings() == Settings.model_construct()
+
+
+def test_reload_swaps_valid_files_and_rejects_bad_ones(settings_path):
+    write(settings_path, {"fleet": {"max_users": 50}})
+    manager = SettingsManager()
+    seen = []
+    manager.subscribe(lambda old, new: seen.append((old.fleet.max_users, new.fleet.max_users)))
+    first = manager.current
+
+    write(settings_path, {"fleet": {"max_users": 0}})         # Fails validation
+    assert not manager.reload()
+    assert manager.current is first
+
+    write(settings_path, {"fleet": {"max_users": 80}})
+    assert manager.reload()
+    assert seen == [(50, 80)]
+    assert first.fleet.max_users == 50                        # Earlier snapshots never change
+    assert not manager.reload()                               # Same contents: no listeners
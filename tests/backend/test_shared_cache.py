@@ -0,0 +1,54 @@
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from backend.services import shared_cache
+from backend.services.digest_service import DigestCache
+from backend.services.shared_cache import SqliteTier
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_sqlite_tier_serves_only_the_matching_version(tmp_path):
+    tier = SqliteTier(tmp_path / "shared.db")
+    tier.put("u1", "mail", ("abc", 3), {"speech": "hi"})
+    assert tier.get("u1", "mail", ("abc", 3)) == {"speech": "hi"}
+    assert tier.get("u1", "mail", ("abc", 4)) is None
+    assert tier.get("u2", "mail", ("abc", 3)) is None
+
+
+def test_sqlite_tier_expires_entries(tmp_path):
+    tier = SqliteTier(tmp_path / "shared.db", ttl_s=0.001)
+    tier.put("u1", "mail", 1, {"speech": "hi"})
+    threading.Event().wait(0.01)
+    assert tier.get("u1", "mail", 1) is None
+
+
+def test_second_worker_reuses_the_first_workers_digest(tmp_path):
+    path = tmp_path / "shared.db"
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"speech": "built once"}
+
+    first, second = DigestCache(shared=SqliteTier(path)), DigestCache(shared=SqliteTier(path))
+    assert first.get_or_build("u1", "mail", 7, build) == {"speech": "built once"}
+    assert second.get_or_build("u1", "mail", 7, build) == {"speech": "built once"}
+    assert len(builds) == 1 and second.shared_hits == 1
+
+
+def test_invalidations_from_other_processes_reach_listeners(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, "INVALIDATION_POLL_SECONDS", 0.02)
+    path = tmp_path / "shared.db"
+    tier = SqliteTier(path)
+    seen, arrived = [], threading.Event()
+    tier.listen(lambda user_id: (seen.append(user_id), arrived.set()))
+
+    tier.publish("own-change")            # Our own messages are not echoed back
+    subprocess.run([sys.executable, "-c",
+                    f"from backend.services.shared_cache import SqliteTier; SqliteTier({str(path)!r}).publish('u1')"],
+                   cwd=ROOT, check=True)
+    assert arrived.wait(5)
+    assert seen == ["u1"]
@@ -0,0 +1,97 @@
+import itertools
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services.speech_budget import (email_value, other_line, plan_mail_readout, plan_priority_readout,
+                                            priority_line, select_within_budget, speech_seconds)
+
+client = TestClient(app)
+
+
+def email(n, priority="normal", count=1):
+    return {"id": f"m{n}", "sender": f"Sender {n}", "subject": f"Subject number {n}", "priority": priority,
+            "count": count, "thread_subject": f"Thread {n}"}
+
+
+def brute_force(costs, values, budget):
+    best = 0.0
+    for size in range(len(costs) + 1):
+        for combo in itertools.combinations(range(len(costs)), size):
+            if sum(costs[i] for i in combo) <= budget:
+                best = max(best, sum(values[i] for i in combo))
+    return best
+
+
+def test_speech_seconds():
+    assert speech_seconds("") == 0
+    assert speech_seconds("one two three four five.") == pytest.approx(5 / 2.5 + 0.4)
+
+
+def test_knapsack_beats_greedy():
+    # Greedy by value takes the 9 and has no room left; 6 + 6 is worth more
+    assert select_within_budget([3.0, 2.0, 2.0], [9.0, 6.0, 6.0], 4.0) == [1, 2]
+
+
+def test_knapsack_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(30):
+        n = rng.randint(1, 8)
+        costs = [round(rng.uniform(0.5, 5.0), 1) for _ in range(n)]
+        values = [rng.uniform(0.1, 10) for _ in range(n)]
+        budget = rng.uniform(0, 12)
+        chosen = select_within_budget(costs, values, budget)
+        assert chosen == sorted(chosen)
+        assert sum(costs[i] for i in chosen) <= budget + 1e-6
+        assert sum(values[i] for i in chosen) == pytest.approx(brute_force(costs, values, budget))
+
+
+def test_knapsack_edge_cases():
+    assert select_within_budget([], [], 10) == []
+    assert select_within_budget([1.0], [1.0], 0) == []
+    assert select_within_budget([1.0], [1.0], 1.0) == [0]
+
+
+def test_value_prefers_priority_recency_and_busy_threads():
+    assert email_value(email(1, "high"), 0) > email_value(email(1, "normal"), 0)
+    assert email_value(email(1), 0) > email_value(email(1), 5)
+    assert email_value(email(1, count=4), 0) > email_value(email(1), 0)
+
+
+def test_everything_that_fits_is_read_in_full():
+    priority, regular = [email(1, "high")], [email(2)]
+    assert plan_mail_readout(priority, regular, 600) == (priority, regular, 0)
+
+
+def test_mail_plan_fits_the_budget_and_counts_the_rest():
+    priority = [email(n, "high") for n in range(3)]
+    regular = [email(n) for n in range(3, 12)] + [email(12, count=5)]
+    budget = 20.0
+    spoken_priority, spoken_regular, omitted = plan_mail_readout(priority, regular, budget)
+    used = (sum(speech_seconds(priority_line(e)) for e in spoken_priority)
+            + sum(speech_seconds(other_line(e)) for e in spoken_regular)
+            + (speech_seconds("Priority emails:") if spoken_priority else 0)
+            + (speech_seconds("Other emails:") if spoken_priority and spoken_regular else 0)
+            + speech_seconds("Plus 17 more emails from various senders."))
+    assert used <= budget
+    assert spoken_priority == priority[:len(spoken_priority)] and spoken_priority
+    assert omitted == 17 - len(spoken_priority) - sum(e["count"] for e in spoken_regular)
+
+
+def test_priority_plan():
+    emails = [email(n, "high") for n in range(6)]
+    spoken, omitted = plan_priority_readout(emails, 8.0)
+    assert 0 < len(spoken) < 6 and omitted == 6 - len(spoken)
+    assert plan_priority_readout(emails[:1], 60.0) == (emails[:1], 0)
+
+
+def test_budgeted_digest_route():
+    headers = {"X-User-Id": "budget-driver"}
+    full = client.get("/api/mail-digest", headers=headers).json()
+    short = client.get("/api/mail-digest", params={"budget_s": 10}, headers=headers).json()
+    assert short["budget_s"] == 10 and short["omitted_count"] > 0
+    assert len(short["priority_emails"]) + len(short["regular_emails"]) < \
+        len(full["priority_emails"]) + len(full["regular_emails"])
+    assert client.get("/api/mail-digest", params={"budget_s": 1}, headers=headers).status_code == 422
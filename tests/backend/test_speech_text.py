@@ -0,0 +1,44 @@
+import pytest
+
+from backend.services.speech_text import normalize_for_speech, prepare_email, spoken
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("RE: URGENT: Meeting moved to 3pm", "Urgent: Meeting moved to 3 PM"),
+    ("Uptime up 25% - see ceo@company.com", "Uptime up 25 percent - see ceo at company dot com"),
+    ("Fwd: [EXTERNAL] Q4 results", "Q 4 results"),
+    ("Call at 10:30 a.m. or 14:05", "Call at 10:30 AM or 2:05 PM"),
+    ("Standup at 09:00", "Standup at 9 AM"),
+    ("FYI: order #123 ETA asap", "for your information: order number 123 E T A as soon as possible"),
+    ("Docs at https://www.example.com/a/b?c=1", "Docs at a link to example dot com"),
+    ("R&D w/ Sales & Marketing", "R and D with Sales and Marketing"),
+    ("**Launch** 🚀 <today>", "Launch today"),
+    ("", ""),
+])
+def test_normalize_for_speech(text, expected):
+    assert normalize_for_speech(text) == expected
+
+
+def test_abbreviations_only_match_whole_words():
+    assert normalize_for_speech("Vacation dates") == "Vacation dates"
+    assert normalize_for_speech("ETAs approx. known") == "ETAs approximately known"
+
+
+def test_abbreviation_periods_end_sentences_only_where_one_ends():
+    assert normalize_for_speech("Arriving in approx. 5 minutes") == "Arriving in approximately 5 minutes"
+    assert normalize_for_speech("We leave at 5 approx. Then dinner") == "We leave at 5 approximately. Then dinner"
+    assert normalize_for_speech("Budget, timeline etc. for review") == "Budget, timeline and so on for review"
+
+
+def test_acronyms_keep_their_capitals():
+    assert normalize_for_speech("URGENT: PDF and GDPR form") == "Urgent: PDF and GDPR form"
+    assert normalize_for_speech("HTTPS cert renewal") == "HTTPS cert renewal"
+    assert normalize_for_speech("ETA for the API") == "E T A for the API"
+
+
+def test_prepare_email_stores_speakable_fields_once():
+    email = prepare_email({"id": "m1", "sender": "", "subject": "RE: mtg @ 3pm"})
+    assert email["speech_sender"] == "Unknown sender"
+    assert email["speech_subject"] == "meeting @ 3 PM"
+    assert spoken(email, "subject") == "meeting @ 3 PM"
+    assert spoken({"subject": "FYI"}, "subject") == "for your information"
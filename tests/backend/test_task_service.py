@@ -0,0 +1,128 @@
+import sqlite3
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.routes import tasks as task_routes
+from backend.services import task_service
+from backend.services.change_log import get_mail_store
+from backend.services.task_service import TaskStore, extract_tasks, ingest_user_mail, parse_due_date, task_title
+
+client = TestClient(app)
+
+RECEIVED = datetime(2025, 10, 21, 9, 0)   # A Tuesday
+
+
+def email(email_id, received, preview="Please review the draft by Friday."):
+    return {"id": email_id, "received": received, "subject": "Draft", "preview": preview,
+            "from_name": "Sarah"}
+
+
+def test_parse_due_date():
+    assert parse_due_date("by 3 PM today", RECEIVED) == datetime(2025, 10, 21, 15, 0)
+    assert parse_due_date("tomorrow please", RECEIVED) == datetime(2025, 10, 22, 17, 0)
+    assert parse_due_date("end of day Friday", RECEIVED) == datetime(2025, 10, 24, 17, 0)
+    assert parse_due_date("no date here", RECEIVED) is None
+
+
+def test_task_title_strips_filler():
+    assert task_title("Reminder: please submit your expenses.") == "Submit your expenses"
+
+
+def test_extract_tasks_from_actionable_sentences():
+    tasks = extract_tasks(email("e1", RECEIVED.isoformat(), "Thanks for lunch. Please confirm by 3 PM today."))
+    assert [task["title"] for task in tasks] == ["Confirm by 3 PM today"]
+    assert tasks[0]["due"] == "2025-10-21T15:00:00"
+    assert extract_tasks(email("e2", RECEIVED.isoformat(), "Just saying hello.")) == []
+
+
+def test_each_email_is_processed_once(tmp_path):
+    store = TaskStore(tmp_path / "tasks.db")
+    mail = [email("e1", "2025-10-21T09:00:00"), email("e2", "2025-10-21T10:00:00")]
+    assert store.process_new_mail(mail) == 2
+    assert store.process_new_mail(mail) == 0
+    assert len(store.list_tasks()) == 2
+
+
+def test_late_mail_with_an_older_timestamp_is_still_processed(tmp_path):
+    store = TaskStore(tmp_path / "tasks.db")
+    store.process_new_mail([email("new", "2025-10-21T12:00:00")])
+    # Delayed delivery: arrives after "new" but was sent earlier
+    assert store.process_new_mail([email("new", "2025-10-21T12:00:00"), email("late", "2025-10-21T08:00:00")]) == 1
+    assert {task["email_id"] for task in store.list_tasks()} == {"new", "late"}
+
+
+def test_mark_done(tmp_path):
+    store = TaskStore(tmp_path / "tasks.db")
+    store.process_new_mail([email("e1", "2025-10-21T09:00:00")])
+    task_id = store.list_tasks()[0]["id"]
+    assert store.mark_done(task_id)
+    assert store.list_tasks() == []
+    assert not store.mark_done("missing")
+
+
+def test_tasks_are_kept_per_user(tmp_path):
+    store = TaskStore(tmp_path / "tasks.db")
+    store.process_new_mail([email("e1", "2025-10-21T09:00:00")], "ann")
+    assert store.process_new_mail([email("e1", "2025-10-21T09:00:00")], "bob") == 1
+    task_id = store.list_tasks(user_id="ann")[0]["id"]
+    assert not store.mark_done(task_id, "eve")
+    assert store.mark_done(task_id, "ann")
+    assert store.list_tasks(user_id="ann") == [] and len(store.list_tasks(user_id="bob")) == 1
+
+
+def test_workers_sharing_the_file_process_each_email_once(tmp_path):
+    first, second = TaskStore(tmp_path / "tasks.db"), TaskStore(tmp_path / "tasks.db")
+    mail = [email("e1", "2025-10-21T09:00:00")]
+    first.processed_ids = second.processed_ids = lambda email_ids, user_id="default": set()   # Both saw it as new
+    assert first.process_new_mail(mail) == 1
+    assert second.process_new_mail(mail) == 0
+    assert len(second.list_tasks()) == 1
+
+
+def test_version_one_rows_move_to_the_default_user(tmp_path):
+    path = tmp_path / "tasks.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE tasks (id TEXT PRIMARY KEY, email_id TEXT NOT NULL, title TEXT NOT NULL, due TEXT, sender TEXT,
+                            source_subject TEXT, importance TEXT, received TEXT, done INTEGER NOT NULL DEFAULT 0);
+        CREATE INDEX tasks_due ON tasks (done, due);
+        CREATE TABLE processed_emails (email_id TEXT PRIMARY KEY, received TEXT NOT NULL);
+        INSERT INTO tasks (id, email_id, title) VALUES ('e1:0', 'e1', 'Review the draft');
+        INSERT INTO processed_emails VALUES ('e1', '2025-10-21T09:00:00');
+    """)
+    conn.close()
+    store = TaskStore(path)
+    assert [task["title"] for task in store.list_tasks()] == ["Review the draft"]
+    assert store.process_new_mail([email("e1", "2025-10-21T09:00:00")]) == 0
+    assert TaskStore(path).list_tasks()[0]["user_id"] == "default"
+
+
+def test_ingest_reads_each_users_mail_store_changes(tmp_path, monkeypatch):
+    tasks = TaskStore(tmp_path / "tasks.db")
+    monkeypatch.setattr(task_service, "get_task_store", lambda: tasks)
+    monkeypatch.setattr(task_service, "_ingest_cursors", {})
+    store = get_mail_store("task-ingest-user")
+    assert ingest_user_mail("task-ingest-user") == len(store.items)
+    assert ingest_user_mail("task-ingest-user") == 0                      # Nothing new since the cursor
+    store.sync([*store.snapshot(), {"id": 99, "sender": "Dana", "subject": "Contract",
+                                    "snippet": "Please sign the contract by Friday.",
+                                    "timestamp": "2025-10-21T09:00:00Z", "priority": "high"}])
+    assert ingest_user_mail("task-ingest-user") == 1
+    [task] = [task for task in tasks.list_tasks(user_id="task-ingest-user") if task["email_id"] == "99"]
+    assert (task["title"], task["sender"]) == ("Sign the contract by Friday", "Dana")
+    assert tasks.list_tasks(user_id="someone-else") == []
+
+
+def test_task_routes_are_scoped_to_the_caller(tmp_path, monkeypatch):
+    tasks = TaskStore(tmp_path / "tasks.db")
+    monkeypatch.setattr(task_service, "get_task_store", lambda: tasks)
+    monkeypatch.setattr(task_routes, "get_task_store", lambda: tasks)
+    tasks.process_new_mail([email("e1", "2025-10-21T09:00:00")], "task-route-owner")
+    task_id = tasks.list_tasks(user_id="task-route-owner")[0]["id"]
+    other = {"X-User-Id": "task-route-other"}
+    assert task_id not in [task["id"] for task in client.get("/api/tasks", headers=other).json()["tasks"]]
+    assert client.post(f"/api/tasks/{task_id}/done", headers=other).status_code == 404
+    owner = {"X-User-Id": "task-route-owner"}
+    assert client.post(f"/api/tasks/{task_id}/done", headers=owner).status_code == 200
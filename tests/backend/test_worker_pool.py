@@ -0,0 +1,78 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.services.deadline import _deadline
+from backend.services.worker_pool import JobTimeout, PoolSaturated, WorkerPool
+
+
+def square(n):
+    return n * n, os.getpid()
+
+
+def fail():
+    raise ValueError("bad input")
+
+
+def threaded_pool(workers=1, queue=0):
+    """Pool backed by threads, so a test can hold a job open"""
+    pool = WorkerPool(max_workers=workers, max_queue=queue)
+    pool._executor = ThreadPoolExecutor(max_workers=workers)
+    return pool
+
+
+def test_jobs_run_in_another_process():
+    pool = WorkerPool(max_workers=1, max_queue=0)
+    try:
+        result, pid = asyncio.run(pool.submit(square, 7))
+    finally:
+        pool.shutdown()
+    assert result == 49 and pid != os.getpid()
+    assert pool.counters["completed"] == 1 and pool.in_flight == 0
+
+
+def test_full_pool_rejects_with_a_retry_hint():
+    pool = threaded_pool()
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.submit(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturated) as saturated:
+            await pool.submit(square, 2)
+        release.set()
+        await running
+        return saturated.value.retry_after
+
+    assert asyncio.run(scenario()) >= 1
+    assert pool.counters["rejected"] == 1 and pool.counters["completed"] == 1
+    assert pool.metrics()["latency_ms_p50"] is not None
+
+
+def test_job_past_its_deadline_times_out():
+    pool = threaded_pool()
+    with pytest.raises(JobTimeout):
+        asyncio.run(pool.submit(time.sleep, 0.5, deadline_s=0.05))
+    assert pool.counters["timed_out"] == 1 and pool.in_flight == 0
+
+
+def test_job_for_an_expired_request_never_starts():
+    pool = threaded_pool()
+    token = _deadline.set(time.monotonic() - 1)
+    try:
+        with pytest.raises(JobTimeout):
+            asyncio.run(pool.submit(square, 2))
+    finally:
+        _deadline.reset(token)
+    assert pool.counters["submitted"] == 0
+
+
+def test_failures_are_counted_and_raised():
+    pool = threaded_pool()
+    with pytest.raises(ValueError):
+        asyncio.run(pool.submit(fail))
+    assert pool.counters["failed"] == 1 and pool.in_flight == 0
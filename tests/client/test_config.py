@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from client import config
+from client.audio import text_to_speech
+from client.config import ClientSettingsManager, get_client_settings, load_client_settings
+from client.voice_client import ZenDriveVoiceClient
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_client_section_with_env_overrides(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"client": {"tts_rate": 180, "refresh_min_s": 20}, "workers": {"workers": 9}}))
+    monkeypatch.setenv("ZENDRIVE_CLIENT__REFRESH_MIN_S", "30")
+    settings = load_client_settings(path)
+    assert (settings.tts_rate, settings.refresh_min_s, settings.refresh_max_s) == (180, 30.0, 3600.0)
+
+
+def test_invalid_values_are_rejected(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"client": {"tts_rate": 5}}))
+    with pytest.raises(ValidationError):
+        load_client_settings(path)
+
+
+def test_client_runs_without_the_backend_package():
+    code = "import sys, client.runtime, client.voice_client; print(any(m.startswith('backend') for m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert out.stdout.strip().splitlines()[-1] == "False", out.stderr
+
+
+def write(path, mtime, **client):
+    path.write_text(json.dumps({"client": client}))
+    os.utime(path, (mtime, mtime))
+
+
+def test_reads_are_snapshots_and_reloads_happen_on_check(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    write(path, 1000, tts_rate=180)
+    monkeypatch.setenv("ZENDRIVE_SETTINGS_FILE", str(path))
+    monkeypatch.setattr(config, "_manager", None)
+    assert get_client_settings().tts_rate == 180
+
+    write(path, 2000, tts_rate=200)
+    assert get_client_settings().tts_rate == 180            # No file access until the watcher checks
+    manager = config.get_client_settings_manager()
+    changes = []
+    manager.subscribe(lambda old, new: changes.append((old.tts_rate, new.tts_rate)))
+    assert manager.check() and not manager.check()
+    assert get_client_settings().tts_rate == 200 and changes == [(180, 200)]
+
+    write(path, 3000, tts_rate=5)                           # Invalid: keep what we have
+    assert not manager.check()
+    assert get_client_settings().tts_rate == 200
+
+
+def test_reloaded_speech_deadlines_reach_the_scheduler(tmp_path):
+    path = tmp_path / "settings.json"
+    write(path, 1000, urgent_deadline_s=3)
+    manager = ClientSettingsManager(path)
+    client = ZenDriveVoiceClient.__new__(ZenDriveVoiceClient)
+    client.speech_scheduler = text_to_speech.SpeechScheduler()
+    manager.subscribe(client._apply_settings)
+    write(path, 2000, urgent_deadline_s=8)
+    assert manager.check()
+    assert client.speech_scheduler.deadlines[text_to_speech.URGENT] == 8
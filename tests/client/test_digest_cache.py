@@ -0,0 +1,69 @@
+from client.api.digest_cache import DigestCache, describe_age, event_delta, mail_delta
+
+
+def email(email_id, sender="Sarah"):
+    return {"id": email_id, "sender": sender, "subject": f"Subject {email_id}"}
+
+
+def test_describe_age():
+    assert describe_age(30) == "just now"
+    assert describe_age(60) == "1 minute ago"
+    assert describe_age(2 * 3600 + 5) == "2 hours ago"
+
+
+def test_cache_round_trip(tmp_path):
+    cache = DigestCache(str(tmp_path / "cache.db"))
+    assert cache.get("mail-digest") is None
+    cache.put("mail-digest", {"speech": "hi"})
+    payload, age = cache.get("mail-digest")
+    assert payload == {"speech": "hi"} and age < 5
+
+
+def test_mail_delta_ignores_emails_moving_out_of_the_readout():
+    # e3 was spoken before but no longer fits the budget; it is still unread
+    old = {"priority_emails": [email("e1")], "regular_emails": [email("e3")], "email_ids": ["e1", "e2", "e3"]}
+    new = {"priority_emails": [email("e1"), email("e4")], "regular_emails": [], "email_ids": ["e1", "e2", "e3", "e4"]}
+    delta = mail_delta(old, new)
+    assert [e["id"] for e in delta["added"]] == ["e4"]
+    assert delta["removed"] == []
+    assert (delta["added_count"], delta["removed_count"]) == (1, 0)
+
+
+def test_mail_delta_counts_new_mail_outside_the_readout():
+    old = {"priority_emails": [email("e1")], "regular_emails": [], "email_ids": ["e1"]}
+    new = {"priority_emails": [email("e1")], "regular_emails": [], "email_ids": ["e1", "e2", "e3"]}
+    delta = mail_delta(old, new)
+    assert delta["added"] == []
+    assert delta["added_count"] == 2
+
+
+def test_mail_delta_falls_back_to_the_lists_without_ids():
+    delta = mail_delta({"priority_emails": [email("e1")]}, {"priority_emails": [email("e2")]})
+    assert [e["id"] for e in delta["added"]] == ["e2"]
+    assert [e["id"] for e in delta["removed"]] == ["e1"]
+
+
+def test_event_delta():
+    old = {"events": [{"id": "a", "title": "A", "time": "9:00 AM"}, {"id": "b", "title": "B", "time": "1:00 PM"}]}
+    new = {"events": [{"id": "a", "title": "A", "time": "10:00 AM"}, {"id": "c", "title": "C", "time": "2:00 PM"}]}
+    delta = event_delta(old, new)
+    assert [e["id"] for e in delta["added"]] == ["c"]
+    assert [e["id"] for e in delta["removed"]] == ["b"]
+    assert [e["id"] for e in delta["changed"]] == ["a"]
+
+
+def standup(day, clock="09:00", spoken="9:00 AM"):
+    return {"id": f"standup@{day}", "series_id": "standup", "title": "Team Standup",
+            "start": f"{day}T{clock}:00", "time": spoken}
+
+
+def test_event_delta_matches_recurring_occurrences_across_days():
+    old = {"events": [standup("2025-10-20")]}
+    assert event_delta(old, {"events": [standup("2025-10-21")]}) == {"added": [], "removed": [], "changed": []}
+
+    moved = event_delta(old, {"events": [standup("2025-10-21", "10:00", "10:00 AM")]})
+    assert [e["time"] for e in moved["changed"]] == ["10:00 AM"]
+    assert moved["added"] == moved["removed"] == []
+
+    cancelled = event_delta(old, {"events": []})
+    assert [e["series_id"] for e in cancelled["removed"]] == ["standup"]
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from client.runtime import DigestRefresher
+
+
+class FakeCache:
+    def __init__(self, calendar=None):
+        self.calendar = calendar
+
+    def get(self, endpoint):
+        return (self.calendar, 0.0) if endpoint == "calendar-digest" and self.calendar else None
+
+
+def refresher(calendar=None, **limits):
+    runtime = SimpleNamespace(client=SimpleNamespace(digest_cache=FakeCache(calendar)))
+    return DigestRefresher(runtime, **{"min_s": 15, "max_s": 600, "meeting_s": 60, "meeting_window_s": 900, **limits})
+
+
+def in_loop(fn):
+    async def main():
+        return fn()
+    return asyncio.run(main())
+
+
+def test_unchanged_polls_back_off_and_changes_reset_to_the_hint():
+    def scenario():
+        poller = refresher()
+        intervals = []
+        for changed in (True, False, False, False, False, False, True):
+            poller.record("mail-digest", changed, 100)
+            intervals.append(poller._interval["mail-digest"])
+        return intervals, poller.counters["unchanged"]
+
+    intervals, unchanged = in_loop(scenario)
+    assert intervals == [100, 200, 400, 600, 600, 600, 100]
+    assert unchanged == 5
+
+
+def test_hints_below_the_floor_are_raised():
+    poller = refresher()
+    in_loop(lambda: poller.record("mail-digest", True, 1))
+    assert poller._interval["mail-digest"] == 15
+
+
+def test_freshness_follows_the_hint_not_the_backoff():
+    def scenario():
+        poller = refresher()
+        for _ in range(4):
+            poller.record("mail-digest", False, 30)
+        now = poller._now()
+        return poller._due["mail-digest"] - now, poller._fresh_until["mail-digest"] - now, poller.fresh("mail-digest")
+
+    due_in, fresh_for, fresh = in_loop(scenario)
+    assert due_in > 200                   # The background poll has backed off...
+    assert 29 < fresh_for <= 30           # ...commands still trust the digest only for the hint
+    assert fresh
+
+
+def test_an_upcoming_meeting_caps_polls_and_freshness():
+    start = (datetime.now() + timedelta(minutes=10)).isoformat()
+    poller = refresher(calendar={"events": [{"title": "Review", "start": start}]})
+
+    def scenario():
+        poller.record("mail-digest", False, 300)
+        return poller._fresh_until["mail-digest"] - poller._now()
+
+    assert in_loop(scenario) <= 60
+    assert poller._interval["mail-digest"] == 60
+
+
+def test_failures_back_off_without_marking_fresh():
+    def scenario():
+        poller = refresher()
+        poller.failed("calendar-digest")
+        poller.failed("calendar-digest")
+        return poller
+
+    poller = in_loop(scenario)
+    assert poller._interval["calendar-digest"] == 60
+    assert poller.counters["failures"] == 2
+    assert "calendar-digest" not in poller._fresh_until
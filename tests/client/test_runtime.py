@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import pytest
+
+from client.api.digest_cache import DigestCache
+from client.audio import text_to_speech
+from client.audio.text_to_speech import NullOutput, SpeechScheduler, StreamingSpeaker, StubBackend
+from client import runtime as runtime_module
+from client.runtime import AsyncVoiceRuntime, DigestRefresher, run_client
+from client.voice_client import ZenDriveVoiceClient
+
+MAIL = {"total_unread": 2, "priority_count": 1, "email_ids": ["m1", "m2"],
+        "priority_emails": [{"id": "m1", "sender": "Sarah", "subject": "Budget review"}],
+        "regular_emails": [{"id": "m2", "sender": "Tom", "subject": "Lunch"}]}
+
+
+class FakeAPI:
+    def __init__(self, digests):
+        self.digests = digests
+        self.fetched = []
+        self.activity = 0
+
+    async def get_digest(self, endpoint, prefetch=False):
+        self.fetched.append(endpoint)
+        return self.digests[endpoint], 60.0
+
+    async def search(self, query):
+        return {"speech": f"Found 1 email matching {query}.", "result_count": 1}
+
+    async def report_activity(self):
+        self.activity += 1
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A voice client speaking through the stub engine, without real-time playback or background polls"""
+    settings = tmp_path / "settings.json"
+    settings.write_text(json.dumps({"client": {"refresh_enabled": False}}))
+    monkeypatch.setenv("ZENDRIVE_SETTINGS_FILE", str(settings))
+    client = ZenDriveVoiceClient.__new__(ZenDriveVoiceClient)
+    client.digest_cache = DigestCache(str(tmp_path / "digests.db"))
+    client.speech_scheduler = SpeechScheduler()
+    client.output = NullOutput(realtime=False)
+    client.speaker = StreamingSpeaker(StubBackend(), client.output, scheduler=client.speech_scheduler)
+    return client
+
+
+def run(client, *commands, digests=None):
+    api = FakeAPI(digests or {"mail-digest": MAIL})
+
+    async def main():
+        runtime = AsyncVoiceRuntime(client, api=api)
+        await runtime.start()
+        try:
+            results = [await runtime.handle_command(command) for command in commands]
+            await runtime.drain()
+        finally:
+            await runtime.close()
+        return results
+
+    return asyncio.run(main()), api
+
+
+def test_runtime_speaks_through_the_clients_speaker(client):
+    results, api = run(client, "read my email")
+    assert results == ["continue"]
+    assert api.fetched == ["mail-digest"] and api.activity == 1
+    spoken = " ".join(client.output.played)
+    assert "You have 2 unread emails." in spoken
+    assert "Sarah says Budget review" in spoken
+    assert client.digest_cache.get("mail-digest")[0] == MAIL
+
+
+def test_search_speaks_the_server_answer(client):
+    run(client, "emails from sarah")
+    assert client.output.played[-1] == "Found 1 email matching emails from sarah."
+
+
+def test_stop_signs_off(client):
+    results, _ = run(client, "stop")
+    assert results == ["stop"]
+    assert client.output.played == ["Safe driving!", "ZenDrive signing off."]
+
+
+def test_speak_never_blocks_and_caps_pauses(client):
+    client.speak("Hello there.", section_pause=30, priority=text_to_speech.URGENT)
+    assert client.speaker.wait(timeout=5)
+    assert client.output.played == ["Hello there.", ""]
+
+
+def test_commands_trust_a_digest_only_for_the_hinted_interval(client):
+    api = FakeAPI({"mail-digest": MAIL})
+
+    async def main():
+        runtime = AsyncVoiceRuntime(client, api=api)
+        await runtime.start()
+        try:
+            await runtime.handle_command("read my email")
+            await runtime.handle_command("read my email")          # Within the hint: spoken from the cache
+            fetched_while_fresh = list(api.fetched)
+            runtime.refresher._interval["mail-digest"] = 3600        # The background poll backed off...
+            runtime.refresher._fresh_until["mail-digest"] = 0        # ...but the hint has run out
+            await runtime.handle_command("read my email")
+            await asyncio.sleep(0.05)
+            await runtime.drain()
+        finally:
+            await runtime.close()
+        return fetched_while_fresh
+
+    assert asyncio.run(main()) == ["mail-digest"]
+    assert api.fetched == ["mail-digest", "mail-digest"]
+    assert any(line.startswith("Here's your email digest from") for line in client.output.played)
+
+
+def test_one_shot_commands_skip_the_background_refresher(client, tmp_path, monkeypatch):
+    settings = tmp_path / "refreshing.json"
+    settings.write_text(json.dumps({"client": {"refresh_enabled": True}}))
+    monkeypatch.setenv("ZENDRIVE_SETTINGS_FILE", str(settings))
+    api, polls = FakeAPI({"mail-digest": MAIL}), []
+    monkeypatch.setattr(runtime_module, "ZenDriveAPI", lambda *args: api)
+    monkeypatch.setattr(DigestRefresher, "run", lambda self: polls.append(self) or asyncio.sleep(0))
+
+    run_client(client, "command", command="read my email")
+    assert polls == [] and api.fetched == ["mail-digest"]
@@ -0,0 +1,121 @@
+import json
+from array import array
+
+from client.audio.speech_recognition import (EnergyVAD, StreamingRecognizer, StubEngine, VoskEngine, frame_rms,
+                                             match_early_intent)
+
+LOUD = array("h", [3000, -3000] * 240).tobytes()
+QUIET = bytes(960)
+
+
+def run(recognizer, *segments):
+    """Feed (frame, count) pairs"""
+    for frame, count in segments:
+        for _ in range(count):
+            recognizer.process_frame(frame)
+
+
+def recognizer_for(*transcripts, **options):
+    commands, wakes = [], []
+    recognizer = StreamingRecognizer(StubEngine(transcripts, frames_per_word=1), commands.append,
+                                     on_wake=lambda: wakes.append(True), **options)
+    return recognizer, commands, wakes
+
+
+def test_frame_rms():
+    assert frame_rms(QUIET) == 0.0
+    assert round(frame_rms(LOUD)) == 3000
+
+
+def test_vad_start_and_end_with_hangover():
+    vad = EnergyVAD(start_frames=3, hangover_frames=5)
+    events = [vad.process(LOUD) for _ in range(3)]
+    assert events[-1] == "start"
+    # A pause shorter than the hangover keeps the utterance going
+    assert [vad.process(QUIET) for _ in range(4)] == [None] * 4
+    assert vad.quiet_frames == 4
+    vad.process(LOUD)
+    assert [vad.process(QUIET) for _ in range(5)][-1] == "end"
+
+
+def test_early_intents():
+    assert match_early_intent("stop") == "stop"
+    assert match_early_intent("what's on my calendar") == "calendar"
+    assert match_early_intent("priority emails") is None            # "from Sarah" may follow
+    assert match_early_intent("priority emails", paused=True) == "priority"
+    assert match_early_intent("priority emails from", paused=True) is None
+
+
+def test_priority_waits_for_the_sender():
+    recognizer, commands, wakes = recognizer_for("zen drive priority emails from sarah")
+    run(recognizer, (QUIET, 5), (LOUD, 10), (QUIET, 25))
+    assert wakes == [True]
+    assert commands == ["priority emails from sarah"]
+
+
+def test_priority_dispatches_at_the_end_of_the_phrase():
+    recognizer, commands, _ = recognizer_for("zen drive priority emails")
+    run(recognizer, (QUIET, 5), (LOUD, 6), (QUIET, 8))
+    assert commands == ["priority emails"]       # Before the hangover ends the utterance
+    assert recognizer.vad.in_speech
+    run(recognizer, (QUIET, 20))
+    assert commands == ["priority emails"]       # Once per utterance
+
+
+def test_stop_dispatches_on_the_partial():
+    recognizer, commands, _ = recognizer_for("stop reading please", require_wake_word=False)
+    run(recognizer, (QUIET, 5), (LOUD, 3))
+    assert commands == ["stop"]
+
+
+def test_wake_word_covers_one_command():
+    recognizer, commands, _ = recognizer_for("zen drive read my email", "did you read my email yesterday")
+    run(recognizer, (QUIET, 5), (LOUD, 10), (QUIET, 25))
+    assert commands == ["read my email"]
+    # Cabin conversation afterwards is not a command
+    run(recognizer, (LOUD, 10), (QUIET, 25))
+    assert commands == ["read my email"]
+
+
+def test_wake_word_then_command_in_the_next_utterance():
+    recognizer, commands, _ = recognizer_for("zen drive", "read my email")
+    run(recognizer, (QUIET, 5), (LOUD, 4), (QUIET, 25), (LOUD, 6), (QUIET, 25))
+    assert commands == ["read my email"]
+
+
+def test_wake_word_lapses_without_a_command():
+    recognizer, commands, _ = recognizer_for("zen drive", "read my email", wake_timeout_frames=40)
+    run(recognizer, (QUIET, 5), (LOUD, 4), (QUIET, 60), (LOUD, 6), (QUIET, 25))
+    assert commands == []
+    assert not recognizer.activated
+
+
+class FakeKaldi:
+    """Scripted Vosk recognizer: a "final" step finalizes a segment, as Vosk does at an internal pause"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.current = None
+
+    def AcceptWaveform(self, frame):
+        self.current = self.script.pop(0)
+        return self.current[0] == "final"
+
+    def Result(self):
+        return json.dumps({"text": self.current[1]})
+
+    def PartialResult(self):
+        return json.dumps({"partial": self.current[1]})
+
+    def FinalResult(self):
+        return json.dumps({"text": self.current[1] if self.current[0] == "partial" else ""})
+
+
+def test_vosk_engine_keeps_finalized_segments():
+    engine = VoskEngine.__new__(VoskEngine)
+    engine._segments, engine._last_partial = [], ""
+    engine._recognizer = FakeKaldi([("partial", "priority"), ("final", "priority emails"),
+                                    ("partial", "from"), ("partial", "from sarah")])
+    hypotheses = [engine.accept_frame(b"") for _ in range(4)]
+    assert hypotheses == ["priority", "priority emails", "priority emails from", "priority emails from sarah"]
+    assert engine.finish() == "priority emails from sarah"
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from client.audio.text_to_speech import BACKGROUND, RESPONSE, URGENT, SpeechScheduler
+
+
+def drain(scheduler):
+    """Every part handed out, in order, marked done as a consumer would"""
+    parts = []
+    while True:
+        part = scheduler.pop()
+        if part is None:
+            return parts
+        parts.append(part[:2])
+        scheduler.task_done()
+
+
+def test_higher_classes_go_first_and_ties_keep_order():
+    scheduler = SpeechScheduler()
+    scheduler.put("Other emails.", BACKGROUND)
+    scheduler.put("First answer.", RESPONSE)
+    scheduler.put("Second answer.", RESPONSE)
+    scheduler.put("Watch out.", URGENT)
+    assert [value for _, value in drain(scheduler)] == ["Watch out.", "First answer.", "Second answer.",
+                                                        "Other emails."]
+
+
+def test_urgent_speech_cuts_in_at_the_next_sentence():
+    scheduler = SpeechScheduler()
+    scheduler.put("One. Two. Three.", BACKGROUND, pause_after=0.5)
+    assert scheduler.pop()[:2] == ("speech", "One.")
+    scheduler.task_done()
+    scheduler.put("ZenDrive activated.", URGENT)
+    assert scheduler.stats["preempted"] == 1
+    assert drain(scheduler) == [("speech", "ZenDrive activated."), ("speech", "Two."), ("speech", "Three."),
+                                ("pause", 0.5)]
+
+
+def test_pending_duplicates_are_not_queued_twice():
+    scheduler = SpeechScheduler()
+    assert scheduler.put("Two new emails from Sarah.", BACKGROUND)
+    assert not scheduler.put("two new  EMAILS from sarah.", BACKGROUND)
+    assert scheduler.put("Two new emails from Sarah.", URGENT)         # Promoted: replaces the pending one
+    assert len(scheduler) == 1
+    assert drain(scheduler) == [("speech", "Two new emails from Sarah.")]
+    assert scheduler.stats["deduplicated"] == 2
+    assert scheduler.put("Two new emails from Sarah.", BACKGROUND)     # Spoken already, so it can be said again
+
+
+def test_stale_speech_is_dropped_unless_started():
+    scheduler = SpeechScheduler({BACKGROUND: 0.01, RESPONSE: None})
+    scheduler.put("Started. Unfinished.", BACKGROUND)
+    assert scheduler.pop()[1] == "Started."
+    scheduler.task_done()
+    scheduler.put("Never started.", BACKGROUND)
+    scheduler.put("No deadline.", RESPONSE)
+    time.sleep(0.02)
+    assert [value for _, value in drain(scheduler)] == ["No deadline.", "Unfinished."]
+    assert scheduler.stats["expired"] == 1
+
+
+def test_join_waits_for_every_part_and_close_wakes_getters():
+    scheduler = SpeechScheduler()
+    scheduler.put("Hello. World.", RESPONSE)
+    assert scheduler.unfinished() == 2
+    assert not scheduler.join(timeout=0.01)
+
+    def consume():
+        while True:
+            part = scheduler.get()
+            if part is None:
+                return
+            scheduler.task_done()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    assert scheduler.join(timeout=5)
+    assert scheduler.unfinished() == 0
+    scheduler.close()
+    consumer.join(timeout=5)
+    assert not consumer.is_alive()
+
+
+def test_clear_drops_everything_not_yet_handed_out():
+    scheduler = SpeechScheduler()
+    scheduler.put("A. B.", RESPONSE)
+    scheduler.put("C.", BACKGROUND)
+    scheduler.pop()
+    assert scheduler.clear() == 2
+    assert scheduler.unfinished() == 1     # The part already out still needs its task_done
+    scheduler.task_done()
+    assert scheduler.join(timeout=0)
@@ -0,0 +1,67 @@
+from client.audio.text_to_speech import (NullOutput, StreamingSpeaker, StubBackend, create_backend, silence,
+                                         split_sentences)
+
+
+class FlakyBackend(StubBackend):
+    """Fails on one sentence, like an engine that chokes on odd input"""
+
+    def __init__(self, bad: str):
+        super().__init__()
+        self.bad = bad
+        self.resets = 0
+
+    def synthesize(self, text):
+        if text == self.bad:
+            raise RuntimeError("engine error")
+        return super().synthesize(text)
+
+    def reset(self):
+        self.resets += 1
+
+
+def test_split_sentences():
+    assert split_sentences("You have 3 emails. Priority emails: Sarah says hi!  Done?") == [
+        "You have 3 emails.", "Priority emails:", "Sarah says hi!", "Done?"]
+    assert split_sentences("   ") == []
+
+
+def test_silence_duration():
+    assert silence(0.5, 8000).duration == 0.5
+
+
+def test_stub_backend_sizes_audio_like_the_text():
+    chunk = StubBackend(chars_per_second=10, sample_rate=8000).synthesize("0123456789")
+    assert chunk.duration == 1.0 and chunk.text == "0123456789"
+
+
+def test_create_backend_by_name():
+    assert create_backend("stub").name == "stub"
+
+
+def test_speaker_plays_sentences_in_order_with_pauses():
+    backend, output = StubBackend(), NullOutput(realtime=False)
+    speaker = StreamingSpeaker(backend, output)
+    speaker.say("First sentence. Second sentence.", pause_after=0.2)
+    speaker.say("Third.")
+    assert speaker.wait(timeout=5)
+    assert output.played == ["First sentence.", "Second sentence.", "", "Third."]
+    assert backend.synthesized == ["First sentence.", "Second sentence.", "Third."]
+    assert not speaker.busy
+
+
+def test_failed_sentence_is_skipped_not_fatal():
+    backend, output = FlakyBackend("Bad one."), NullOutput(realtime=False)
+    speaker = StreamingSpeaker(backend, output)
+    speaker.say("Good one. Bad one. Still going.")
+    assert speaker.wait(timeout=5)
+    assert output.played == ["Good one.", "Still going."]
+    assert backend.resets == 1
+
+
+def test_stop_drops_queued_speech():
+    output = NullOutput(realtime=True)
+    speaker = StreamingSpeaker(StubBackend(chars_per_second=5), output)
+    speaker.say("A long sentence that takes a while. " * 5)
+    speaker.stop()
+    assert speaker.wait(timeout=5)
+    assert len(output.played) <= 2
@@ -0,0 +1,27 @@
+import pytest
+
+from client.runtime import classify_command
+
+
+@pytest.mark.parametrize("command, intent", [
+    ("stop", "stop"),
+    ("brief me", "briefing"),
+    ("emails from Sarah", "search"),
+    ("anything about the budget", "search"),
+    ("emails about the meeting", "search"),
+    ("what's my meeting about", "calendar"),
+    ("who is my next meeting from", "calendar"),
+    ("what's on my schedule", "calendar"),
+    ("what's on today", "calendar"),
+    ("priority emails", "priority"),
+    ("read my email", "mail"),
+    ("sing a song", "unknown"),
+    ("anything from the landlord", "search"),
+    ("read priority emails from today", "priority"),
+    ("read my emails from this morning", "mail"),
+    ("emails from 9 am", "mail"),
+    ("what's on my calendar from 3", "calendar"),
+    ("any messages about", "mail"),
+])
+def test_classify_command(command, intent):
+    assert classify_command(command) == intent